@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request
+from app.services.adminServices import AdminService
+from app.utils.decorators import token_required
+
+router = APIRouter()
+
+@router.get("/profiles")
+@token_required
+async def list_profiles(request: Request):
+    return await AdminService.list_profiles(request)
+
+@router.get("/profiles/{profile_id}")
+@token_required
+async def get_profile(request: Request, profile_id: str):
+    return await AdminService.get_profile(profile_id, request)
+
+@router.get("/slow-queries")
+@token_required
+async def get_slow_queries(request: Request):
+    return await AdminService.get_slow_queries(request)
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, Header, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.config.database import get_db
+from app.config.database import get_db, get_read_db
 from app.services.bookServices import BookService
 from app.utils.decorators import token_required
 
@@ -13,18 +13,62 @@ async def create_book(request: Request, book: BookService.BookCreate, db: AsyncS
 
 @router.get("/")
 @token_required
-async def list_books(request: Request, db: AsyncSession = Depends(get_db)):
-    return await BookService.list_books(db)
+async def list_books(request: Request, limit: int = None, cursor: str = None, stream: bool = False,
+                     if_none_match: str = Header(None), db: AsyncSession = Depends(get_read_db)):
+    if stream:
+        return await BookService.stream_books(db, cursor)
+    return await BookService.list_books(db, limit, cursor, if_none_match)
+
+@router.post("/import")
+@token_required
+async def import_books(request: Request, format: str = None, db: AsyncSession = Depends(get_db)):
+    file_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    return await BookService.import_books_report(request.stream(), file_format, db)
+
+@router.get("/export")
+@token_required
+async def export_books(request: Request, format: str = "ndjson", cursor: str = None, db: AsyncSession = Depends(get_read_db)):
+    return await BookService.export_books(db, format, cursor)
+
+@router.get("/search")
+@token_required
+async def search_books(request: Request, q: str, limit: int = None, cursor: str = None, db: AsyncSession = Depends(get_read_db)):
+    return await BookService.search_books(db, q, limit, cursor)
 
 @router.get("/recommendations")
 @token_required
-async def get_recommendations(request: Request, db: AsyncSession = Depends(get_db)):
-    return await BookService.get_recommendations(request, db)
+async def get_recommendations(request: Request, rerank: bool = False, db: AsyncSession = Depends(get_db)):
+    return await BookService.get_recommendations(request, db, rerank)
+
+@router.get("/recommendations/stream")
+@token_required
+async def stream_recommendations(request: Request, db: AsyncSession = Depends(get_db)):
+    return await BookService.stream_recommendations(request, db)
+
+@router.post("/bulk-summaries")
+@token_required
+async def bulk_generate_summaries(request: Request, bulk_request: BookService.BulkSummaryCreate, db: AsyncSession = Depends(get_db)):
+    return await BookService.bulk_generate_summaries(bulk_request, db, request)
+
+@router.get("/llm-cache/stats")
+@token_required
+async def get_llm_cache_stats(request: Request):
+    return await BookService.get_llm_cache_stats()
+
+@router.get("/cache/stats")
+@token_required
+async def get_book_cache_stats(request: Request):
+    return await BookService.get_book_cache_stats()
+
+@router.delete("/llm-cache")
+@token_required
+async def purge_llm_cache(request: Request, db: AsyncSession = Depends(get_db)):
+    return await BookService.purge_llm_cache(request, db)
 
 @router.get("/{book_id}")
 @token_required
-async def get_book(request: Request, book_id: int, db: AsyncSession = Depends(get_db)):
-    return await BookService.get_book(book_id, db)
+async def get_book(request: Request, book_id: int, if_none_match: str = Header(None), db: AsyncSession = Depends(get_read_db)):
+    return await BookService.get_book(book_id, db, if_none_match)
 
 @router.put("/{book_id}")
 @token_required
@@ -43,26 +87,51 @@ async def add_review(request: Request, book_id: int, review: BookService.ReviewC
 
 @router.get("/{book_id}/reviews")
 @token_required
-async def get_reviews(request: Request, book_id: int, db: AsyncSession = Depends(get_db)):
-    return await BookService.get_reviews(book_id, db)
+async def get_reviews(request: Request, book_id: int, if_none_match: str = Header(None), db: AsyncSession = Depends(get_read_db)):
+    return await BookService.get_reviews(book_id, db, if_none_match)
+
+@router.put("/{book_id}/reviews/{review_id}")
+@token_required
+async def update_review(request: Request, book_id: int, review_id: int, review: BookService.ReviewCreate, db: AsyncSession = Depends(get_db)):
+    return await BookService.update_review(book_id, review_id, review, request, db)
+
+@router.delete("/{book_id}/reviews/{review_id}")
+@token_required
+async def delete_review(request: Request, book_id: int, review_id: int, db: AsyncSession = Depends(get_db)):
+    return await BookService.delete_review(book_id, review_id, request, db)
 
 @router.get("/{book_id}/summary")
 @token_required
-async def get_book_summary(request: Request, book_id: int, db: AsyncSession = Depends(get_db)):
-    return await BookService.get_book_summary(book_id, db)
+async def get_book_summary(request: Request, book_id: int, if_none_match: str = Header(None), db: AsyncSession = Depends(get_read_db)):
+    return await BookService.get_book_summary(book_id, db, if_none_match)
 
 @router.post("/generate-summary")
 @token_required
-async def generate_summary(request: Request, content: BookService.SummaryCreate):
-    return await BookService.generate_summary(content)
+async def generate_summary(request: Request, content: BookService.SummaryCreate, use_cache: bool = True, purge_cache: bool = False, db: AsyncSession = Depends(get_db)):
+    return await BookService.generate_summary(content, db, use_cache, purge_cache)
 
 @router.post("/generate-summary-by-book-id/{book_id}")
 @token_required
-async def generate_summary_by_book_id(request: Request, book_id: int, db: AsyncSession = Depends(get_db)):
-    return await BookService.generate_summary_by_book_id(book_id, db)
+async def generate_summary_by_book_id(request: Request, book_id: int, use_cache: bool = True, purge_cache: bool = False, db: AsyncSession = Depends(get_db)):
+    return await BookService.generate_summary_by_book_id(book_id, db, use_cache, purge_cache)
 
 @router.get("/generate-summary-by-book-name/{book_name}")
 @token_required
-async def generate_summary_by_book_name(request: Request, book_name: str, db: AsyncSession = Depends(get_db)):
-    return await BookService.generate_summary_by_book_name(book_name)
+async def generate_summary_by_book_name(request: Request, book_name: str, use_cache: bool = True, purge_cache: bool = False, db: AsyncSession = Depends(get_db)):
+    return await BookService.generate_summary_by_book_name(book_name, db, use_cache, purge_cache)
+
+@router.post("/generate-summary/stream")
+@token_required
+async def stream_summary(request: Request, content: BookService.SummaryCreate, use_cache: bool = True, db: AsyncSession = Depends(get_db)):
+    return await BookService.stream_summary(content, db, use_cache)
+
+@router.post("/generate-summary-by-book-id/{book_id}/stream")
+@token_required
+async def stream_summary_by_book_id(request: Request, book_id: int, use_cache: bool = True, db: AsyncSession = Depends(get_db)):
+    return await BookService.stream_summary_by_book_id(book_id, db, use_cache)
+
+@router.get("/generate-summary-by-book-name/{book_name}/stream")
+@token_required
+async def stream_summary_by_book_name(request: Request, book_name: str, use_cache: bool = True, db: AsyncSession = Depends(get_db)):
+    return await BookService.stream_summary_by_book_name(book_name, db, use_cache)
 
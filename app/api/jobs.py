@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.services.bookServices import BookService
+from app.services.jobServices import JobService
+from app.utils.decorators import token_required
+from app.utils.jwt import fetch_user_by_request
+
+router = APIRouter()
+
+@router.post("/summary", status_code=status.HTTP_202_ACCEPTED)
+@token_required
+async def submit_summary(request: Request, content: BookService.SummaryCreate, db: AsyncSession = Depends(get_db)):
+    return await JobService.submit_job("summary", {"content": content.content}, request, db)
+
+@router.post("/summary-by-book-id/{book_id}", status_code=status.HTTP_202_ACCEPTED)
+@token_required
+async def submit_summary_by_book_id(request: Request, book_id: int, db: AsyncSession = Depends(get_db)):
+    return await JobService.submit_job("summary_by_book_id", {"book_id": book_id}, request, db)
+
+@router.post("/summary-by-book-name/{book_name}", status_code=status.HTTP_202_ACCEPTED)
+@token_required
+async def submit_summary_by_book_name(request: Request, book_name: str, db: AsyncSession = Depends(get_db)):
+    return await JobService.submit_job("summary_by_book_name", {"book_name": book_name}, request, db)
+
+@router.post("/recommendations", status_code=status.HTTP_202_ACCEPTED)
+@token_required
+async def submit_recommendations(request: Request, rerank: bool = False, db: AsyncSession = Depends(get_db)):
+    user = fetch_user_by_request(request)
+    return await JobService.submit_job("recommendations", {"user_id": user["user_id"], "rerank": rerank}, request, db)
+
+@router.post("/bulk-summaries", status_code=status.HTTP_202_ACCEPTED)
+@token_required
+async def submit_bulk_summaries(request: Request, bulk_request: BookService.BulkSummaryCreate, db: AsyncSession = Depends(get_db)):
+    return await JobService.submit_job("bulk_summaries", bulk_request.model_dump(), request, db)
+
+@router.get("/{job_id}")
+@token_required
+async def get_job(request: Request, job_id: str, wait: float = 0, db: AsyncSession = Depends(get_db)):
+    return await JobService.get_job(job_id, request, db, wait)
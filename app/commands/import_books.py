@@ -0,0 +1,41 @@
+"""
+Bulk import books from a CSV (with a header row) or JSONL file.
+
+Usage:
+    python -m app.commands.import_books catalog.csv
+    python -m app.commands.import_books catalog.jsonl --report report.ndjson
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from app.config.database import AsyncSessionLocal
+from app.services.bookServices import BookService
+
+CHUNK_SIZE = 1024 * 1024
+
+async def read_chunks(path: str):
+    with open(path, "rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            yield chunk
+
+async def run(path: str, file_format: str, report) -> dict:
+    async with AsyncSessionLocal() as session:
+        return await BookService.import_books(read_chunks(path), file_format, session, report)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import books from a CSV or JSONL file.")
+    parser.add_argument("path", help="File to import.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Input format. Defaults to the file extension.")
+    parser.add_argument("--report", help="Write the per-row report (NDJSON) to this file.")
+    args = parser.parse_args(argv)
+
+    file_format = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    with open(args.report or os.devnull, "w", encoding="utf-8") as report:
+        result = asyncio.run(run(args.path, file_format, report))
+    print(json.dumps(result, indent=2))
+    return 0 if result["status"] == 200 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
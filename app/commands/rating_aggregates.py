@@ -0,0 +1,32 @@
+"""
+Rebuild or verify the denormalized rating aggregates on `books`.
+
+Usage:
+    python -m app.commands.rating_aggregates            # recompute and fix drifted books
+    python -m app.commands.rating_aggregates --verify   # only report drifted books
+"""
+import argparse
+import asyncio
+import json
+import sys
+from app.config.database import AsyncSessionLocal
+from app.services.bookServices import BookService
+
+async def run(verify_only: bool) -> dict:
+    async with AsyncSessionLocal() as session:
+        return await BookService.rebuild_rating_aggregates(session, verify_only=verify_only)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild or verify rating aggregates from the reviews table.")
+    parser.add_argument("--verify", action="store_true", help="Report drifted books without fixing them.")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.verify))
+    print(json.dumps(result, indent=2))
+    if result["status"] != 200:
+        return 2
+    # A non-zero exit code lets `--verify` gate deployments or cron alerts
+    return 1 if args.verify and result["data"]["drifted"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
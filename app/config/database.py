@@ -1,15 +1,216 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import itertools
+import time
+from typing import List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config.settings import settings
 from app.models.book import Base
+from app.utils.logger import get_logger
+from app.utils.metrics import (
+    DB_STATEMENT_DURATION, DB_STATEMENT_ERRORS, DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS_IN_USE
+)
+from app.utils.profiling import record_statement
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+logger = get_logger(__name__)
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection (including connecting)."""
+
+    checkout_wait = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.checkout_wait is not None:
+                self.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        return pool
+
+def engine_options(url: str) -> dict:
+    """Connection pool settings from `Settings`; SQLite keeps SQLAlchemy's own pool choice."""
+    options = {"echo": settings.DATABASE_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+def instrument_engine(async_engine: AsyncEngine, name: str):
+    """
+    Records statement timings, errors and pool usage of `async_engine` under the
+    `engine="name"` label, and passes each statement on to the request profile and
+    slow-query log.
+    """
+    sync_engine = async_engine.sync_engine
+    in_use = DB_POOL_CONNECTIONS_IN_USE.labels(name)
+    errors = DB_STATEMENT_ERRORS.labels(name)
+    if isinstance(sync_engine.pool, TimedAsyncAdaptedQueuePool):
+        sync_engine.pool.checkout_wait = DB_POOL_CHECKOUT_WAIT.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+        operation = (statement.split(None, 1) or [""])[0].upper()
+        DB_STATEMENT_DURATION.labels(name, operation if operation in SQL_OPERATIONS else "OTHER").observe(elapsed)
+        record_statement(name, statement, parameters, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        errors.inc()
+        if context.connection is not None and context.connection.info.get("statement_started"):
+            context.connection.info["statement_started"].pop()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use.inc()
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_engine(engine, "primary")
 AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
 
+class Replica:
+    def __init__(self, url: str, name: str):
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine: AsyncEngine = create_async_engine(url, **engine_options(url))
+        instrument_engine(self.engine, name)
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, class_=AsyncSession)
+        self.healthy = True
+        self.checked_at = 0.0
+
+class ReadRouter:
+    """
+    Routes read-only sessions to healthy replicas in turn, and to the primary when
+    there are none (or none is healthy).
+
+    A background task checks every replica each `check_interval` seconds: it must answer
+    `SELECT 1` within `timeout` seconds and, on PostgreSQL, replay the primary's WAL
+    within `max_lag_seconds` (0 skips the lag check). A replica whose connection drops
+    or cannot be opened during a request is taken out of rotation at once, until its
+    next passing check; that request itself still fails.
+    """
+
+    def __init__(self, urls: List[str], check_interval: float, timeout: float, max_lag_seconds: float):
+        self.replicas = [Replica(url, f"replica{number}") for number, url in enumerate(urls, 1)]
+        for replica in self.replicas:
+            self._watch(replica)
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.max_lag_seconds = max_lag_seconds
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def _watch(self, replica: Replica):
+        # Services turn database errors into 500 envelopes, so watch the engine rather than the session
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(replica, context.original_exception)
+        event.listen(replica.engine.sync_engine, "handle_error", on_error)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def mark_unhealthy(self, replica: Replica, reason):
+        if replica.healthy:
+            logger.warning("Read replica %s taken out of rotation: %s", replica.url, reason)
+        replica.healthy = False
+
+    async def _probe(self, replica: Replica):
+        async with replica.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            if self.max_lag_seconds > 0 and conn.dialect.name == "postgresql":
+                # A replica that has replayed everything it received is current, however
+                # long ago the last transaction was
+                lag = (await conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                ))).scalar()
+                if lag > self.max_lag_seconds:
+                    raise RuntimeError(f"replication lag {lag:.1f}s exceeds {self.max_lag_seconds}s")
+
+    async def check(self, replica: Replica):
+        try:
+            await asyncio.wait_for(self._probe(replica), self.timeout)
+        except Exception as e:
+            self.mark_unhealthy(replica, e)
+        else:
+            if not replica.healthy:
+                logger.info("Read replica %s is back in rotation.", replica.url)
+            replica.healthy = True
+        replica.checked_at = time.monotonic()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _run(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> list:
+        return [{"url": replica.url, "healthy": replica.healthy} for replica in self.replicas]
+
+read_router = ReadRouter(
+    urls=[url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+    timeout=settings.REPLICA_HEALTH_CHECK_TIMEOUT,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+)
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+async def get_read_db():
+    """
+    Session for read-only endpoints: a healthy replica when one is configured, else the
+    primary. Replicas lag the primary slightly, so never use this for a read that must
+    see the caller's own write.
+    """
+    replica = read_router.pick()
+    if replica is None:
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+    async with replica.sessionmaker() as session:
+        yield session
+
 # Create all tables
 async def init_db():
     async with engine.begin() as conn:
@@ -9,6 +9,25 @@ class Settings(BaseSettings):
     APP_NAME: str = "Book Management System"
     DEBUG: bool = True
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DATABASE_ECHO: bool = os.getenv("DATABASE_ECHO", "False").lower() == "true"
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    REPLICA_HEALTH_CHECK_SECONDS: float = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+    REPLICA_HEALTH_CHECK_TIMEOUT: float = float(os.getenv("REPLICA_HEALTH_CHECK_TIMEOUT", "2"))
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_SAMPLING: str = os.getenv("LOG_SAMPLING", "")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_MAX_ENTRIES: int = int(os.getenv("PROFILE_MAX_ENTRIES", "100"))
+    PROFILE_TOP_FUNCTIONS: int = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+    SLOW_QUERY_SECONDS: float = float(os.getenv("SLOW_QUERY_SECONDS", "0.5"))
+    SLOW_QUERY_LOG_MAX_ENTRIES: int = int(os.getenv("SLOW_QUERY_LOG_MAX_ENTRIES", "200"))
     JWT_SECRET: str = os.getenv("JWT_SECRET")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM")
     USE_LOCAL_MODEL: bool = os.getenv("USE_LOCAL_MODEL", "False").lower() == "true"
@@ -17,5 +36,55 @@ class Settings(BaseSettings):
     HOSTED_MODEL_API_KEY: str = os.getenv("HOSTED_MODEL_API_KEY")
     HOSTED_MODEL_MODEL: str = os.getenv("HOSTED_MODEL_MODEL")
     HOSTED_MODEL_ENDPOINT: str = os.getenv("HOSTED_MODEL_ENDPOINT")
+    # USE_LOCAL_MODEL only picks the default backend; INFERENCE_BACKEND takes precedence
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "ollama" if USE_LOCAL_MODEL else "hosted")
+    INFERENCE_FALLBACK_BACKENDS: str = os.getenv("INFERENCE_FALLBACK_BACKENDS", "hosted")
+    INFERENCE_STUB_LATENCY: float = float(os.getenv("INFERENCE_STUB_LATENCY", "0.5"))
+    INFERENCE_STUB_JITTER: float = float(os.getenv("INFERENCE_STUB_JITTER", "0"))
+    INFERENCE_STUB_TOKENS: int = int(os.getenv("INFERENCE_STUB_TOKENS", "64"))
+    INFERENCE_STUB_FAILURE_RATE: float = float(os.getenv("INFERENCE_STUB_FAILURE_RATE", "0"))
+    INFERENCE_STUB_SEED: int = int(os.getenv("INFERENCE_STUB_SEED", "0"))
+    BOOKS_PAGE_SIZE: int = int(os.getenv("BOOKS_PAGE_SIZE", "50"))
+    BOOKS_MAX_PAGE_SIZE: int = int(os.getenv("BOOKS_MAX_PAGE_SIZE", "500"))
+    BOOKS_STREAM_BATCH_SIZE: int = int(os.getenv("BOOKS_STREAM_BATCH_SIZE", "1000"))
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_DB_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_DB_TTL_SECONDS", str(30 * 24 * 3600)))
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30"))
+    LLM_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+    LLM_HTTP_READ_TIMEOUT: float = float(os.getenv("LLM_HTTP_READ_TIMEOUT", "120"))
+    LLM_HTTP_WRITE_TIMEOUT: float = float(os.getenv("LLM_HTTP_WRITE_TIMEOUT", "10"))
+    LLM_HTTP_POOL_TIMEOUT: float = float(os.getenv("LLM_HTTP_POOL_TIMEOUT", "10"))
+    AI_JOB_WORKERS: int = int(os.getenv("AI_JOB_WORKERS", "4"))
+    AI_JOB_MAX_WAIT_SECONDS: float = float(os.getenv("AI_JOB_MAX_WAIT_SECONDS", "30"))
+    AI_JOB_STALE_SECONDS: float = float(os.getenv("AI_JOB_STALE_SECONDS", "900"))
+    BULK_SUMMARY_CONCURRENCY: int = int(os.getenv("BULK_SUMMARY_CONCURRENCY", "8"))
+    BULK_SUMMARY_COMMIT_BATCH: int = int(os.getenv("BULK_SUMMARY_COMMIT_BATCH", "100"))
+    HOSTED_MODEL_RATE_LIMIT: float = float(os.getenv("HOSTED_MODEL_RATE_LIMIT", "5"))
+    HOSTED_MODEL_RATE_BURST: float = float(os.getenv("HOSTED_MODEL_RATE_BURST", "10"))
+    HOSTED_MODEL_MIN_RATE: float = float(os.getenv("HOSTED_MODEL_MIN_RATE", "0.5"))
+    HOSTED_MODEL_MAX_RATE: float = float(os.getenv("HOSTED_MODEL_MAX_RATE", "50"))
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_RECOVERY_SECONDS", "30"))
+    AI_RETRY_BUDGET_RATIO: float = float(os.getenv("AI_RETRY_BUDGET_RATIO", "0.2"))
+    AI_RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("AI_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    AI_RETRY_BUDGET_WINDOW_SECONDS: float = float(os.getenv("AI_RETRY_BUDGET_WINDOW_SECONDS", "10"))
+    RECOMMENDATIONS_LIMIT: int = int(os.getenv("RECOMMENDATIONS_LIMIT", "5"))
+    RECOMMENDER_FEATURES: int = int(os.getenv("RECOMMENDER_FEATURES", "2048"))
+    RECOMMENDER_INDEX_TTL_SECONDS: float = float(os.getenv("RECOMMENDER_INDEX_TTL_SECONDS", "300"))
+    RECOMMENDER_RERANK_CANDIDATES: int = int(os.getenv("RECOMMENDER_RERANK_CANDIDATES", "20"))
+    JWT_CACHE_MAX_ENTRIES: int = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+    JWT_CACHE_TTL_SECONDS: float = float(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+    BOOK_IMPORT_BATCH_SIZE: int = int(os.getenv("BOOK_IMPORT_BATCH_SIZE", "1000"))
+    BOOK_CACHE_BACKEND: str = os.getenv("BOOK_CACHE_BACKEND", "memory")
+    BOOK_CACHE_MAX_ENTRIES: int = int(os.getenv("BOOK_CACHE_MAX_ENTRIES", "2048"))
+    BOOK_CACHE_TTL_SECONDS: float = float(os.getenv("BOOK_CACHE_TTL_SECONDS", "300"))
+    BOOK_CACHE_REDIS_URL: str = os.getenv("BOOK_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "auto")
 
 settings = Settings()
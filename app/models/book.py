@@ -1,11 +1,17 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index, DDL, event
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+RATING_VALUES = range(1, 6)
+
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Unique indexes rather than constraints so SQLite can add them without a table rebuild
+        Index("uq_books_title_author", "title", "author", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     author = Column(String)
@@ -13,16 +19,96 @@ class Book(Base):
     year_published = Column(Integer)
     summary = Column(Text)
 
+    # Denormalized rating aggregates, kept current by every review write
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count_5 = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Catalog version of this book's last change (itself, its aggregates or its reviews); drives ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     # Establishing the back_populates relationship
     reviews = relationship("Review", back_populates="book")
 
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+    @property
+    def rating_histogram(self) -> dict:
+        return {str(rating): getattr(self, f"rating_count_{rating}") for rating in RATING_VALUES}
+
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("uq_reviews_book_id_user_id", "book_id", "user_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id"))
-    user_id = Column(Integer)
+    user_id = Column(Integer, index=True)
     review_text = Column(Text)
     rating = Column(Integer)
 
     # Linking back to the Book model
     book = relationship("Book", back_populates="reviews")
+
+# Serves the cold-start recommendations (best-loved books first) without sorting the catalog
+Index("ix_books_rating_sum_id", Book.rating_sum.desc(), Book.id)
+
+# Writers bump one of these counter rows at random, so concurrent writers rarely queue on the same row lock
+CATALOG_VERSION_SLOTS = 16
+
+class CatalogVersion(Base):
+    """
+    Catalog version counters, one row per slot, bumped transactionally by every catalog write.
+    A write takes `version * CATALOG_VERSION_SLOTS + id - 1` of its slot as the `version` of
+    every book it changes, so versions are never reused, even for a book id that SQLite reuses.
+    The sum over all slots is the catalog version, and it only moves when a write commits.
+    """
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+event.listen(
+    CatalogVersion.__table__, "after_create",
+    DDL("INSERT INTO catalog_version (id, version) VALUES "
+        + ", ".join(f"({slot}, 1)" for slot in range(1, CATALOG_VERSION_SLOTS + 1))),
+)
+
+# Full-text search index over title, author, genre and summary. SQLite keeps an FTS5
+# external-content table in sync through triggers; PostgreSQL indexes the weighted
+# tsvector expression below with GIN, so there is nothing to keep in sync.
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, genre, summary, content='books', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author, genre, summary) VALUES (new.id, new.title, new.author, new.genre, new.summary); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author, genre, summary) VALUES ('delete', old.id, old.title, old.author, old.genre, old.summary); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, genre, summary ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author, genre, summary) VALUES ('delete', old.id, old.title, old.author, old.genre, old.summary); "
+    "INSERT INTO books_fts(rowid, title, author, genre, summary) VALUES (new.id, new.title, new.author, new.genre, new.summary); "
+    "END",
+]
+SQLITE_SEARCH_DROP_DDL = ["DROP TABLE IF EXISTS books_fts"]
+
+POSTGRESQL_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(genre, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'D')"
+)
+POSTGRESQL_SEARCH_DDL = [f"CREATE INDEX IF NOT EXISTS ix_books_search ON books USING gin (({POSTGRESQL_SEARCH_DOCUMENT}))"]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in SQLITE_SEARCH_DROP_DDL:
+    event.listen(Book.__table__, "after_drop", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from app.models.book import Base
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_TERMINAL_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JOB_PENDING, index=True)
+    user_id = Column(Integer, index=True)
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)  # naive UTC
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
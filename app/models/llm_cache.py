@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text, DateTime
+from app.models.book import Base
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of backend, model and normalized prompt
+    backend = Column(String, nullable=False)
+    model = Column(String)
+    prompt = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, index=True)  # naive UTC; NULL means the entry never expires
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
-from passlib.hash import bcrypt
 from app.config.database import Base
+from app.utils.password import password_hasher
 
 class User(Base):
     __tablename__ = "users"
@@ -12,8 +12,15 @@ class User(Base):
     password = Column(String, nullable=False)
     role = Column(String, default="user")  # Roles: "user", "admin"
 
-    def verify_password(self, password: str) -> bool:
-        return bcrypt.verify(password, self.password)
+    async def verify_password(self, password: str) -> bool:
+        """
+        Checks `password` off the event loop. A hash made with an outdated bcrypt cost is
+        replaced with one at the configured cost; commit the session to keep it.
+        """
+        verified, new_hash = await password_hasher.verify(password, self.password)
+        if new_hash:
+            self.password = new_hash
+        return verified
 
-    def hash_password(self):
-        self.password = bcrypt.hash(self.password)
+    async def hash_password(self):
+        self.password = await password_hasher.hash(self.password)
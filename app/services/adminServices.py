@@ -0,0 +1,48 @@
+from fastapi import Request
+from app.utils.jwt import fetch_user_by_request
+from app.utils.messages.bookMessages import ADMIN_REQUIRED
+from app.utils.messages.adminMessages import (
+    PROFILES_RETRIEVED_SUCCESS, PROFILE_RETRIEVED_SUCCESS, PROFILE_NOT_FOUND, SLOW_QUERIES_RETRIEVED_SUCCESS
+)
+from app.utils.profiling import profile_store, slow_query_log
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class AdminService:
+    @staticmethod
+    def _forbidden(request: Request, action: str):
+        user = fetch_user_by_request(request)
+        if user.get("role") != "admin":
+            logger.warning("User %s is not allowed to %s.", user.get('user_id'), action)
+            return {"data": None, "status": 403, "message": ADMIN_REQUIRED}
+        return None
+
+    @staticmethod
+    async def list_profiles(request: Request):
+        forbidden = AdminService._forbidden(request, "read request profiles")
+        if forbidden:
+            return forbidden
+        logger.info("Fetching request profiles.")
+        return {"data": profile_store.list(), "status": 200, "message": PROFILES_RETRIEVED_SUCCESS}
+
+    @staticmethod
+    async def get_profile(profile_id: str, request: Request):
+        forbidden = AdminService._forbidden(request, "read request profiles")
+        if forbidden:
+            return forbidden
+        logger.info("Fetching request profile %s.", profile_id)
+        profile = profile_store.get(profile_id)
+        if profile is None:
+            logger.warning("Request profile not found with ID: %s", profile_id)
+            return {"data": None, "status": 404, "message": PROFILE_NOT_FOUND}
+        return {"data": profile.to_dict(), "status": 200, "message": PROFILE_RETRIEVED_SUCCESS}
+
+    @staticmethod
+    async def get_slow_queries(request: Request):
+        forbidden = AdminService._forbidden(request, "read the slow-query log")
+        if forbidden:
+            return forbidden
+        logger.info("Fetching slow-query log.")
+        data = {"threshold_seconds": slow_query_log.threshold, "queries": slow_query_log.list()}
+        return {"data": data, "status": 200, "message": SLOW_QUERIES_RETRIEVED_SUCCESS}
@@ -1,14 +1,34 @@
+import asyncio
+import csv
+import io
+import json
+import random
+import tempfile
+import time
 import tenacity
+from typing import AsyncIterator, List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update, insert, func, case, or_, tuple_
 from sqlalchemy.future import select
-from sqlalchemy.exc import NoResultFound, SQLAlchemyError
+from sqlalchemy.exc import NoResultFound, IntegrityError, SQLAlchemyError
 from fastapi import Request
-from app.models.book import Book, Review
-from app.utils.helper import convert_string_to_json, check_duplicate_book
-from app.utils.ai_inference import InferenceHelper
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.models.book import Book, Review, CatalogVersion, CATALOG_VERSION_SLOTS, RATING_VALUES
+from app.config.settings import settings
+from app.utils.helper import convert_string_to_json, is_unique_violation, encode_cursor, decode_cursor, format_sse, gzip_stream
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag
+from app.utils.book_cache import book_cache, book_cache_keys, book_key, reviews_key
+from app.utils.ai_inference import InferenceHelper, ai_retry_budget
+from app.utils.resilience import CircuitOpenError
+from app.utils.llm_cache import llm_response_cache
+from app.utils.recommender import book_recommender
+from app.utils.search import SEARCH_DIALECTS, search_terms, build_search_query
+from app.utils.book_import import IMPORT_PARSERS
+from app.utils.single_flight import ai_single_flight
 from app.utils.jwt import fetch_user_by_request
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from app.utils.messages.bookMessages import (
     BOOK_CREATED_SUCCESS, BOOK_RETRIEVED_SUCCESS, BOOK_UPDATED_SUCCESS,
     BOOK_DELETED_SUCCESS, BOOK_NOT_FOUND, BOOKS_RETRIEVED_SUCCESS,
@@ -16,13 +36,29 @@ from app.utils.messages.bookMessages import (
     REVIEW_ADDED_SUCCESS, BOOK_SUMMARY_RETRIEVED_SUCCESS,
     SUMMARY_GENERATED_SUCCESS, SUMMARY_GENERATION_FAILED,
     INVALID_REVIEW_INPUT, INVALID_BOOK_INPUT, DATABASE_ERROR, 
-    DUPLICATE_BOOK, DUPLICATE_REVIEW, NO_AI_CONTENT
+    DUPLICATE_BOOK, DUPLICATE_REVIEW, NO_AI_CONTENT, INVALID_CURSOR,
+    INVALID_PAGE_SIZE, REVIEW_UPDATED_SUCCESS, REVIEW_DELETED_SUCCESS,
+    REVIEW_NOT_FOUND, REVIEW_FORBIDDEN, RATING_AGGREGATES_REBUILT,
+    RATING_AGGREGATES_VERIFIED, LLM_CACHE_STATS_RETRIEVED_SUCCESS,
+    LLM_CACHE_PURGED_SUCCESS, ADMIN_REQUIRED, INVALID_BULK_SUMMARY_INPUT,
+    BULK_SUMMARIES_GENERATED_SUCCESS, INVALID_SEARCH_QUERY, SEARCH_NOT_SUPPORTED, SEARCH_RESULTS_RETRIEVED_SUCCESS,
+    UNSUPPORTED_IMPORT_FORMAT, BOOKS_IMPORTED_SUCCESS, UNSUPPORTED_EXPORT_FORMAT,
+    BOOK_CACHE_STATS_RETRIEVED_SUCCESS
 )
 from app.utils.logger import get_logger
 from app.utils.instructions import LLMInstructions
 
 logger = get_logger(__name__)
 
+# Attempts per AI model call in `_call_ai_model_with_retry`, the first one included
+AI_CALL_ATTEMPTS = 3
+
+EXPORT_CSV_COLUMNS = [
+    "book_id", "title", "author", "genre", "year_published", "summary", "review_count", "average_rating",
+    *[f"rating_count_{rating}" for rating in RATING_VALUES],
+    "review_id", "review_user_id", "review_rating", "review_text", "cursor",
+]
+
 class BookService:
     class BookCreate(BaseModel):
         title: str
@@ -38,238 +74,942 @@ class BookService:
         review_text: str
         rating: int
 
+    class BulkSummaryCreate(BaseModel):
+        book_ids: Optional[List[int]] = None
+        missing_only: bool = False
+
     @staticmethod
     async def create_book(book: BookCreate, db: AsyncSession):
-        logger.info(f"Creating book: {book.title}")
+        logger.info("Creating book: %s", book.title)
         if not book.title or not book.author:
             logger.warning("Invalid book input: Missing title or author.")
             return {"data": None, "status": 400, "message": INVALID_BOOK_INPUT}
         try:
-            # Check for duplicate book title and author
-            if await check_duplicate_book(book.title, book.author, db):
-                logger.warning(f"Duplicate book found: {book.title} by {book.author}")
-                return {"data": None, "status": 400, "message": DUPLICATE_BOOK}
-            
-            new_book = Book(**book.model_dump())
-            db.add(new_book)
+            # Duplicates are rejected by the unique (title, author) index, so this is one round trip
+            version = await BookService._bump_catalog_version(db)
+            result = await db.execute(insert(Book).values(**book.model_dump(), version=version).returning(*Book.__table__.c))
+            new_book = dict(result.mappings().one())
             await db.commit()
-            await db.refresh(new_book)
-            logger.info(f"Book created successfully: {new_book}")
+            book_recommender.invalidate(new_book['id'])
+            logger.info("Book created successfully: %s", new_book['id'])
             return {"data": new_book, "status": 201, "message": BOOK_CREATED_SUCCESS}
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e, "books", "title", "author"):
+                logger.warning("Duplicate book found: %s by %s", book.title, book.author)
+                return {"data": None, "status": 400, "message": DUPLICATE_BOOK}
+            logger.error("Database error while creating book: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while creating book: {str(e)}")
+            logger.error("Database error while creating book: %s", e)
             await db.rollback()
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
-    async def list_books(db: AsyncSession):
-        logger.info("Fetching list of books.")
+    async def list_books(db: AsyncSession, limit: int = None, cursor: str = None, if_none_match: str = None):
+        logger.info("Fetching list of books (limit=%s, cursor=%s).", limit, cursor)
+        limit = min(settings.BOOKS_PAGE_SIZE if limit is None else limit, settings.BOOKS_MAX_PAGE_SIZE)
+        if limit < 1:
+            logger.warning("Invalid page size requested: %s", limit)
+            return {"data": None, "status": 400, "message": INVALID_PAGE_SIZE}
         try:
-            result = await db.execute(select(Book))
+            after_id = decode_cursor(cursor) if cursor else 0
+        except ValueError:
+            logger.warning("Invalid pagination cursor: %s", cursor)
+            return {"data": None, "status": 400, "message": INVALID_CURSOR}
+        try:
+            etag = make_etag("catalog", await BookService._catalog_version(db))
+            if etag_matches(if_none_match, etag):
+                logger.info("Book list not modified (%s).", etag)
+                return not_modified(etag)
+            # Keyset pagination: fetch one extra row to know whether another page exists
+            result = await db.execute(
+                select(Book).where(Book.id > after_id).order_by(Book.id).limit(limit + 1)
+            )
             books = result.scalars().all()
-            logger.info(f"Books retrieved successfully: {len(books)} books found.")
-            logger.debug(f"Books data: {books}")
-            return {"data": books, "status": 200, "message": BOOKS_RETRIEVED_SUCCESS}
+            next_cursor = encode_cursor(books[limit - 1].id) if len(books) > limit else None
+            books = books[:limit]
+            logger.info("Books retrieved successfully: %s books found.", len(books))
+            response = {"data": books, "status": 200, "message": BOOKS_RETRIEVED_SUCCESS, "next_cursor": next_cursor}
+            return with_etag(response, etag)
         except SQLAlchemyError as e:
-            logger.error(f"Database error while listing books: {str(e)}")
+            logger.error("Database error while listing books: %s", e)
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
-    async def get_recommendations(request: Request, db: AsyncSession):
-        logger.info("Generating book recommendations.")
+    async def stream_books(db: AsyncSession, cursor: str = None):
+        logger.info("Streaming list of books (cursor=%s).", cursor)
         try:
-            user = fetch_user_by_request(request)
-            logger.debug(f"User fetched from request: {user}")
-            result = await db.execute(select(Book).join(Review).where(Review.user_id == user['user_id'], Review.rating >= 4))
-            highly_rated_books = result.scalars().all()
-            logger.debug(f"Highly rated books by user: {highly_rated_books}")
-            books_for_prompt = ", ".join([f"{book.title} by {book.author}" for book in highly_rated_books]) if highly_rated_books else "none"
-            prompt = LLMInstructions.get_recommendation_prompt(books_for_prompt)
-            content = await InferenceHelper.call_ai_model(prompt)
-            if content is None:
-                logger.warning("AI model returned no content.")
-                return {"data": None, "status": 400, "message": NO_AI_CONTENT}
-            logger.debug(f"AI model response: {content}")
-            recommendations = await convert_string_to_json(content)
-            logger.info("Recommendations generated successfully.")
-            return {"data": recommendations, "status": 200, "message": RECOMMENDATIONS_RETRIEVED_SUCCESS}
+            after_id = decode_cursor(cursor) if cursor else 0
+        except ValueError:
+            logger.warning("Invalid pagination cursor: %s", cursor)
+            return {"data": None, "status": 400, "message": INVALID_CURSOR}
+        return StreamingResponse(BookService._iter_books_ndjson(db, after_id), media_type="application/x-ndjson")
+
+    @staticmethod
+    async def search_books(db: AsyncSession, query: str, limit: int = None, cursor: str = None):
+        """
+        Ranked full-text search over title, author, genre and summary, backed by FTS5 on
+        SQLite and a GIN-indexed tsvector on PostgreSQL. The index is maintained by the
+        database itself, so create_book, update_book and delete_book are always reflected.
+        """
+        logger.info("Searching books for: %s (limit=%s, cursor=%s).", query, limit, cursor)
+        if db.bind.dialect.name not in SEARCH_DIALECTS:
+            logger.error("Full-text search is not supported on %s.", db.bind.dialect.name)
+            return {"data": None, "status": 501, "message": SEARCH_NOT_SUPPORTED}
+        limit = min(settings.BOOKS_PAGE_SIZE if limit is None else limit, settings.BOOKS_MAX_PAGE_SIZE)
+        if limit < 1:
+            logger.warning("Invalid page size requested: %s", limit)
+            return {"data": None, "status": 400, "message": INVALID_PAGE_SIZE}
+        terms = search_terms(query)
+        if not terms:
+            logger.warning("Invalid search query: %s", query)
+            return {"data": None, "status": 400, "message": INVALID_SEARCH_QUERY}
+        try:
+            # Ranked results have no stable key to seek on, so the cursor carries an offset
+            offset = decode_cursor(cursor, key="offset") if cursor else 0
+        except ValueError:
+            logger.warning("Invalid pagination cursor: %s", cursor)
+            return {"data": None, "status": 400, "message": INVALID_CURSOR}
+        try:
+            stmt = build_search_query(db.bind.dialect.name, terms).offset(offset).limit(limit + 1)
+            rows = (await db.execute(stmt)).all()
+            next_cursor = encode_cursor(offset + limit, key="offset") if len(rows) > limit else None
+            results = [{**jsonable_encoder(book), "score": float(score)} for book, score in rows[:limit]]
+            logger.info("Search returned %s books.", len(results))
+            return {"data": results, "status": 200, "message": SEARCH_RESULTS_RETRIEVED_SUCCESS, "next_cursor": next_cursor}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while generating recommendations: {str(e)}")
+            logger.error("Database error while searching books: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+
+    @staticmethod
+    async def export_books(db: AsyncSession, file_format: str = "ndjson", cursor: str = None):
+        """
+        Streams every book (after `cursor`) with its reviews and rating aggregates as a gzip
+        compressed NDJSON or CSV file. NDJSON has one book per line with a `reviews` list;
+        CSV has one row per review, repeating the book columns (books without reviews get one
+        row with empty review columns). Every record carries the `cursor` that resumes the
+        export after its book. A failed export ends with a truncated gzip stream.
+        """
+        logger.info("Exporting books as %s (cursor=%s).", file_format, cursor)
+        if file_format not in ("ndjson", "csv"):
+            logger.warning("Unsupported export format: %s", file_format)
+            return {"data": None, "status": 400, "message": UNSUPPORTED_EXPORT_FORMAT}
+        try:
+            after_id = decode_cursor(cursor) if cursor else 0
+        except ValueError:
+            logger.warning("Invalid pagination cursor: %s", cursor)
+            return {"data": None, "status": 400, "message": INVALID_CURSOR}
+        lines = BookService._iter_export_lines(db, file_format, after_id)
+        headers = {"Content-Disposition": f'attachment; filename="books.{file_format}.gz"'}
+        return StreamingResponse(gzip_stream(lines), media_type="application/gzip", headers=headers)
+
+    @staticmethod
+    async def get_recommendations(request: Request, db: AsyncSession, rerank: bool = False):
+        user = fetch_user_by_request(request)
+        logger.debug("User fetched from request: %s", user)
+        return await BookService.recommend_for_user(user['user_id'], db, rerank)
+
+    @staticmethod
+    async def recommend_for_user(user_id: int, db: AsyncSession, rerank: bool = False):
+        """
+        Recommends catalog books using the local vector index. With `rerank` the AI model
+        re-orders the top candidates and explains each pick; if that call fails the local
+        ranking is returned unchanged.
+        """
+        logger.info("Generating book recommendations for user ID: %s (rerank=%s)", user_id, rerank)
+        try:
+            liked_books, candidates = await BookService._recommendation_candidates(user_id, db, rerank)
+            source = "local"
+            if rerank and candidates:
+                try:
+                    prompt = BookService._recommendation_rerank_prompt(liked_books, candidates)
+                    content, _ = await BookService._call_ai_model_cached(prompt, InferenceHelper.call_ai_model, db)
+                    if content is None:
+                        raise ValueError(NO_AI_CONTENT)
+                    candidates = BookService._apply_rerank(candidates, await convert_string_to_json(content))
+                    source = "reranked"
+                except Exception as e:
+                    logger.warning("Re-ranking recommendations failed, keeping local order: %s", e)
+            recommendations = candidates[:settings.RECOMMENDATIONS_LIMIT]
+            logger.info("Recommendations generated successfully: %s books (%s).", len(recommendations), source)
+            return {"data": {"recommendations": recommendations, "source": source}, "status": 200, "message": RECOMMENDATIONS_RETRIEVED_SUCCESS}
+        except SQLAlchemyError as e:
+            logger.error("Database error while generating recommendations: %s", e)
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
         except Exception as e:
-            logger.error(f"Error generating recommendations: {str(e)}")
+            logger.error("Error generating recommendations: %s", e)
             return {"data": None, "status": 500, "message": f"Error generating recommendations: {str(e)}"}
 
     @staticmethod
-    async def get_book(book_id: int, db: AsyncSession):
-        logger.info(f"Fetching book with ID: {book_id}")
+    async def get_book(book_id: int, db: AsyncSession, if_none_match: str = None):
+        logger.info("Fetching book with ID: %s", book_id)
         try:
-            result = await db.execute(select(Book).where(Book.id == book_id))
-            book = result.scalar_one()
-            logger.info(f"Book retrieved successfully: {book}")
-            return {"data": book, "status": 200, "message": BOOK_RETRIEVED_SUCCESS}
-        except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
+            book = await book_cache.get_or_load(book_key(book_id), lambda: BookService._load_book(book_id, db))
+        except SQLAlchemyError as e:
+            logger.error("Database error while fetching book: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        if book is None:
+            logger.warning("Book not found with ID: %s", book_id)
             return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+        etag = make_etag("book", book["id"], book["version"])
+        if etag_matches(if_none_match, etag):
+            logger.info("Book not modified: %s (%s)", book_id, etag)
+            return not_modified(etag)
+        logger.info("Book retrieved successfully: %s", book_id)
+        return with_etag({"data": book, "status": 200, "message": BOOK_RETRIEVED_SUCCESS}, etag)
 
     @staticmethod
     async def update_book(book_id: int, book: BookCreate, db: AsyncSession):
-        logger.info(f"Updating book with ID: {book_id}")
+        logger.info("Updating book with ID: %s", book_id)
         if not book.title or not book.author:
             logger.warning("Invalid book input: Missing title or author.")
             return {"data": None, "status": 400, "message": INVALID_BOOK_INPUT}
         try:
-            result = await db.execute(select(Book).where(Book.id == book_id))
-            existing_book = result.scalar_one()
-            logger.debug(f"Existing book data: {existing_book}")
-            # Check for duplicate book title and author
-            if await check_duplicate_book(book.title, book.author, db, exclude_book_id=book_id):
-                logger.warning(f"Duplicate book found: {book.title} by {book.author}")
-                return {"data": None, "status": 400, "message": DUPLICATE_BOOK}
-
-            for key, value in book.model_dump().items():
-                setattr(existing_book, key, value)
-            db.add(existing_book)
+            result = await db.execute(
+                update(Book).where(Book.id == book_id)
+                .values(**book.model_dump(), version=await BookService._bump_catalog_version(db))
+                .returning(*Book.__table__.c)
+            )
+            updated_book = result.mappings().one_or_none()
+            if updated_book is None:
+                logger.warning("Book not found with ID: %s", book_id)
+                await db.rollback()
+                return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+            updated_book = dict(updated_book)
             await db.commit()
-            await db.refresh(existing_book)
-            logger.info(f"Book updated successfully: {existing_book}")
-            return {"data": existing_book, "status": 200, "message": BOOK_UPDATED_SUCCESS}
-        except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
-            return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+            await book_cache.invalidate(*book_cache_keys(book_id))
+            book_recommender.invalidate(book_id)
+            logger.info("Book updated successfully: %s", book_id)
+            return {"data": updated_book, "status": 200, "message": BOOK_UPDATED_SUCCESS}
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e, "books", "title", "author"):
+                logger.warning("Duplicate book found: %s by %s", book.title, book.author)
+                return {"data": None, "status": 400, "message": DUPLICATE_BOOK}
+            logger.error("Database error while updating book: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while updating book: {str(e)}")
+            logger.error("Database error while updating book: %s", e)
             await db.rollback()
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
     async def delete_book(book_id: int, db: AsyncSession):
-        logger.info(f"Deleting book with ID: {book_id}")
+        logger.info("Deleting book with ID: %s", book_id)
         try:
             result = await db.execute(select(Book).where(Book.id == book_id))
             book = result.scalar_one()
-            logger.debug(f"Book to be deleted: {book}")
+            logger.debug("Book to be deleted: %s", book)
             await db.delete(book)
+            await BookService._bump_catalog_version(db)
             await db.commit()
-            logger.info(f"Book deleted successfully with ID: {book_id}")
+            await book_cache.invalidate(*book_cache_keys(book_id))
+            book_recommender.invalidate(book_id)
+            logger.info("Book deleted successfully with ID: %s", book_id)
             return {"data": None, "status": 200, "message": BOOK_DELETED_SUCCESS}
         except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
+            logger.warning("Book not found with ID: %s", book_id)
             return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while deleting book: {str(e)}")
+            logger.error("Database error while deleting book: %s", e)
             await db.rollback()
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
     async def add_review(book_id: int, review: ReviewCreate, request: Request, db: AsyncSession):
-        logger.info(f"Adding review for book ID: {book_id}")
+        logger.info("Adding review for book ID: %s", book_id)
+        if not review.review_text or not (1 <= review.rating <= 5):
+            logger.warning("Invalid review input: Missing review text or rating out of range.")
+            return {"data": None, "status": 400, "message": INVALID_REVIEW_INPUT}
+        user = fetch_user_by_request(request)
+        logger.debug("User fetched from request: %s", user)
+        try:
+            # Bumping the aggregates first doubles as the existence check for the book
+            result = await db.execute(
+                update(Book).where(Book.id == book_id).values(
+                    **BookService._rating_aggregate_values(added=review.rating),
+                    version=await BookService._bump_catalog_version(db),
+                )
+            )
+            if result.rowcount == 0:
+                logger.warning("Book not found with ID: %s", book_id)
+                await db.rollback()
+                return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+            # A second review by the same user hits the unique (book_id, user_id) index and rolls back both writes
+            review_data = {"book_id": book_id, "user_id": user['user_id'], **review.model_dump()}
+            result = await db.execute(insert(Review).values(**review_data).returning(Review.id))
+            new_review = {"id": result.scalar_one(), **review_data}
+            await db.commit()
+            await book_cache.invalidate(*book_cache_keys(book_id))
+            logger.info("Review added successfully: %s", new_review['id'])
+            return {"data": new_review, "status": 201, "message": REVIEW_ADDED_SUCCESS}
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e, "reviews", "book_id", "user_id"):
+                logger.warning("User %s has already reviewed book ID: %s", user['user_id'], book_id)
+                return {"data": None, "status": 400, "message": DUPLICATE_REVIEW}
+            logger.error("Database error while adding review: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        except SQLAlchemyError as e:
+            logger.error("Database error while adding review: %s", e)
+            await db.rollback()
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+
+    @staticmethod
+    async def update_review(book_id: int, review_id: int, review: ReviewCreate, request: Request, db: AsyncSession):
+        logger.info("Updating review ID: %s for book ID: %s", review_id, book_id)
         if not review.review_text or not (1 <= review.rating <= 5):
             logger.warning("Invalid review input: Missing review text or rating out of range.")
             return {"data": None, "status": 400, "message": INVALID_REVIEW_INPUT}
         try:
-            book_obj = await db.execute(select(Book).where(Book.id == book_id))
-            book_obj.scalar_one()
-            logger.debug(f"Book object for review: {book_obj}")
+            user = fetch_user_by_request(request)
+            result = await db.execute(select(Review).where(Review.id == review_id, Review.book_id == book_id))
+            existing_review = result.scalar_one()
+            if existing_review.user_id != user['user_id']:
+                logger.warning("User %s is not allowed to modify review ID: %s", user['user_id'], review_id)
+                return {"data": None, "status": 403, "message": REVIEW_FORBIDDEN}
+            old_rating = existing_review.rating
+            existing_review.review_text = review.review_text
+            existing_review.rating = review.rating
+            await db.execute(
+                update(Book).where(Book.id == book_id)
+                .values(
+                    **BookService._rating_aggregate_values(added=review.rating, removed=old_rating),
+                    version=await BookService._bump_catalog_version(db),
+                )
+            )
+            await db.commit()
+            await book_cache.invalidate(*book_cache_keys(book_id))
+            await db.refresh(existing_review)
+            logger.info("Review updated successfully: %s", existing_review)
+            return {"data": existing_review, "status": 200, "message": REVIEW_UPDATED_SUCCESS}
         except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
-            return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+            logger.warning("Review not found with ID: %s", review_id)
+            return {"data": None, "status": 404, "message": REVIEW_NOT_FOUND}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while fetching book for review: {str(e)}")
+            logger.error("Database error while updating review: %s", e)
+            await db.rollback()
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+
+    @staticmethod
+    async def delete_review(book_id: int, review_id: int, request: Request, db: AsyncSession):
+        logger.info("Deleting review ID: %s for book ID: %s", review_id, book_id)
         try:
             user = fetch_user_by_request(request)
-            logger.debug(f"User fetched from request: {user}")
-            
-            # Check if the user has already reviewed this book
-            existing_review = await db.execute(
-                select(Review).where(Review.book_id == book_id, Review.user_id == user['user_id'])
+            result = await db.execute(select(Review).where(Review.id == review_id, Review.book_id == book_id))
+            existing_review = result.scalar_one()
+            if existing_review.user_id != user['user_id']:
+                logger.warning("User %s is not allowed to delete review ID: %s", user['user_id'], review_id)
+                return {"data": None, "status": 403, "message": REVIEW_FORBIDDEN}
+            await db.delete(existing_review)
+            await db.execute(
+                update(Book).where(Book.id == book_id)
+                .values(
+                    **BookService._rating_aggregate_values(removed=existing_review.rating),
+                    version=await BookService._bump_catalog_version(db),
+                )
             )
-            if existing_review.scalar():
-                logger.warning(f"User {user['user_id']} has already reviewed book ID: {book_id}")
-                return {"data": None, "status": 400, "message": DUPLICATE_REVIEW}
-            
-            review_data = review.model_dump()
-            review_data['user_id'] = user['user_id']
-            new_review = Review(book_id=book_id, **review_data)
-            db.add(new_review)
             await db.commit()
-            await db.refresh(new_review)
-            logger.info(f"Review added successfully: {new_review}")
-            return {"data": new_review, "status": 201, "message": REVIEW_ADDED_SUCCESS}
+            await book_cache.invalidate(*book_cache_keys(book_id))
+            logger.info("Review deleted successfully with ID: %s", review_id)
+            return {"data": None, "status": 200, "message": REVIEW_DELETED_SUCCESS}
+        except NoResultFound:
+            logger.warning("Review not found with ID: %s", review_id)
+            return {"data": None, "status": 404, "message": REVIEW_NOT_FOUND}
         except SQLAlchemyError as e:
-            logger.error(f"Database error while adding review: {str(e)}")
+            logger.error("Database error while deleting review: %s", e)
             await db.rollback()
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
-    async def get_reviews(book_id: int, db: AsyncSession):
-        logger.info(f"Fetching reviews for book ID: {book_id}")
+    async def get_reviews(book_id: int, db: AsyncSession, if_none_match: str = None):
+        logger.info("Fetching reviews for book ID: %s", book_id)
         try:
-            result = await db.execute(select(Review).where(Review.book_id == book_id))
-            reviews = result.scalars().all()
-            logger.info(f"Reviews retrieved successfully: {len(reviews)} reviews found.")
-            return {"data": reviews, "status": 200, "message": REVIEWS_RETRIEVED_SUCCESS}
+            entry = await book_cache.get_or_load(reviews_key(book_id), lambda: BookService._load_reviews(book_id, db))
+            if entry is None:
+                logger.info("Reviews retrieved successfully: 0 reviews found.")
+                return {"data": [], "status": 200, "message": REVIEWS_RETRIEVED_SUCCESS}
+            etag = make_etag("book", book_id, entry["version"])
+            if etag_matches(if_none_match, etag):
+                logger.info("Reviews not modified for book ID: %s (%s)", book_id, etag)
+                return not_modified(etag)
+            logger.info("Reviews retrieved successfully: %s reviews found.", len(entry['reviews']))
+            return with_etag({"data": entry["reviews"], "status": 200, "message": REVIEWS_RETRIEVED_SUCCESS}, etag)
         except SQLAlchemyError as e:
-            logger.error(f"Database error while fetching reviews: {str(e)}")
+            logger.error("Database error while fetching reviews: %s", e)
             return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
-    async def get_book_summary(book_id: int, db: AsyncSession):
-        logger.info(f"Fetching summary for book ID: {book_id}")
+    async def get_book_summary(book_id: int, db: AsyncSession, if_none_match: str = None):
+        logger.info("Fetching summary for book ID: %s", book_id)
         try:
-            result = await db.execute(select(Book).where(Book.id == book_id))
-            book = result.scalar_one()
-            logger.info(f"Book retrieved successfully: {book}")
-        except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
+            cached = await book_cache.get_or_load(book_key(book_id), lambda: BookService._load_book(book_id, db))
+        except SQLAlchemyError as e:
+            logger.error("Database error while fetching book summary: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        if cached is None:
+            logger.warning("Book not found with ID: %s", book_id)
             return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
-        reviews_result = await db.execute(select(Review).where(Review.book_id == book_id))
-        reviews = reviews_result.scalars().all()
-        avg_rating = sum([review.rating for review in reviews]) / len(reviews) if reviews else 0
+        # A transient Book gives the cached row its rating properties
+        book = Book(**cached)
+        etag = make_etag("book", book.id, book.version)
+        if etag_matches(if_none_match, etag):
+            logger.info("Summary not modified for book ID: %s (%s)", book_id, etag)
+            return not_modified(etag)
         data = {
             "title": book.title,
             "author": book.author,
             "summary": book.summary,
-            "average_rating": avg_rating,
-            "total_reviews": len(reviews),
+            "average_rating": book.average_rating,
+            "total_reviews": book.review_count,
+            "rating_histogram": book.rating_histogram,
         }
-        logger.info(f"Summary retrieved successfully for book ID: {book_id}")
-        return {"data": data, "status": 200, "message": BOOK_SUMMARY_RETRIEVED_SUCCESS}
+        logger.info("Summary retrieved successfully for book ID: %s", book_id)
+        return with_etag({"data": data, "status": 200, "message": BOOK_SUMMARY_RETRIEVED_SUCCESS}, etag)
+
+    @staticmethod
+    async def rebuild_rating_aggregates(db: AsyncSession, verify_only: bool = False):
+        """
+        Recomputes the denormalized rating aggregates on `books` from the `reviews` table.
+
+        Args:
+            db (AsyncSession): The database session.
+            verify_only (bool, optional): Only report drifted books without fixing them. Defaults to False.
+
+        Returns:
+            dict: A dictionary containing the number of books checked and the ids that drifted.
+        """
+        logger.info("Rebuilding rating aggregates (verify_only=%s).", verify_only)
+        aggregate_columns = ["review_count", "rating_sum"] + [f"rating_count_{rating}" for rating in RATING_VALUES]
+        try:
+            result = await db.execute(
+                select(
+                    Review.book_id,
+                    func.count(Review.id),
+                    func.coalesce(func.sum(Review.rating), 0),
+                    *[func.sum(case((Review.rating == rating, 1), else_=0)) for rating in RATING_VALUES],
+                ).group_by(Review.book_id)
+            )
+            expected = {row[0]: tuple(row[1:]) for row in result.all()}
+            empty = tuple(0 for _ in aggregate_columns)
+
+            result = await db.execute(select(Book.id, *[getattr(Book, column) for column in aggregate_columns]))
+            drifted = []
+            checked = 0
+            for row in result.all():
+                checked += 1
+                actual = tuple(row[1:])
+                wanted = expected.get(row[0], empty)
+                if actual != wanted:
+                    drifted.append({"id": row[0], **dict(zip(aggregate_columns, wanted))})
+
+            if drifted and not verify_only:
+                version = await BookService._bump_catalog_version(db)
+                await db.execute(update(Book), [{**book, "version": version} for book in drifted])
+                await db.commit()
+                await book_cache.invalidate(*book_cache_keys(*(book["id"] for book in drifted)))
+            message = RATING_AGGREGATES_VERIFIED if verify_only else RATING_AGGREGATES_REBUILT
+            logger.info("%s: %s books checked, %s drifted.", message, checked, len(drifted))
+            data = {"checked": checked, "drifted": [book["id"] for book in drifted], "fixed": bool(drifted) and not verify_only}
+            return {"data": data, "status": 200, "message": message}
+        except SQLAlchemyError as e:
+            logger.error("Database error while rebuilding rating aggregates: %s", e)
+            await db.rollback()
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
 
     @staticmethod
-    async def generate_summary(content: SummaryCreate):
+    async def generate_summary(content: SummaryCreate, db: AsyncSession = None, use_cache: bool = True, purge_cache: bool = False):
         logger.info("Generating summary for provided content.")
         prompt = LLMInstructions.get_content_summary_prompt(content.content)
-        summary = await InferenceHelper.call_ai_model(prompt)
+        try:
+            summary, cached = await BookService._call_ai_model_cached(
+                prompt, InferenceHelper.call_ai_model, db, use_cache=use_cache, purge_cache=purge_cache
+            )
+        except Exception as e:
+            logger.error("Error generating summary: %s", e)
+            return {"data": {"content": content.content, "summary": None}, "status": 500, "message": f"Error generating summary: {e}"}
         if summary is None:
             logger.warning(SUMMARY_GENERATION_FAILED)
-            return {"data": {"content": content.content, "summary": summary}, "status": 400, "message": SUMMARY_GENERATION_FAILED}
+            return {"data": {"content": content.content, "summary": summary, "cached": cached}, "status": 400, "message": SUMMARY_GENERATION_FAILED}
         logger.info(SUMMARY_GENERATED_SUCCESS)
-        return {"data": {"content": content.content, "summary": summary}, "status": 200, "message": SUMMARY_GENERATED_SUCCESS}
+        return {"data": {"content": content.content, "summary": summary, "cached": cached}, "status": 200, "message": SUMMARY_GENERATED_SUCCESS}
 
     @staticmethod
-    async def generate_summary_by_book_id(book_id: int, db: AsyncSession):
-        logger.info(f"Generating summary for book ID: {book_id}")
+    async def generate_summary_by_book_id(book_id: int, db: AsyncSession, use_cache: bool = True, purge_cache: bool = False):
+        logger.info("Generating summary for book ID: %s", book_id)
         try:
             result = await db.execute(select(Book).where(Book.id == book_id))
             book = result.scalar_one()
-            logger.info(f"Book retrieved successfully: {book}")
+            logger.info("Book retrieved successfully: %s", book)
         except NoResultFound:
-            logger.warning(f"Book not found with ID: {book_id}")
+            logger.warning("Book not found with ID: %s", book_id)
             return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
         prompt = LLMInstructions.get_summary_book_id_prompt(book.title, book.author)
-        return await BookService._generate_summary(prompt, "book_id", identifier=book_id)
+        return await BookService._generate_summary(
+            prompt, "book_id", identifier=book_id, db=db, use_cache=use_cache, purge_cache=purge_cache
+        )
 
     @staticmethod
-    async def generate_summary_by_book_name(book_name: str):
+    async def generate_summary_by_book_name(book_name: str, db: AsyncSession = None, use_cache: bool = True, purge_cache: bool = False):
         prompt = LLMInstructions.get_summary_book_name_prompt(book_name)
-        return await BookService._generate_summary(prompt, "book_name", identifier=book_name)
-    
+        return await BookService._generate_summary(
+            prompt, "book_name", identifier=book_name, db=db, use_cache=use_cache, purge_cache=purge_cache
+        )
+
+    @staticmethod
+    async def bulk_generate_summaries(bulk_request: BulkSummaryCreate, db: AsyncSession, request: Request = None):
+        """
+        Generates summaries for many books with bounded concurrency and writes them to
+        `Book.summary` in batched commits.
+
+        Args:
+            bulk_request (BulkSummaryCreate): Explicit book ids, or `missing_only` for every book without a summary.
+            db (AsyncSession): The database session.
+            request (Request): The API request, whose user must be an admin. Jobs pass none;
+                they were checked when submitted.
+
+        Returns:
+            dict: Per-book results and throughput statistics.
+        """
+        if request is not None:
+            user = fetch_user_by_request(request)
+            if user.get("role") != "admin":
+                logger.warning("User %s is not allowed to bulk generate summaries.", user.get('user_id'))
+                return {"data": None, "status": 403, "message": ADMIN_REQUIRED}
+        logger.info("Bulk generating summaries (book_ids=%s, missing_only=%s).", bulk_request.book_ids, bulk_request.missing_only)
+        if not bulk_request.book_ids and not bulk_request.missing_only:
+            logger.warning("Bulk summary request without book ids or missing_only.")
+            return {"data": None, "status": 400, "message": INVALID_BULK_SUMMARY_INPUT}
+        started = time.monotonic()
+        query = select(Book.id, Book.title, Book.author).order_by(Book.id)
+        if bulk_request.book_ids:
+            query = query.where(Book.id.in_(bulk_request.book_ids))
+        if bulk_request.missing_only:
+            query = query.where(or_(Book.summary.is_(None), Book.summary == ""))
+        try:
+            books = (await db.execute(query)).all()
+        except SQLAlchemyError as e:
+            logger.error("Database error while selecting books for bulk summaries: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+
+        found_ids = {book.id for book in books}
+        items = [{"book_id": book_id, "status": "failed", "error": BOOK_NOT_FOUND}
+                 for book_id in dict.fromkeys(bulk_request.book_ids or []) if book_id not in found_ids]
+
+        async def generate(book):
+            prompt = LLMInstructions.get_summary_book_id_prompt(book.title, book.author)
+            try:
+                # Memory-tier cache only: the session is reserved for the batched writes below
+                summary, _ = await BookService._call_ai_model_cached(prompt, BookService._call_ai_model_with_retry)
+                return book.id, summary, None if summary else SUMMARY_GENERATION_FAILED
+            except Exception as e:
+                return book.id, None, str(e)
+
+        batch, commits = [], 0
+        async def flush():
+            nonlocal batch, commits
+            if batch:
+                version = await BookService._bump_catalog_version(db)
+                await db.execute(update(Book), [{**item, "version": version} for item in batch])
+                await db.commit()
+                await book_cache.invalidate(*book_cache_keys(*(item["id"] for item in batch)))
+                book_recommender.invalidate(*(item["id"] for item in batch))
+                commits += 1
+                logger.info("Committed %s generated summaries.", len(batch))
+                batch = []
+
+        in_flight = set()
+        try:
+            remaining = iter(books)
+            while True:
+                # Keep at most BULK_SUMMARY_CONCURRENCY model calls running at any time
+                for book in remaining:
+                    in_flight.add(asyncio.ensure_future(generate(book)))
+                    if len(in_flight) >= settings.BULK_SUMMARY_CONCURRENCY:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    book_id, summary, error = task.result()
+                    if error:
+                        items.append({"book_id": book_id, "status": "failed", "error": error})
+                        continue
+                    batch.append({"id": book_id, "summary": summary})
+                    items.append({"book_id": book_id, "status": "succeeded", "error": None})
+                if len(batch) >= settings.BULK_SUMMARY_COMMIT_BATCH:
+                    await flush()
+            await flush()
+        except SQLAlchemyError as e:
+            logger.error("Database error while saving bulk summaries: %s", e)
+            await db.rollback()
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        finally:
+            # Also reached when the client disconnects and the request is cancelled
+            for task in in_flight:
+                task.cancel()
+
+        items.sort(key=lambda item: item["book_id"])
+        elapsed = time.monotonic() - started
+        succeeded = sum(1 for item in items if item["status"] == "succeeded")
+        stats = {
+            "requested": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "commits": commits,
+            "elapsed_seconds": round(elapsed, 3),
+            "summaries_per_second": round(succeeded / elapsed, 3) if elapsed else 0.0,
+        }
+        logger.info("Bulk summaries finished: %s", stats)
+        return {"data": {"items": items, "stats": stats}, "status": 200, "message": BULK_SUMMARIES_GENERATED_SUCCESS}
+
+    @staticmethod
+    async def import_books(chunks: AsyncIterator[bytes], file_format: str, db: AsyncSession, report):
+        """
+        Imports books from a CSV or JSONL byte stream in batches of BOOK_IMPORT_BATCH_SIZE rows.
+        Each batch costs one duplicate lookup on (title, author), one multi-row insert and one commit.
+
+        Args:
+            chunks (AsyncIterator[bytes]): The raw input, in chunks of any size.
+            file_format (str): 'csv' (with a header row) or 'jsonl'.
+            db (AsyncSession): The database session.
+            report: Writable text file that receives one NDJSON line per input row, with the
+                row number and a status of 'created', 'duplicate', 'invalid' or 'failed'.
+
+        Returns:
+            dict: Row counts per status and the import throughput.
+        """
+        logger.info("Importing books (%s).", file_format)
+        parse = IMPORT_PARSERS.get(file_format)
+        if parse is None:
+            logger.warning("Unsupported import format: %s", file_format)
+            return {"data": None, "status": 400, "message": UNSUPPORTED_IMPORT_FORMAT}
+        started = time.perf_counter()
+        counts = {"rows": 0, "created": 0, "duplicate": 0, "invalid": 0, "failed": 0, "batches": 0}
+        batch = []
+        # Rows rejected while the current batch fills up; reported with it to keep row order
+        invalid = []
+
+        async def flush():
+            nonlocal batch, invalid
+            entries = invalid
+            if batch:
+                entries = entries + await BookService._import_batch(batch, db)
+                counts["batches"] += 1
+            for entry in sorted(entries, key=lambda entry: entry["row"]):
+                counts["rows"] += 1
+                counts[entry["status"]] += 1
+                report.write(json.dumps(entry) + "\n")
+            batch, invalid = [], []
+
+        async for row_number, values, error in parse(chunks):
+            if error is None:
+                try:
+                    book = BookService.BookCreate(**values)
+                    if not book.title or not book.author:
+                        error = INVALID_BOOK_INPUT
+                except ValidationError as e:
+                    error = "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in e.errors())
+            if error is not None:
+                invalid.append({"row": row_number, "status": "invalid", "error": error})
+            else:
+                batch.append((row_number, book))
+            if len(batch) + len(invalid) >= settings.BOOK_IMPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+
+        elapsed = time.perf_counter() - started
+        stats = {**counts, "elapsed_seconds": round(elapsed, 3), "rows_per_second": round(counts["rows"] / elapsed, 1) if elapsed else None}
+        logger.info("Book import finished: %s", stats)
+        return {"data": stats, "status": 200, "message": BOOKS_IMPORTED_SUCCESS}
+
+    @staticmethod
+    async def import_books_report(chunks: AsyncIterator[bytes], file_format: str, db: AsyncSession):
+        """
+        Runs `import_books` and streams the per-row report back as NDJSON, followed by a final
+        line with the usual response envelope. The report is spooled to disk once it grows,
+        so large imports do not hold it in memory.
+        """
+        report = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+", encoding="utf-8")
+        try:
+            response = await BookService.import_books(chunks, file_format, db, report)
+        except Exception:
+            report.close()
+            raise
+        if response["status"] != 200:
+            report.close()
+            return response
+        report.seek(0)
+        return StreamingResponse(BookService._iter_import_report(report, response), media_type="application/x-ndjson")
+
+    @staticmethod
+    async def get_llm_cache_stats():
+        logger.info("Fetching LLM response cache statistics.")
+        return {"data": llm_response_cache.stats(), "status": 200, "message": LLM_CACHE_STATS_RETRIEVED_SUCCESS}
+
+    @staticmethod
+    async def get_book_cache_stats():
+        logger.info("Fetching book cache statistics.")
+        return {"data": book_cache.stats(), "status": 200, "message": BOOK_CACHE_STATS_RETRIEVED_SUCCESS}
+
+    @staticmethod
+    async def purge_llm_cache(request: Request, db: AsyncSession):
+        user = fetch_user_by_request(request)
+        if user.get("role") != "admin":
+            logger.warning("User %s is not allowed to purge the LLM cache.", user.get('user_id'))
+            return {"data": None, "status": 403, "message": ADMIN_REQUIRED}
+        logger.info("Purging the LLM response cache.")
+        removed = await llm_response_cache.purge(db=db)
+        logger.info("LLM response cache purged: %s stored entries removed.", removed)
+        return {"data": {"removed": removed}, "status": 200, "message": LLM_CACHE_PURGED_SUCCESS}
+
+    @staticmethod
+    async def stream_summary(content: SummaryCreate, db: AsyncSession = None, use_cache: bool = True):
+        logger.info("Streaming summary for provided content.")
+        prompt = LLMInstructions.get_content_summary_prompt(content.content)
+        return BookService._sse_response(BookService._iter_summary_sse(prompt, db, use_cache))
+
+    @staticmethod
+    async def stream_summary_by_book_id(book_id: int, db: AsyncSession, use_cache: bool = True):
+        logger.info("Streaming summary for book ID: %s", book_id)
+        try:
+            result = await db.execute(select(Book).where(Book.id == book_id))
+            book = result.scalar_one()
+        except NoResultFound:
+            logger.warning("Book not found with ID: %s", book_id)
+            return {"data": None, "status": 404, "message": BOOK_NOT_FOUND}
+        prompt = LLMInstructions.get_summary_book_id_prompt(book.title, book.author)
+        return BookService._sse_response(BookService._iter_summary_sse(prompt, db, use_cache))
+
+    @staticmethod
+    async def stream_summary_by_book_name(book_name: str, db: AsyncSession = None, use_cache: bool = True):
+        logger.info("Streaming summary for book name: %s", book_name)
+        prompt = LLMInstructions.get_summary_book_name_prompt(book_name)
+        return BookService._sse_response(BookService._iter_summary_sse(prompt, db, use_cache))
+
+    @staticmethod
+    async def stream_recommendations(request: Request, db: AsyncSession):
+        logger.info("Streaming book recommendations.")
+        try:
+            user = fetch_user_by_request(request)
+            liked_books, candidates = await BookService._recommendation_candidates(user['user_id'], db, rerank=True)
+        except SQLAlchemyError as e:
+            logger.error("Database error while generating recommendations: %s", e)
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        return BookService._sse_response(BookService._iter_recommendations_sse(liked_books, candidates))
+
     # helper functions
 
     @staticmethod
-    async def _generate_summary(prompt: str, identifier_type: str, identifier: str = None):
+    async def _recommendation_candidates(user_id: int, db: AsyncSession, rerank: bool = False):
+        """
+        Ranks catalog books for a user with the local recommender.
+
+        Returns:
+            tuple: The books the user rated 4 or higher, and the candidate books (best first)
+            as dictionaries with their similarity `score`. Books the user already reviewed
+            are never candidates.
+        """
+        result = await db.execute(
+            select(Review.book_id, func.max(Review.rating)).where(Review.user_id == user_id).group_by(Review.book_id)
+        )
+        ratings = dict(result.all())
+        liked = {book_id: rating for book_id, rating in ratings.items() if rating >= 4}
+        limit = settings.RECOMMENDER_RERANK_CANDIDATES if rerank else settings.RECOMMENDATIONS_LIMIT
+        await book_recommender.ensure_index(db)
+        ranked = book_recommender.recommend(liked, set(ratings), limit)
+        if not ranked:
+            # Cold start, or nothing similar to what the user liked: suggest the best-loved books
+            result = await db.execute(
+                select(Book.id).where(Book.id.not_in(list(ratings)))
+                .order_by(Book.rating_sum.desc(), Book.id).limit(limit)
+            )
+            ranked = [(book_id, 0.0) for book_id in result.scalars().all()]
+        result = await db.execute(select(Book).where(Book.id.in_([book_id for book_id, _ in ranked] + list(liked))))
+        books = {book.id: book for book in result.scalars().all()}
+        candidates = [
+            {
+                "id": book_id,
+                "title": books[book_id].title,
+                "author": books[book_id].author,
+                "genre": books[book_id].genre,
+                "year_published": books[book_id].year_published,
+                "score": round(score, 4),
+            }
+            for book_id, score in ranked if book_id in books
+        ]
+        return [books[book_id] for book_id in liked if book_id in books], candidates
+
+    @staticmethod
+    def _recommendation_rerank_prompt(liked_books: list, candidates: list) -> str:
+        books_for_prompt = ", ".join([f"{book.title} by {book.author}" for book in liked_books]) if liked_books else "none"
+        candidates_for_prompt = "\n".join(
+            [f"{candidate['id']}: {candidate['title']} by {candidate['author']} ({candidate['genre']})" for candidate in candidates]
+        )
+        return LLMInstructions.get_recommendation_rerank_prompt(books_for_prompt, candidates_for_prompt)
+
+    @staticmethod
+    def _apply_rerank(candidates: list, reranked) -> list:
+        """
+        Orders candidates as the AI model ranked them, adding its `reason`. Ids the model
+        invented are ignored and candidates it left out keep their local order at the end.
+        """
+        if not isinstance(reranked, dict) or not isinstance(reranked.get("recommendations"), list):
+            raise ValueError("Unexpected re-ranking response format.")
+        remaining = {candidate["id"]: candidate for candidate in candidates}
+        ordered = []
+        for item in reranked["recommendations"]:
+            try:
+                book_id = int(item["id"])
+            except (TypeError, KeyError, ValueError):
+                continue
+            candidate = remaining.pop(book_id, None)
+            if candidate is not None:
+                ordered.append({**candidate, "reason": item.get("reason")})
+        return ordered + list(remaining.values())
+
+    @staticmethod
+    def _sse_response(events) -> StreamingResponse:
+        # Disable proxy buffering so tokens reach the client as soon as they are decoded
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+    @staticmethod
+    async def _iter_summary_sse(prompt: str, db: AsyncSession = None, use_cache: bool = True):
+        """
+        Streams a summary as Server-Sent Events: one `token` event per decoded token,
+        then a `done` event (or an `error` event). Cache hits are sent as a single token.
+
+        Args:
+            prompt (str): The prompt to send to the AI model.
+            db (AsyncSession, optional): Session used for the durable response cache. It is closed once the stream ends.
+            use_cache (bool, optional): Read and write the response cache. Defaults to True.
+
+        Yields:
+            str: Encoded Server-Sent Events.
+        """
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        backend, model = InferenceHelper.active_backend()
+        key = llm_response_cache.make_key(prompt, model, backend)
+        try:
+            cached = await llm_response_cache.get(key, db) if use_cache else None
+            if cached is not None:
+                yield format_sse("token", {"token": cached})
+                yield format_sse("done", {"cached": True})
+                return
+            tokens = []
+            async for token in InferenceHelper.stream_ai_model(prompt):
+                tokens.append(token)
+                yield format_sse("token", {"token": token})
+            if not tokens:
+                logger.warning(SUMMARY_GENERATION_FAILED)
+                yield format_sse("error", {"message": SUMMARY_GENERATION_FAILED})
+                return
+            if use_cache:
+                await llm_response_cache.set(key, prompt, "".join(tokens), model, backend, db)
+            logger.info(SUMMARY_GENERATED_SUCCESS)
+            yield format_sse("done", {"cached": False})
+        except Exception as e:
+            logger.error("Error streaming summary: %s", e)
+            yield format_sse("error", {"message": f"Error generating summary: {e}"})
+        finally:
+            if db is not None:
+                await db.close()
+
+    @staticmethod
+    async def _iter_recommendations_sse(liked_books: list, candidates: list):
+        """
+        Sends the local recommendations straight away as a `candidates` event, then streams
+        the AI model's re-ranking tokens and finishes with a `done` event carrying the
+        re-ranked list. If the model fails, `done` carries the local ranking instead.
+        """
+        local = {"recommendations": candidates[:settings.RECOMMENDATIONS_LIMIT], "source": "local"}
+        yield format_sse("candidates", {"data": local})
+        if not candidates:
+            yield format_sse("done", {"data": local})
+            return
+        try:
+            tokens = []
+            async for token in InferenceHelper.stream_ai_model(BookService._recommendation_rerank_prompt(liked_books, candidates)):
+                tokens.append(token)
+                yield format_sse("token", {"token": token})
+            if not tokens:
+                raise ValueError(NO_AI_CONTENT)
+            reranked = BookService._apply_rerank(candidates, await convert_string_to_json("".join(tokens)))
+            logger.info("Recommendations re-ranked successfully.")
+            yield format_sse("done", {"data": {"recommendations": reranked[:settings.RECOMMENDATIONS_LIMIT], "source": "reranked"}})
+        except Exception as e:
+            logger.warning("Re-ranking recommendations failed, keeping local order: %s", e)
+            yield format_sse("done", {"data": local})
+
+    @staticmethod
+    async def _load_book(book_id: int, db: AsyncSession) -> Optional[dict]:
+        result = await db.execute(select(Book.__table__).where(Book.id == book_id))
+        book = result.mappings().one_or_none()
+        return dict(book) if book is not None else None
+
+    @staticmethod
+    async def _load_reviews(book_id: int, db: AsyncSession) -> Optional[dict]:
+        """
+        Loads a book's reviews together with the book version they belong to, or None when
+        the book does not exist. The version is read first, so a review written in between
+        can only make the entry look older than it is.
+        """
+        version = (await db.execute(select(Book.version).where(Book.id == book_id))).scalar_one_or_none()
+        if version is None:
+            return None
+        result = await db.execute(select(Review.__table__).where(Review.book_id == book_id))
+        return {"version": version, "reviews": [dict(review) for review in result.mappings()]}
+
+    @staticmethod
+    async def _bump_catalog_version(db: AsyncSession) -> int:
+        """
+        Bumps a random catalog version slot inside the caller's transaction and returns the
+        new book version, which the caller stores as the `version` of every book it changes.
+        """
+        slot = random.randint(1, CATALOG_VERSION_SLOTS)
+        result = await db.execute(
+            update(CatalogVersion).where(CatalogVersion.id == slot)
+            .values(version=CatalogVersion.version + 1).returning(CatalogVersion.version)
+        )
+        return result.scalar_one() * CATALOG_VERSION_SLOTS + slot - 1
+
+    @staticmethod
+    async def _catalog_version(db: AsyncSession) -> int:
+        # Only committed writes count, so read it before the page: the page then sees every write
+        # the version does, and a write committing in between only costs the client a refetch
+        result = await db.execute(select(func.sum(CatalogVersion.version)))
+        return result.scalar_one()
+
+    @staticmethod
+    def _rating_aggregate_values(added: int = None, removed: int = None):
+        """
+        Builds the UPDATE values that apply a review insert, update or delete to a book's rating aggregates.
+
+        Args:
+            added (int, optional): Rating of the review being added. Defaults to None.
+            removed (int, optional): Rating of the review being removed. Defaults to None.
+
+        Returns:
+            dict: Column name to SQL expression mapping for `update(Book).values(...)`.
+        """
+        values = {
+            "review_count": Book.review_count + int(added is not None) - int(removed is not None),
+            "rating_sum": Book.rating_sum + (added or 0) - (removed or 0),
+        }
+        if added != removed:
+            if added is not None:
+                column = getattr(Book, f"rating_count_{added}")
+                values[column.key] = column + 1
+            if removed is not None:
+                column = getattr(Book, f"rating_count_{removed}")
+                values[column.key] = column - 1
+        return values
+
+    @staticmethod
+    async def _generate_summary(prompt: str, identifier_type: str, identifier: str = None, db: AsyncSession = None,
+                                use_cache: bool = True, purge_cache: bool = False):
         """
         Generates a summary using the AI model.
 
@@ -277,32 +1017,247 @@ class BookService:
             prompt (str): The prompt to send to the AI model.
             identifier_type (str): Type of identifier ('book_id' or 'book_name').
             identifier (str, optional): The identifier value. Defaults to None.
+            db (AsyncSession, optional): Session used for the durable response cache. Defaults to None.
+            use_cache (bool, optional): Read and write the response cache. Defaults to True.
+            purge_cache (bool, optional): Drop any cached response for this prompt first. Defaults to False.
 
         Returns:
             dict: A dictionary containing the summary data and status.
         """
-        logger.info(f"Generating summary for {identifier_type}: {identifier}")
+        logger.info("Generating summary for %s: %s", identifier_type, identifier)
         try:
-            summary = await BookService._call_ai_model_with_retry(prompt)
+            summary, cached = await BookService._call_ai_model_cached(
+                prompt, BookService._call_ai_model_with_retry, db, use_cache=use_cache, purge_cache=purge_cache
+            )
             if summary is None:
                 logger.warning(SUMMARY_GENERATION_FAILED)
-                return {"data": {identifier_type: identifier, "summary": summary}, "status": 400, "message": SUMMARY_GENERATION_FAILED}
+                return {"data": {identifier_type: identifier, "summary": summary, "cached": cached}, "status": 400, "message": SUMMARY_GENERATION_FAILED}
 
             logger.info(SUMMARY_GENERATED_SUCCESS)
-            return {"data": {identifier_type: identifier, "summary": summary}, "status": 200, "message": SUMMARY_GENERATED_SUCCESS}
+            return {"data": {identifier_type: identifier, "summary": summary, "cached": cached}, "status": 200, "message": SUMMARY_GENERATED_SUCCESS}
         except tenacity.RetryError as e:
-            logger.error(f"Failed to generate summary after multiple retries: {e}")
+            logger.error("Failed to generate summary after multiple retries: %s", e)
             return {"data": {identifier_type: identifier, "summary": None}, "status": 500, "message": f"Failed to generate summary after multiple retries: {e}"}
         except Exception as e:
-            logger.error(f"Error generating summary: {e}")
+            logger.error("Error generating summary: %s", e)
             return {"data": {identifier_type: identifier, "summary": None}, "status": 500, "message": f"Error generating summary: {e}"}
 
     @staticmethod
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def _call_ai_model_cached(prompt: str, call, db: AsyncSession = None, use_cache: bool = True, purge_cache: bool = False):
+        """
+        Serves a completion from the LLM response cache, calling the AI model only on a miss.
+        Concurrent misses for the same prompt are coalesced into a single model call.
+
+        Args:
+            prompt (str): The prompt to send to the AI model.
+            call (Callable): Coroutine function that performs the actual model call.
+            db (AsyncSession, optional): Session used for the durable cache tier. Defaults to None.
+            use_cache (bool, optional): Read and write the cache. Defaults to True.
+            purge_cache (bool, optional): Drop any cached response for this prompt first. Defaults to False.
+
+        Returns:
+            tuple: The completion (or None) and whether it was served from the cache.
+        """
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        backend, model = InferenceHelper.active_backend()
+        key = llm_response_cache.make_key(prompt, model, backend)
+        if purge_cache:
+            await llm_response_cache.purge(key, db)
+        if use_cache and not purge_cache:
+            cached = await llm_response_cache.get(key, db)
+            if cached is not None:
+                return cached, True
+        # Identical prompts already in flight share one upstream call (and one retry chain)
+        content, shared = await ai_single_flight.do(key, call, prompt)
+        if use_cache and content is not None and not shared:
+            await llm_response_cache.set(key, prompt, content, model, backend, db)
+        return content, False
+
+    @staticmethod
+    def _should_retry_ai_call(retry_state) -> bool:
+        exception = retry_state.outcome.exception()
+        if exception is None:
+            return False
+        # Never retry into an open circuit, and only while the global retry budget allows it
+        if isinstance(exception, CircuitOpenError):
+            return False
+        # stop_after_attempt ends the chain after the last attempt; a retry that never happens must not spend budget
+        if retry_state.attempt_number >= AI_CALL_ATTEMPTS:
+            return True
+        return ai_retry_budget.can_retry()
+
+    @staticmethod
+    def _ai_retry_wait(retry_state) -> float:
+        # Honour the backend's Retry-After hint when it asks for a longer pause than our backoff
+        backoff = wait_exponential(multiplier=1, min=4, max=10)(retry_state)
+        retry_after = getattr(retry_state.outcome.exception(), "retry_after", None)
+        return max(backoff, retry_after or 0)
+
+    @staticmethod
+    @retry(
+        stop=stop_after_attempt(AI_CALL_ATTEMPTS),
+        wait=lambda retry_state: BookService._ai_retry_wait(retry_state),
+        retry=lambda retry_state: BookService._should_retry_ai_call(retry_state),
+        before=lambda retry_state: ai_retry_budget.record_request() if retry_state.attempt_number == 1 else None,
+    )
     async def _call_ai_model_with_retry(prompt: str):
         """Call the AI model with retry mechanism."""
         try:
             return await InferenceHelper.call_ai_model(prompt)
         except Exception as e:
-            logger.error(f"AI model call failed: {e}")
-            raise
\ No newline at end of file
+            logger.error("AI model call failed: %s", e)
+            raise
+
+    @staticmethod
+    async def _import_batch(batch: list, db: AsyncSession) -> list:
+        """Inserts one batch of validated rows, skipping (title, author) pairs that already exist."""
+        keys = {(book.title, book.author) for _, book in batch}
+        entries = []
+        try:
+            result = await db.execute(select(Book.title, Book.author).where(tuple_(Book.title, Book.author).in_(keys)))
+            existing = {tuple(row) for row in result.all()}
+            new_rows = []
+            for row_number, book in batch:
+                key = (book.title, book.author)
+                if key in existing:
+                    entries.append({"row": row_number, "status": "duplicate", "error": DUPLICATE_BOOK})
+                    continue
+                # Later rows of the same file with this title and author are duplicates too
+                existing.add(key)
+                new_rows.append((row_number, book))
+            if new_rows:
+                # A plain executemany stays one batched statement on every driver; RETURNING with
+                # guaranteed row order would fall back to one INSERT per row on SQLite
+                version = await BookService._bump_catalog_version(db)
+                await db.execute(insert(Book), [{**book.model_dump(), "version": version} for _, book in new_rows])
+                new_keys = [(book.title, book.author) for _, book in new_rows]
+                result = await db.execute(
+                    select(Book.title, Book.author, Book.id).where(tuple_(Book.title, Book.author).in_(new_keys))
+                )
+                book_ids = {(title, author): book_id for title, author, book_id in result.all()}
+                await db.commit()
+                book_recommender.invalidate(*book_ids.values())
+                entries.extend(
+                    {"row": row_number, "status": "created", "id": book_ids.get((book.title, book.author))}
+                    for row_number, book in new_rows
+                )
+        except SQLAlchemyError as e:
+            logger.error("Database error while importing books: %s", e)
+            await db.rollback()
+            failed = {row_number for row_number, _ in batch} - {entry["row"] for entry in entries}
+            entries.extend(
+                {"row": row_number, "status": "failed", "error": f"{DATABASE_ERROR}: {str(e)}"}
+                for row_number in sorted(failed)
+            )
+        return entries
+
+    @staticmethod
+    def _iter_import_report(report, response: dict):
+        try:
+            for line in report:
+                yield line
+            yield json.dumps(response) + "\n"
+        finally:
+            report.close()
+
+    @staticmethod
+    async def _iter_export_lines(db: AsyncSession, file_format: str, after_id: int):
+        """
+        Reads books joined with their reviews from one server-side cursor, ordered by book,
+        and yields export lines. Only the current book's reviews are held in memory.
+        """
+        count = 0
+        book = None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def csv_line(values: list) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values)
+            return buffer.getvalue()
+
+        try:
+            if file_format == "csv":
+                yield csv_line(EXPORT_CSV_COLUMNS)
+            result = await db.stream(
+                select(
+                    Book.__table__,
+                    Review.id.label("review_id"), Review.user_id.label("review_user_id"),
+                    Review.rating.label("review_rating"), Review.review_text.label("review_text"),
+                )
+                .outerjoin(Review, Review.book_id == Book.id)
+                .where(Book.id > after_id)
+                .order_by(Book.id, Review.id)
+                .execution_options(yield_per=settings.BOOKS_STREAM_BATCH_SIZE)
+            )
+            async for row in result.mappings():
+                if book is None or row["id"] != book["id"]:
+                    if book is not None and file_format == "ndjson":
+                        yield BookService._export_ndjson_line(book, reviews)
+                    count += 1
+                    book = BookService._export_book_record(row)
+                    reviews = []
+                review = None
+                if row["review_id"] is not None:
+                    review = {"id": row["review_id"], "user_id": row["review_user_id"],
+                              "rating": row["review_rating"], "review_text": row["review_text"]}
+                if file_format == "ndjson":
+                    if review is not None:
+                        reviews.append(review)
+                    continue
+                yield csv_line([
+                    book["id"], book["title"], book["author"], book["genre"], book["year_published"], book["summary"],
+                    book["review_count"], book["average_rating"], *book["rating_histogram"].values(),
+                    *(review.values() if review else [None] * 4), book["cursor"],
+                ])
+            if book is not None and file_format == "ndjson":
+                yield BookService._export_ndjson_line(book, reviews)
+            logger.info("Books exported successfully: %s books sent.", count)
+        except SQLAlchemyError as e:
+            logger.error("Database error while exporting books: %s", e)
+            # Re-raise so the response is cut short instead of looking complete
+            raise
+        finally:
+            await db.close()
+
+    @staticmethod
+    def _export_book_record(row) -> dict:
+        # Plain dicts rather than ORM objects: exports are CPU-bound on per-row overhead
+        record = {column.name: row[column.name] for column in Book.__table__.c}
+        record["average_rating"] = record["rating_sum"] / record["review_count"] if record["review_count"] else 0
+        record["rating_histogram"] = {str(rating): record[f"rating_count_{rating}"] for rating in RATING_VALUES}
+        record["cursor"] = encode_cursor(record["id"])
+        return record
+
+    @staticmethod
+    def _export_ndjson_line(book: dict, reviews: list) -> str:
+        return json.dumps({**book, "reviews": reviews}, default=str) + "\n"
+
+    @staticmethod
+    async def _iter_books_ndjson(db: AsyncSession, after_id: int):
+        """
+        Reads books from a server-side cursor and yields them as NDJSON lines.
+
+        Args:
+            db (AsyncSession): The database session. It is closed once the stream ends.
+            after_id (int): Only books with a greater id are streamed.
+
+        Yields:
+            str: One JSON encoded book per line.
+        """
+        count = 0
+        try:
+            result = await db.stream(
+                select(Book.__table__).where(Book.id > after_id).order_by(Book.id)
+                .execution_options(yield_per=settings.BOOKS_STREAM_BATCH_SIZE)
+            )
+            async for row in result.mappings():
+                count += 1
+                yield json.dumps(jsonable_encoder(dict(row))) + "\n"
+            logger.info("Books streamed successfully: %s books sent.", count)
+        except SQLAlchemyError as e:
+            logger.error("Database error while streaming books: %s", e)
+            yield json.dumps({"error": f"{DATABASE_ERROR}: {str(e)}"}) + "\n"
+        finally:
+            await db.close()
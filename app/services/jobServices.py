@@ -0,0 +1,121 @@
+import time
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from app.config.settings import settings
+from app.models.job import AIJob, JOB_PENDING, JOB_TERMINAL_STATES
+from app.services.bookServices import BookService
+from app.utils.helper import utcnow
+from app.utils.job_queue import ai_job_queue
+from app.utils.jwt import fetch_user_by_request
+from app.utils.messages.bookMessages import DATABASE_ERROR, ADMIN_REQUIRED
+from app.utils.messages.jobMessages import (
+    JOB_SUBMITTED_SUCCESS, JOB_RETRIEVED_SUCCESS, JOB_NOT_FOUND
+)
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Job kinds that touch the whole catalog, and so only admins may submit
+ADMIN_JOB_KINDS = {"bulk_summaries"}
+
+class JobService:
+    @staticmethod
+    async def submit_job(kind: str, payload: dict, request: Request, db: AsyncSession):
+        user = fetch_user_by_request(request)
+        if kind in ADMIN_JOB_KINDS and user.get("role") != "admin":
+            logger.warning("User %s is not allowed to submit %s jobs.", user['user_id'], kind)
+            return {"data": None, "status": 403, "message": ADMIN_REQUIRED}
+        logger.info("Submitting %s job for user: %s", kind, user['user_id'])
+        job = AIJob(
+            id=uuid.uuid4().hex, kind=kind, status=JOB_PENDING, user_id=user['user_id'],
+            payload=payload, created_at=utcnow(),
+        )
+        try:
+            db.add(job)
+            await db.commit()
+        except SQLAlchemyError as e:
+            logger.error("Database error while submitting job: %s", e)
+            await db.rollback()
+            return {"data": None, "status": 500, "message": f"{DATABASE_ERROR}: {str(e)}"}
+        ai_job_queue.enqueue(job.id)
+        logger.info("Job %s submitted.", job.id)
+        return {"data": {"job_id": job.id, "kind": kind, "status": JOB_PENDING}, "status": 202, "message": JOB_SUBMITTED_SUCCESS}
+
+    @staticmethod
+    async def get_job(job_id: str, request: Request, db: AsyncSession, wait: float = 0):
+        """
+        Returns a job's status and result, long-polling for up to `wait` seconds
+        (capped by AI_JOB_MAX_WAIT_SECONDS) while the job is still pending or running.
+        """
+        user = fetch_user_by_request(request)
+        logger.info("Fetching job %s (wait=%s).", job_id, wait)
+        deadline = time.monotonic() + max(0.0, min(wait, settings.AI_JOB_MAX_WAIT_SECONDS))
+        while True:
+            result = await db.execute(
+                select(AIJob).where(AIJob.id == job_id).execution_options(populate_existing=True)
+            )
+            job = result.scalar()
+            if job is None:
+                logger.warning("Job not found with ID: %s", job_id)
+                return {"data": None, "status": 404, "message": JOB_NOT_FOUND}
+            if job.user_id != user['user_id'] and user.get('role') != 'admin':
+                logger.warning("User %s is not allowed to read job %s", user['user_id'], job_id)
+                return {"data": None, "status": 403, "message": ADMIN_REQUIRED}
+            remaining = deadline - time.monotonic()
+            if job.status in JOB_TERMINAL_STATES or remaining <= 0:
+                break
+            # End the read transaction so the next poll sees the worker's commit
+            await db.commit()
+            # Woken early when this process runs the job; re-polls for jobs run elsewhere
+            await ai_job_queue.wait(job_id, min(remaining, 1.0))
+        data = {
+            "job_id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "result": job.result,
+            "error": job.error,
+            "attempts": job.attempts,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+        return {"data": data, "status": 200, "message": JOB_RETRIEVED_SUCCESS}
+
+    # job handlers
+
+    @staticmethod
+    def _job_result(response: dict) -> dict:
+        if response["status"] >= 400:
+            raise RuntimeError(response["message"])
+        return jsonable_encoder(response["data"])
+
+    @staticmethod
+    @ai_job_queue.register("summary")
+    async def _run_summary(payload: dict, db: AsyncSession):
+        content = BookService.SummaryCreate(content=payload["content"])
+        return JobService._job_result(await BookService.generate_summary(content, db))
+
+    @staticmethod
+    @ai_job_queue.register("summary_by_book_id")
+    async def _run_summary_by_book_id(payload: dict, db: AsyncSession):
+        return JobService._job_result(await BookService.generate_summary_by_book_id(payload["book_id"], db))
+
+    @staticmethod
+    @ai_job_queue.register("summary_by_book_name")
+    async def _run_summary_by_book_name(payload: dict, db: AsyncSession):
+        return JobService._job_result(await BookService.generate_summary_by_book_name(payload["book_name"], db))
+
+    @staticmethod
+    @ai_job_queue.register("recommendations")
+    async def _run_recommendations(payload: dict, db: AsyncSession):
+        return JobService._job_result(await BookService.recommend_for_user(payload["user_id"], db, payload.get("rerank", False)))
+
+    @staticmethod
+    @ai_job_queue.register("bulk_summaries")
+    async def _run_bulk_summaries(payload: dict, db: AsyncSession):
+        bulk_request = BookService.BulkSummaryCreate(**payload)
+        return JobService._job_result(await BookService.bulk_generate_summaries(bulk_request, db))
@@ -1,7 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.models.user import User
 from app.utils.jwt import create_access_token
+from app.utils.helper import is_unique_violation
 from pydantic import BaseModel
 from app.utils.messages.userMessages import (
     USER_REGISTERED_SUCCESS, USER_LOGIN_SUCCESS, INVALID_CREDENTIALS,
@@ -24,46 +26,52 @@ class UserService:
 
     @staticmethod
     async def register_user(user: UserCreate, db: AsyncSession):
-        logger.info(f"Attempting to register user: {user.username}")
-        result = await db.execute(select(User).where(User.username == user.username)) # Check for duplicate username
-        db_user = result.scalars().first()
-        if db_user:
-            logger.warning(f"Username already registered: {user.username}")
-            return {"data": None, "status": 400, "message": USERNAME_ALREADY_REGISTERED}
-
-        result = await db.execute(select(User).where(User.email == user.email)) # Check for duplicate email
-        db_email = result.scalars().first()
-        if db_email:
-            logger.warning(f"Email already registered: {user.email}")
-            return {"data": None, "status": 400, "message": EMAIL_ALREADY_REGISTERED}
-
+        logger.info("Attempting to register user: %s", user.username)
         try:
+            # Duplicate usernames and emails are rejected by the unique constraints in the same INSERT
             new_user = User(username=user.username, email=user.email, password=user.password)
-            new_user.hash_password()
+            await new_user.hash_password()
             db.add(new_user)
             await db.commit()
-            await db.refresh(new_user)
-            logger.info(f"User registered successfully: {user.username}")
+            logger.info("User registered successfully: %s", user.username)
             return {"data": None, "status": 201, "message": USER_REGISTERED_SUCCESS}
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e, "users", "username"):
+                logger.warning("Username already registered: %s", user.username)
+                return {"data": None, "status": 400, "message": USERNAME_ALREADY_REGISTERED}
+            if is_unique_violation(e, "users", "email"):
+                logger.warning("Email already registered: %s", user.email)
+                return {"data": None, "status": 400, "message": EMAIL_ALREADY_REGISTERED}
+            logger.error("Error registering user: %s", e)
+            raise
         except Exception as e:
-            logger.error(f"Error registering user: {e}")
+            logger.error("Error registering user: %s", e)
             raise
 
     @staticmethod
     async def login_user(user: UserLogin, db: AsyncSession):
-        logger.info(f"Attempting to log in user: {user.username}")
+        logger.info("Attempting to log in user: %s", user.username)
         result = await db.execute(select(User).where(User.username == user.username))
         db_user = result.scalars().first()
-        if not db_user or not db_user.verify_password(user.password):
-            logger.warning(f"Invalid credentials for user: {user.username}")
+        if not db_user or not await db_user.verify_password(user.password):
+            logger.warning("Invalid credentials for user: %s", user.username)
             return {"data": None, "status": 400, "message": INVALID_CREDENTIALS}
         token = create_access_token({"sub": db_user.username, "role": db_user.role, "user_id": db_user.id, "email": db_user.email})
-        logger.info(f"User logged in successfully: {user.username}")
+        if db_user in db.dirty:
+            # verify_password upgraded a hash made with an older bcrypt cost; the login succeeds either way
+            try:
+                await db.commit()
+                logger.info("Password rehashed for user: %s", user.username)
+            except SQLAlchemyError as e:
+                logger.error("Error saving rehashed password for user %s: %s", user.username, e)
+                await db.rollback()
+        logger.info("User logged in successfully: %s", user.username)
         return {"data": {"access_token": token, "token_type": "bearer"}, "status": 200, "message": USER_LOGIN_SUCCESS}
 
     @staticmethod
     async def get_user_profile(user: dict):
-        logger.info(f"Fetching profile for user: {user['sub']}")
+        logger.info("Fetching profile for user: %s", user['sub'])
         data = {"username": user["sub"], "role": user["role"]}
-        logger.debug(f"Profile data: {data}")
+        logger.debug("Profile data: %s", data)
         return {"data": data, "status": 200, "message": USER_PROFILE_RETRIEVED_SUCCESS}
@@ -1,62 +1,468 @@
+import abc
+import asyncio
+import hashlib
 import json
+import random
+import time
+from typing import List
 import httpx
+from email.utils import parsedate_to_datetime
 from app.config.settings import settings
 from app.utils.logger import get_logger
+from app.utils.metrics import LLM_FALLBACKS, LLM_RATE_LIMITED, LLM_REQUEST_DURATION, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from app.utils.resilience import AdaptiveTokenBucket, CircuitBreaker, RetryBudget
 
 logger = get_logger(__name__)
 
+class InferenceError(Exception):
+    """Raised when an inference backend returns an error instead of a completion."""
+
+class RateLimitedError(InferenceError):
+    """Raised when the backend answers HTTP 429; carries its Retry-After hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class InferenceTimer:
+    """Records the latency, time to first token and token counts of one inference call."""
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.started = time.perf_counter()
+        self.first_token_seen = False
+        # success, error, or cancelled when a stream's consumer stops reading early
+        self.outcome = "error"
+
+    def first_token(self):
+        if not self.first_token_seen:
+            self.first_token_seen = True
+            LLM_TIME_TO_FIRST_TOKEN.labels(self.backend).observe(time.perf_counter() - self.started)
+
+    def tokens(self, prompt: int = 0, completion: int = 0):
+        if prompt:
+            LLM_TOKENS.labels(self.backend, "prompt").inc(prompt)
+        if completion:
+            LLM_TOKENS.labels(self.backend, "completion").inc(completion)
+
+    def finish(self):
+        LLM_REQUEST_DURATION.labels(self.backend, self.outcome).observe(time.perf_counter() - self.started)
+
+hosted_rate_limiter = AdaptiveTokenBucket(
+    rate=settings.HOSTED_MODEL_RATE_LIMIT,
+    burst=settings.HOSTED_MODEL_RATE_BURST,
+    min_rate=settings.HOSTED_MODEL_MIN_RATE,
+    max_rate=settings.HOSTED_MODEL_MAX_RATE,
+)
+hosted_circuit_breaker = CircuitBreaker(
+    "hosted",
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+)
+ai_retry_budget = RetryBudget(
+    ratio=settings.AI_RETRY_BUDGET_RATIO,
+    min_per_second=settings.AI_RETRY_BUDGET_MIN_PER_SECOND,
+    window_seconds=settings.AI_RETRY_BUDGET_WINDOW_SECONDS,
+)
+
+def _parse_retry_after(value: str):
+    """Parses a Retry-After header given either as delta-seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 class InferenceHelper:
+    # One pooled client per backend, opened in `main.lifespan` and closed at shutdown
+    _clients = {}
+    # Backend instances by registered name, created on first use
+    _backends = {}
+
+    @staticmethod
+    def _build_client() -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+            read=settings.LLM_HTTP_READ_TIMEOUT,
+            write=settings.LLM_HTTP_WRITE_TIMEOUT,
+            pool=settings.LLM_HTTP_POOL_TIMEOUT,
+        )
+        return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    @staticmethod
+    async def startup():
+        for backend in ("ollama", "hosted"):
+            if backend not in InferenceHelper._clients:
+                InferenceHelper._clients[backend] = InferenceHelper._build_client()
+        logger.info("Inference HTTP clients started.")
+
+    @staticmethod
+    async def shutdown():
+        clients = list(InferenceHelper._clients.values())
+        InferenceHelper._clients.clear()
+        for client in clients:
+            await client.aclose()
+        logger.info("Inference HTTP clients closed.")
+
+    @staticmethod
+    def get_client(backend: str) -> httpx.AsyncClient:
+        """Returns the pooled client for a backend, creating it if the lifespan has not run (e.g. scripts)."""
+        client = InferenceHelper._clients.get(backend)
+        if client is None or client.is_closed:
+            client = InferenceHelper._clients[backend] = InferenceHelper._build_client()
+        return client
+
+    @staticmethod
+    def backend(name: str) -> "InferenceBackend":
+        """Returns the shared instance of a registered backend."""
+        backend = InferenceHelper._backends.get(name)
+        if backend is None:
+            backend_class = INFERENCE_BACKENDS.get(name)
+            if backend_class is None:
+                raise ValueError(f"Unknown inference backend {name!r}; registered: {', '.join(sorted(INFERENCE_BACKENDS))}.")
+            backend = InferenceHelper._backends[name] = backend_class()
+        return backend
+
+    @staticmethod
+    def backend_chain() -> List["InferenceBackend"]:
+        """INFERENCE_BACKEND followed by its fallbacks, each backend at most once."""
+        names = [settings.INFERENCE_BACKEND.strip()] + settings.INFERENCE_FALLBACK_BACKENDS.split(",")
+        names = [name.strip().lower() for name in names if name.strip()]
+        return [InferenceHelper.backend(name) for name in dict.fromkeys(names)]
+
+    @staticmethod
+    def active_backend():
+        """Returns the `(backend, model)` pair that `call_ai_model` will use."""
+        backend = InferenceHelper.backend_chain()[0]
+        return backend.name, backend.model
+
     @staticmethod
     async def call_ai_model(prompt: str):
+        """Calls INFERENCE_BACKEND, then each fallback in turn until one of them answers."""
         logger.info("Calling AI model.")
-        try:
-            if settings.USE_LOCAL_MODEL is True:
-                logger.debug("Using Locally deployed Model for AI inference.")
-                return await InferenceHelper.call_local_model(prompt)
-            else:
-                logger.debug("Using hosted AI model for AI inference.")
-                return await InferenceHelper.call_hosted_model(prompt)
-        except Exception as e:
-            logger.error(f"Error during AI model call: {e}")
-            logger.debug("Falling back to Ollama model.")
-            return await InferenceHelper.call_hosted_model(prompt)
+        chain = InferenceHelper.backend_chain()
+        for position, backend in enumerate(chain):
+            logger.debug("Using the %s backend for AI inference.", backend.name)
+            try:
+                return await backend.call(prompt)
+            except Exception as e:
+                logger.error("Error during AI model call on %s: %s", backend.name, e)
+                if position == len(chain) - 1:
+                    raise
+                logger.debug("Falling back to %s.", chain[position + 1].name)
+                LLM_FALLBACKS.labels(backend.name, chain[position + 1].name).inc()
+
+    @staticmethod
+    async def stream_ai_model(prompt: str):
+        """
+        Yields completion tokens as the active backend decodes them. A backend that fails
+        before producing any token is replaced by the next fallback; once tokens have been
+        sent, a failure is raised to the caller.
+        """
+        logger.info("Streaming from AI model.")
+        chain = InferenceHelper.backend_chain()
+        for position, backend in enumerate(chain):
+            started = False
+            try:
+                async for token in backend.stream(prompt):
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                if started or position == len(chain) - 1:
+                    raise
+                logger.error("Error during AI model stream on %s: %s", backend.name, e)
+                logger.debug("Falling back to %s.", chain[position + 1].name)
+                LLM_FALLBACKS.labels(backend.name, chain[position + 1].name).inc()
 
     @staticmethod
     async def call_local_model(prompt: str):
         logger.info("Calling Ollama model.")
-        async with httpx.AsyncClient() as client:
+        content = [token async for token in InferenceHelper.stream_local_model(prompt)]
+        logger.debug("Ollama response received.")
+        return "".join(content)
+
+    @staticmethod
+    async def stream_local_model(prompt: str):
+        """
+        Yields tokens from Ollama's streamed NDJSON response. Parsing is line based, so
+        network chunks holding several JSON objects, or only part of one, are handled.
+        """
+        client = InferenceHelper.get_client("ollama")
+        timer = InferenceTimer("ollama")
+        try:
             async with client.stream("POST", settings.LOCALLY_DEPLOYED_LLM_ENDPOINT, json={
                 "model": settings.LOCAL_AI_MODEL,
                 "prompt": prompt
             }) as response:
-                content = ""
-                async for chunk in response.aiter_text():
-                    chunk = json.loads(chunk)
-                    content += chunk['response']
-                logger.debug("Ollama response received.")
-                return content
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise InferenceError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        timer.first_token()
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        # The final chunk carries the token counts
+                        timer.tokens(chunk.get("prompt_eval_count", 0), chunk.get("eval_count", 0))
+                        break
+            timer.outcome = "success"
+        except GeneratorExit:
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            timer.finish()
 
     @staticmethod
-    async def call_hosted_model(prompt: str):
-        logger.info("Calling hosted AI model.")
+    def _hosted_request(prompt: str, stream: bool = False):
         headers = {
             "Authorization": f"Bearer {settings.HOSTED_MODEL_API_KEY}",
             "Content-Type": "application/json",
         }
-        data = json.dumps({
+        payload = {
             "model": settings.HOSTED_MODEL_MODEL,
             "messages": [{"role": "user", "content": prompt}],
-        })
-        async with httpx.AsyncClient() as client:
-            response = await client.post(settings.HOSTED_MODEL_ENDPOINT, headers=headers, data=data)
-            if response.status_code == 429:  # HTTP 429 Too Many Requests
-                logger.error("Rate limit exceeded for hosted AI model.")
-                return None
-            logger.debug(f"Together AI response: {response.text}")
-            if 'choices' in response.json():
+        }
+        if stream:
+            payload["stream"] = True
+        return headers, json.dumps(payload)
+
+    @staticmethod
+    async def _send_hosted(send):
+        """
+        Sends a hosted-model request through the circuit breaker and the adaptive rate
+        limiter, and feeds the outcome back into both.
+        """
+        hosted_circuit_breaker.before_call()
+        try:
+            await hosted_rate_limiter.acquire()
+            response = await send()
+        except Exception:
+            hosted_circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled before an answer: say nothing about the backend, but free a half-open trial slot
+            hosted_circuit_breaker.release()
+            raise
+        if response.status_code == 429:  # HTTP 429 Too Many Requests
+            # The backend is healthy, just busy: slow down rather than trip the breaker
+            hosted_circuit_breaker.record_success()
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            hosted_rate_limiter.on_throttle(retry_after)
+            logger.error("Rate limit exceeded for hosted AI model.")
+            LLM_RATE_LIMITED.labels("hosted").inc()
+            await response.aclose()
+            raise RateLimitedError("Rate limit exceeded for hosted AI model.", retry_after)
+        if response.status_code >= 500:
+            hosted_circuit_breaker.record_failure()
+            await response.aclose()
+            raise InferenceError(f"Hosted AI model returned HTTP {response.status_code}.")
+        hosted_circuit_breaker.record_success()
+        hosted_rate_limiter.on_success()
+        return response
+
+    @staticmethod
+    async def call_hosted_model(prompt: str):
+        logger.info("Calling hosted AI model.")
+        headers, data = InferenceHelper._hosted_request(prompt)
+        client = InferenceHelper.get_client("hosted")
+        timer = InferenceTimer("hosted")
+        try:
+            response = await InferenceHelper._send_hosted(
+                lambda: client.post(settings.HOSTED_MODEL_ENDPOINT, headers=headers, data=data)
+            )
+            logger.debug("Together AI response: %s", response.text)
+            body = response.json()
+            if 'choices' in body:
                 logger.debug("Hosted AI model response received.")
-                return response.json()['choices'][0]['message']['content']
+                usage = body.get("usage") or {}
+                timer.tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+                timer.outcome = "success"
+                return body['choices'][0]['message']['content']
             else:
                 logger.error("Invalid response from hosted AI model.")
                 return None
-    
\ No newline at end of file
+        finally:
+            timer.finish()
+
+    @staticmethod
+    async def stream_hosted_model(prompt: str):
+        """
+        Yields tokens from the hosted model's OpenAI-compatible server-sent event stream.
+        """
+        logger.info("Streaming from hosted AI model.")
+        headers, data = InferenceHelper._hosted_request(prompt, stream=True)
+        client = InferenceHelper.get_client("hosted")
+        request = client.build_request("POST", settings.HOSTED_MODEL_ENDPOINT, headers=headers, content=data)
+        timer = InferenceTimer("hosted")
+        # Counted per streamed delta unless the backend sends a `usage` chunk
+        deltas, usage = 0, None
+        try:
+            response = await InferenceHelper._send_hosted(lambda: client.send(request, stream=True))
+            try:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    chunk = json.loads(payload)
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or [{}]
+                    token = (choices[0].get("delta") or {}).get("content")
+                    if token:
+                        deltas += 1
+                        timer.first_token()
+                        yield token
+            finally:
+                await response.aclose()
+            timer.outcome = "success"
+        except GeneratorExit:
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            if usage:
+                timer.tokens(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+            else:
+                timer.tokens(completion=deltas)
+            timer.finish()
+
+INFERENCE_BACKENDS = {}
+
+def register_backend(backend_class):
+    """
+    Class decorator that makes a backend selectable by its `name` in INFERENCE_BACKEND and
+    INFERENCE_FALLBACK_BACKENDS. Registering a name again replaces the earlier backend.
+    """
+    INFERENCE_BACKENDS[backend_class.name] = backend_class
+    InferenceHelper._backends.pop(backend_class.name, None)
+    return backend_class
+
+class InferenceBackend(abc.ABC):
+    """
+    Interface of an inference backend. Subclasses implement `call`, a non-streaming
+    request, and `stream`, an async generator of completion tokens; a backend lacking
+    either cannot be instantiated. `call` may defer to the base class, which joins `stream`.
+    """
+
+    name = None
+
+    @property
+    def model(self) -> str:
+        """Model identifier, part of the LLM response cache key."""
+        return None
+
+    @abc.abstractmethod
+    async def call(self, prompt: str) -> str:
+        return "".join([token async for token in self.stream(prompt)])
+
+    @abc.abstractmethod
+    def stream(self, prompt: str):
+        """Returns an async iterator of completion tokens."""
+
+@register_backend
+class OllamaBackend(InferenceBackend):
+    """A model served by Ollama at LOCALLY_DEPLOYED_LLM_ENDPOINT."""
+
+    name = "ollama"
+
+    @property
+    def model(self) -> str:
+        return settings.LOCAL_AI_MODEL
+
+    async def call(self, prompt: str) -> str:
+        return await InferenceHelper.call_local_model(prompt)
+
+    def stream(self, prompt: str):
+        return InferenceHelper.stream_local_model(prompt)
+
+@register_backend
+class HostedBackend(InferenceBackend):
+    """An OpenAI-compatible chat completions API at HOSTED_MODEL_ENDPOINT, behind the rate limiter and circuit breaker."""
+
+    name = "hosted"
+
+    @property
+    def model(self) -> str:
+        return settings.HOSTED_MODEL_MODEL
+
+    async def call(self, prompt: str) -> str:
+        return await InferenceHelper.call_hosted_model(prompt)
+
+    def stream(self, prompt: str):
+        return InferenceHelper.stream_hosted_model(prompt)
+
+STUB_WORDS = "the a story of an unlikely hero who sets out to find what was lost and learns".split()
+
+@register_backend
+class StubBackend(InferenceBackend):
+    """
+    Deterministic in-process model for offline benchmarks and load tests. The completion
+    is `tokens` words derived from the prompt, so equal prompts get equal completions.
+    Each call takes `latency` seconds plus up to `jitter` more, and fails with
+    `InferenceError` with probability `failure_rate`; both draws come from a seeded RNG.
+    Streams emit their first word after a quarter of the call's time.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = None, jitter: float = None, tokens: int = None,
+                 failure_rate: float = None, seed: int = None):
+        self.latency = settings.INFERENCE_STUB_LATENCY if latency is None else latency
+        self.jitter = settings.INFERENCE_STUB_JITTER if jitter is None else jitter
+        self.tokens = settings.INFERENCE_STUB_TOKENS if tokens is None else tokens
+        self.failure_rate = settings.INFERENCE_STUB_FAILURE_RATE if failure_rate is None else failure_rate
+        self._random = random.Random(settings.INFERENCE_STUB_SEED if seed is None else seed)
+
+    @property
+    def model(self) -> str:
+        return f"stub-{self.tokens}"
+
+    def completion(self, prompt: str) -> List[str]:
+        offset = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        return [STUB_WORDS[(offset + index) % len(STUB_WORDS)] + " " for index in range(self.tokens)]
+
+    async def call(self, prompt: str) -> str:
+        return "".join([token async for token in self.stream(prompt, first_token=1.0)])
+
+    async def stream(self, prompt: str, first_token: float = 0.25):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        duration = self.latency + self._random.uniform(0, self.jitter)
+        fails = self._random.random() < self.failure_rate
+        words = self.completion(prompt)
+        first = duration * first_token
+        gap = (duration - first) / max(1, len(words) - 1)
+        timer = InferenceTimer(self.name)
+        sent = 0
+        try:
+            if fails:
+                await asyncio.sleep(first)
+                raise InferenceError("Injected stub backend failure.")
+            for index, word in enumerate(words):
+                # Sleep to absolute deadlines so per-sleep overhead does not add up over a long stream
+                await asyncio.sleep(max(0.0, started + first + index * gap - loop.time()))
+                timer.first_token()
+                sent += 1
+                yield word
+            timer.outcome = "success"
+        except GeneratorExit:
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            timer.tokens(len(prompt.split()), sent)
+            timer.finish()
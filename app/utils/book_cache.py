@@ -0,0 +1,38 @@
+from typing import List
+from app.config.settings import settings
+from app.utils.cache import MemoryCacheBackend, RedisCacheBackend, ReadThroughCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def book_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+def reviews_key(book_id: int) -> str:
+    return f"reviews:{book_id}"
+
+def book_cache_keys(*book_ids: int) -> List[str]:
+    """Every cache key holding data of the given books."""
+    return [key for book_id in book_ids for key in (book_key(book_id), reviews_key(book_id))]
+
+def create_book_cache() -> ReadThroughCache:
+    """
+    Builds the cache for book, review and summary reads from BOOK_CACHE_BACKEND:
+    `memory` (per process), `redis` (shared through BOOK_CACHE_REDIS_URL) or `none`.
+    """
+    backend = settings.BOOK_CACHE_BACKEND.lower()
+    # Reads may come from replicas that lag the primary by up to REPLICA_MAX_LAG_SECONDS
+    settle_seconds = settings.REPLICA_MAX_LAG_SECONDS if settings.DATABASE_REPLICA_URLS.strip() else 0
+    if backend == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            logger.warning("BOOK_CACHE_BACKEND is redis but the redis package is not installed; using the in-process cache.")
+        else:
+            client = redis.from_url(settings.BOOK_CACHE_REDIS_URL)
+            return ReadThroughCache(RedisCacheBackend(client, settings.BOOK_CACHE_TTL_SECONDS, prefix="books:"), settle_seconds)
+    # An in-process cache that holds no entries turns caching off
+    max_entries = 0 if backend == "none" else settings.BOOK_CACHE_MAX_ENTRIES
+    return ReadThroughCache(MemoryCacheBackend(max_entries, settings.BOOK_CACHE_TTL_SECONDS), settle_seconds)
+
+book_cache = create_book_cache()
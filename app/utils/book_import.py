@@ -0,0 +1,67 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+# (row number, column values, parse error); row numbers count data rows from 1
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decodes a stream of UTF-8 byte chunks into lines without buffering the whole input."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+async def iter_jsonl_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    row_number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            values = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(values, dict):
+            yield row_number, None, "Each line must be a JSON object."
+            continue
+        yield row_number, values, None
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Parses CSV with a header row; quoted fields may span several lines."""
+    header = None
+    record = []
+    row_number = 0
+    async for line in iter_lines(chunks):
+        record.append(line)
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            # An open quote: the field continues on the next line
+            continue
+        record = []
+        values = next(csv.reader([text]), [])
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, found {len(values)}."
+            continue
+        yield row_number, dict(zip(header, values)), None
+    if record:
+        yield row_number + 1, None, "Unterminated quoted field."
+
+IMPORT_PARSERS = {
+    "csv": iter_csv_rows,
+    "jsonl": iter_jsonl_rows,
+}
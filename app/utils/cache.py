@@ -0,0 +1,227 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+from app.utils.logger import get_logger
+from app.utils.single_flight import SingleFlight
+
+logger = get_logger(__name__)
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after a fixed time-to-live.
+
+    All operations are synchronous and never await, so the cache is safe to share
+    between coroutines running on the same event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[Any]]:
+        """
+        Returns a `(found, value)` tuple so that cached `None` values can be told apart from misses.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float = None):
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class MemoryCacheBackend:
+    """In-process `TTLCache` behind the async backend interface used by `ReadThroughCache`."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.entries = TTLCache(max_entries, ttl_seconds)
+        # Per-key (generation, settle_until); outlives the entries and the loads it guards
+        self.generations = TTLCache(max_entries * 4, ttl_seconds * 2)
+
+    async def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        return self.entries.get(key)
+
+    async def generation(self, key: str) -> Optional[int]:
+        """The key's current generation, or `None` while it is settling after an invalidation."""
+        found, entry = self.generations.get(key)
+        if not found:
+            return 0
+        generation, settle_until = entry
+        return None if settle_until > time.monotonic() else generation
+
+    async def add(self, key: str, value: Any, generation: int) -> bool:
+        """Stores `value` unless the key was invalidated since `generation` was read."""
+        found, entry = self.generations.get(key)
+        if self.entries.max_entries <= 0 or generation != (entry[0] if found else 0):
+            return False
+        self.entries.set(key, value)
+        return True
+
+    async def delete(self, *keys: str, settle_seconds: float = 0):
+        """Drops the keys and moves them to a new generation."""
+        for key in keys:
+            self.entries.delete(key)
+            found, entry = self.generations.get(key)
+            self.generations.set(key, ((entry[0] if found else 0) + 1, time.monotonic() + settle_seconds))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class RedisCacheBackend:
+    """
+    Shared cache on a Redis-compatible server. `client` is anything with the async
+    `get`, `mget`, `set(..., ex=)`, `delete` and `pipeline` methods of `redis.asyncio.Redis`,
+    so tests can pass a local stand-in. Values are stored as JSON next to the generation
+    they were loaded at; a value from an older generation reads as a miss.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, ttl_seconds: float, prefix: str = ""):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _keys(self, key: str) -> Tuple[str, str, str]:
+        key = self.prefix + key
+        return key, key + "#generation", key + "#settling"
+
+    async def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        value_key, generation_key, _ = self._keys(key)
+        raw, generation = await self.client.mget(value_key, generation_key)
+        if raw is None:
+            return False, None
+        entry = json.loads(raw)
+        if entry["generation"] != int(generation or 0):
+            return False, None
+        return True, entry["value"]
+
+    async def generation(self, key: str) -> Optional[int]:
+        """The key's current generation, or `None` while it is settling after an invalidation."""
+        _, generation_key, settling_key = self._keys(key)
+        generation, settling = await self.client.mget(generation_key, settling_key)
+        return None if settling is not None else int(generation or 0)
+
+    async def add(self, key: str, value: Any, generation: int) -> bool:
+        value_key, _, _ = self._keys(key)
+        entry = json.dumps({"generation": generation, "value": value}, default=str)
+        await self.client.set(value_key, entry, ex=max(1, int(self.ttl_seconds)))
+        return True
+
+    async def delete(self, *keys: str, settle_seconds: float = 0):
+        """Drops the keys and moves them to a new generation."""
+        if not keys:
+            return
+        # A generation that expired would restart at 0, so it must outlive every value stored under it
+        generation_ttl = 2 * max(1, int(self.ttl_seconds))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                value_key, generation_key, settling_key = self._keys(key)
+                pipe.delete(value_key)
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, generation_ttl)
+                if settle_seconds > 0:
+                    pipe.set(settling_key, 1, ex=max(1, math.ceil(settle_seconds)))
+            await pipe.execute()
+
+class ReadThroughCache:
+    """
+    Read-through cache over a pluggable backend.
+
+    Misses are loaded by the caller's loader; concurrent misses for the same key share one
+    load (stampede protection). The backend keeps a generation per key that every
+    invalidation moves on, and a load only stores under the generation it started at, so a
+    load that overlaps an invalidation of its key, in this worker or any other sharing the
+    backend, is returned but never served from the cache. When loads read from lagging
+    replicas, `settle_seconds` also keeps a key uncached for that long after its
+    invalidation. Backend errors are logged and treated as misses, so the cache can never
+    fail a request.
+    """
+
+    def __init__(self, backend, settle_seconds: float = 0):
+        self.backend = backend
+        self.settle_seconds = settle_seconds
+        self._loads = SingleFlight()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "invalidations": 0, "errors": 0}
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached value for `key`, or the result of `loader()`. `None` results are not cached."""
+        try:
+            found, value = await self.backend.get(key)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error("Cache backend error while reading %s: %s", key, e)
+            found, value = False, None
+        if found:
+            self.counters["hits"] += 1
+            return value
+        self.counters["misses"] += 1
+        value, shared = await self._loads.do(key, self._load, key, loader)
+        if shared:
+            self.counters["coalesced"] += 1
+        return value
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            generation = await self.backend.generation(key)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error("Cache backend error while reading %s: %s", key, e)
+            generation = None
+        value = await loader()
+        if value is not None and generation is not None:
+            try:
+                if await self.backend.add(key, value, generation):
+                    self.counters["stores"] += 1
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error("Cache backend error while writing %s: %s", key, e)
+        return value
+
+    async def invalidate(self, *keys: str):
+        self.counters["invalidations"] += len(keys)
+        for key in keys:
+            # Later readers must not join a load that may have read the old row
+            self._loads.forget(key)
+        try:
+            await self.backend.delete(*keys, settle_seconds=self.settle_seconds)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error("Cache backend error while invalidating %s: %s", keys, e)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        stats = {
+            "backend": self.backend.name,
+            **self.counters,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            "loads_in_flight": self._loads.in_flight(),
+        }
+        if isinstance(self.backend, MemoryCacheBackend):
+            stats["entries"] = len(self.backend)
+        return stats
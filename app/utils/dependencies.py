@@ -1,12 +1,8 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.utils.jwt import verify_access_token
+from app.utils.jwt import fetch_user_by_request
 
 http_bearer = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(http_bearer)):
-    token = credentials.credentials
-    payload = verify_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return payload
+def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(http_bearer)):
+    return fetch_user_by_request(request)
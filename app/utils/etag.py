@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+def make_etag(*parts) -> str:
+    """Builds a strong entity tag from version parts, e.g. `make_etag("book", 7, 42)` -> `"book-7-42"`."""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluates an `If-None-Match` header against `etag`. As RFC 9110 requires for this
+    header, the comparison is weak: a `W/` prefix on either side is ignored.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in (candidate.removeprefix("W/") for candidate in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+def with_etag(response: dict, etag: str):
+    """Sends a successful envelope with its ETag; other envelopes are returned unchanged."""
+    if response["status"] != 200:
+        return response
+    # no-cache: clients may keep the body but must revalidate it on every use
+    return JSONResponse(jsonable_encoder(response), headers={"ETag": etag, "Cache-Control": "no-cache"})
@@ -1,8 +1,10 @@
 import json
 import ast
+import base64
+import zlib
+from datetime import datetime, timezone
 from app.utils.logger import get_logger
-from sqlalchemy.future import select
-from app.models.book import Book
+from sqlalchemy.exc import IntegrityError
 
 logger = get_logger(__name__)
 
@@ -23,7 +25,7 @@ async def convert_string_to_json(response):
 
         trimmed = trimmed.replace("```json", "").replace("```", "")
     except Exception as e:
-        logger.error(f"Error while trimming response: {e}")
+        logger.error("Error while trimming response: %s", e)
         trimmed = response
 
     try:
@@ -37,23 +39,68 @@ async def convert_string_to_json(response):
             logger.debug("Successfully evaluated string to Python object.")
             return result
         except Exception as e:
-            logger.error(f"Error during literal evaluation: {e}")
+            logger.error("Error during literal evaluation: %s", e)
             return response
 
-async def check_duplicate_book(title: str, author: str, db, exclude_book_id: int = None):
+def is_unique_violation(error: IntegrityError, table: str, *columns: str) -> bool:
     """
-    Check if a book with the same title and author already exists in the database.
-    Optionally exclude a specific book ID from the check.
+    Check whether an IntegrityError was raised by the unique constraint on `table(columns)`.
+    Recognizes the messages of both SQLite and PostgreSQL.
+    """
+    message = str(error.orig)
+    sqlite_message = "UNIQUE constraint failed: " + ", ".join(f"{table}.{column}" for column in columns)
+    postgresql_detail = f"Key ({', '.join(columns)})="
+    is_violation = sqlite_message in message or postgresql_detail in message
+    logger.debug("Unique violation on %s(%s): %s", table, ', '.join(columns), is_violation)
+    return is_violation
+
+def encode_cursor(last_id: int, key: str = "after_id") -> str:
+    """
+    Encode the id of the last row on a page (or another non-negative position, such as
+    an offset into ranked results, under `key`) into an opaque pagination cursor.
+    """
+    raw = json.dumps({key: last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, key: str = "after_id") -> int:
+    """
+    Decode a cursor produced by `encode_cursor` back into the id to resume after.
+    Raises ValueError if the cursor is malformed.
     """
-    logger.debug(f"Checking for duplicate book: {title} by {author}")
     try:
-        query = select(Book).where(Book.title == title, Book.author == author)
-        if exclude_book_id:
-            query = query.where(Book.id != exclude_book_id)
-        result = await db.execute(query)
-        is_duplicate = result.scalar() is not None
-        logger.debug(f"Duplicate check result: {is_duplicate}")
-        return is_duplicate
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded.encode()))[key]
     except Exception as e:
-        logger.error(f"Error while checking for duplicate book: {e}")
-        return False
\ No newline at end of file
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(after_id, int) or after_id < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return after_id
+
+def format_sse(event: str, data) -> str:
+    """
+    Format one Server-Sent Event with a JSON encoded data field.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def utcnow() -> datetime:
+    """
+    Current UTC time as a naive datetime, the format stored in DateTime columns.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+async def gzip_stream(lines, flush_bytes: int = 64 * 1024):
+    """
+    Gzip-compress an async iterator of text lines on the fly, emitting a compressed chunk
+    whenever about `flush_bytes` of input has accumulated, so memory use stays constant.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    pending = []
+    pending_bytes = 0
+    async for line in lines:
+        data = line.encode()
+        pending.append(data)
+        pending_bytes += len(data)
+        if pending_bytes >= flush_bytes:
+            yield compressor.compress(b"".join(pending)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending, pending_bytes = [], 0
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
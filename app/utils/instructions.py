@@ -1,9 +1,12 @@
 class LLMInstructions:
     @staticmethod
-    def get_recommendation_prompt(books_for_prompt: str) -> str:
+    def get_recommendation_rerank_prompt(liked_books: str, candidates: str) -> str:
         return f"""<Instruction>
             <prompt>
-                Based on the user's highly rated books: {books_for_prompt}, provide a list of 5 book recommendations with their titles and authors.
+                The user rated these books highly: {liked_books}.
+                Re-rank the following candidate books from our catalog, best match first, and give a one-sentence reason for each.
+                Only use the candidate ids listed here:
+                {candidates}
             </prompt>
             <responseFormat>
                 <format>JSON</format>
@@ -12,10 +15,8 @@ class LLMInstructions:
                     {{
                         "recommendations": [
                             {{
-                                "title": "string",
-                                "author": "string",
-                                "genre": "string",
-                                "year_published": "string",
+                                "id": "integer",
+                                "reason": "string",
                             }}
                         ]
                     }}
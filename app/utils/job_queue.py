@@ -0,0 +1,139 @@
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.config.settings import settings
+from app.models.job import AIJob, JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+from app.utils.helper import utcnow
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class AIJobQueue:
+    """
+    Fixed-size asyncio worker pool for AI jobs stored in the `ai_jobs` table.
+
+    Job ids travel through an in-process queue while the job state lives in the
+    database, so a restarted process picks up pending (and stale running) jobs again.
+    Workers claim a job with a conditional UPDATE, so a job is never run twice
+    concurrently even if several processes resume the same backlog.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.handlers: Dict[str, Callable[[dict, object], Awaitable[dict]]] = {}
+        self.session_factory = None
+        self._queue: asyncio.Queue = None
+        self._workers = []
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+    def register(self, kind: str):
+        """Decorator registering the coroutine that runs jobs of `kind` as `handler(payload, db)`."""
+        def decorator(handler):
+            self.handlers[kind] = handler
+            return handler
+        return decorator
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, session_factory):
+        if self.running:
+            return
+        self.session_factory = session_factory
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.concurrency)]
+        resumed = await self._resume()
+        logger.info("AI job queue started with %s workers, %s jobs resumed.", self.concurrency, resumed)
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        logger.info("AI job queue stopped.")
+
+    def enqueue(self, job_id: str):
+        if self.running:
+            self._queue.put_nowait(job_id)
+        else:
+            logger.warning("AI job queue is not running; job %s stays pending until the next start.", job_id)
+
+    async def wait(self, job_id: str, timeout: float):
+        """Waits until a job run by this process finishes, or the timeout expires."""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                # The job may be run by another process and never finish here; the last waiter cleans up
+                if self._events.get(job_id) is event:
+                    del self._events[job_id]
+
+    async def _resume(self) -> int:
+        stale_before = utcnow() - timedelta(seconds=settings.AI_JOB_STALE_SECONDS)
+        async with self.session_factory() as db:
+            # Running jobs whose worker died (no finish for a long time) are retried
+            await db.execute(
+                update(AIJob)
+                .where(AIJob.status == JOB_RUNNING, AIJob.started_at < stale_before)
+                .values(status=JOB_PENDING)
+            )
+            await db.commit()
+            result = await db.execute(
+                select(AIJob.id).where(AIJob.status == JOB_PENDING).order_by(AIJob.created_at)
+            )
+            job_ids = result.scalars().all()
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+        return len(job_ids)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error("AI job worker %s failed on job %s: %s", index, job_id, e)
+            finally:
+                self._queue.task_done()
+                event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id: str):
+        async with self.session_factory() as db:
+            claimed = await db.execute(
+                update(AIJob)
+                .where(AIJob.id == job_id, AIJob.status == JOB_PENDING)
+                .values(status=JOB_RUNNING, started_at=utcnow(), attempts=AIJob.attempts + 1)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                logger.debug("AI job %s was already claimed.", job_id)
+                return
+            job = (await db.execute(select(AIJob).where(AIJob.id == job_id))).scalar_one()
+            logger.info("Running AI job %s (%s).", job_id, job.kind)
+            handler = self.handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job kind: {job.kind}")
+                result = await handler(job.payload, db)
+                values = {"status": JOB_SUCCEEDED, "result": result, "error": None}
+                logger.info("AI job %s succeeded.", job_id)
+            except Exception as e:
+                await db.rollback()
+                values = {"status": JOB_FAILED, "error": str(e)}
+                logger.error("AI job %s failed: %s", job_id, e)
+            await db.execute(update(AIJob).where(AIJob.id == job_id).values(finished_at=utcnow(), **values))
+            await db.commit()
+
+ai_job_queue = AIJobQueue(concurrency=settings.AI_JOB_WORKERS)
@@ -1,10 +1,16 @@
+import time
 from jwt import encode, decode, ExpiredSignatureError, InvalidTokenError
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, Request
+from app.config.settings import settings
+from app.utils.cache import TTLCache
 
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 
+# Verified tokens and their claims; an entry never outlives the token's own expiry
+verified_token_cache = TTLCache(settings.JWT_CACHE_MAX_ENTRIES, settings.JWT_CACHE_TTL_SECONDS)
+
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1)):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
@@ -12,20 +18,34 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1
     return encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_access_token(token: str):
+    found, payload = verified_token_cache.get(token)
+    if found:
+        return payload
     try:
         payload = decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except ExpiredSignatureError:
         return None
     except InvalidTokenError:
         return None
+    remaining = payload["exp"] - time.time() if "exp" in payload else settings.JWT_CACHE_TTL_SECONDS
+    if remaining > 0:
+        verified_token_cache.set(token, payload, min(remaining, settings.JWT_CACHE_TTL_SECONDS))
+    return payload
 
 def fetch_user_by_request(request: Request):
+    """
+    Returns the verified claims of the request's bearer token. The token is verified
+    once per request; later calls reuse the claims stored on `request.state.user`.
+    """
+    payload = getattr(request.state, "user", None)
+    if payload is not None:
+        return payload
     authorization: str = request.headers.get("Authorization")
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Authorization header is missing or invalid")
     token = authorization.split(" ")[1]
     payload = verify_access_token(token)
     if not payload:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    request.state.user = payload
     return payload
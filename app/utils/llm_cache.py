@@ -0,0 +1,123 @@
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import delete, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config.settings import settings
+from app.models.llm_cache import LLMResponseCacheEntry
+from app.utils.cache import TTLCache
+from app.utils.helper import utcnow
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM completions: an in-process LRU with TTL in front of the
+    `llm_response_cache` table. Database errors are logged and treated as misses so
+    the cache can never fail a request.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, db_ttl_seconds: float):
+        self.memory = TTLCache(max_entries, ttl_seconds)
+        self.db_ttl_seconds = db_ttl_seconds
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "purges": 0}
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", prompt)).strip()
+
+    @staticmethod
+    def make_key(prompt: str, model: str, backend: str) -> str:
+        normalized = LLMResponseCache.normalize_prompt(prompt)
+        return hashlib.sha256(f"{backend}\x00{model}\x00{normalized}".encode()).hexdigest()
+
+    async def get(self, key: str, db: AsyncSession = None) -> Optional[str]:
+        found, response = self.memory.get(key)
+        if found:
+            self.counters["memory_hits"] += 1
+            logger.debug("LLM cache memory hit: %s", key)
+            return response
+        if db is not None:
+            try:
+                result = await db.execute(
+                    select(LLMResponseCacheEntry.response).where(
+                        LLMResponseCacheEntry.key == key,
+                        or_(LLMResponseCacheEntry.expires_at.is_(None), LLMResponseCacheEntry.expires_at > utcnow()),
+                    )
+                )
+                response = result.scalar()
+            except SQLAlchemyError as e:
+                logger.error("Database error while reading LLM cache: %s", e)
+                await db.rollback()
+                response = None
+            if response is not None:
+                self.counters["db_hits"] += 1
+                self.memory.set(key, response)
+                logger.debug("LLM cache database hit: %s", key)
+                return response
+        self.counters["misses"] += 1
+        logger.debug("LLM cache miss: %s", key)
+        return None
+
+    async def set(self, key: str, prompt: str, response: str, model: str, backend: str, db: AsyncSession = None):
+        self.memory.set(key, response)
+        self.counters["stores"] += 1
+        if db is None:
+            return
+        now = utcnow()
+        expires_at = now + timedelta(seconds=self.db_ttl_seconds) if self.db_ttl_seconds > 0 else None
+        try:
+            await db.merge(LLMResponseCacheEntry(
+                key=key, backend=backend, model=model, prompt=self.normalize_prompt(prompt),
+                response=response, created_at=now, expires_at=expires_at,
+            ))
+            await db.commit()
+        except SQLAlchemyError as e:
+            logger.error("Database error while writing LLM cache: %s", e)
+            await db.rollback()
+
+    async def purge(self, key: str = None, db: AsyncSession = None) -> int:
+        """
+        Removes one entry (or every entry when `key` is None) from both tiers.
+
+        Returns:
+            int: Number of database rows removed.
+        """
+        if key is None:
+            self.memory.clear()
+        else:
+            self.memory.delete(key)
+        self.counters["purges"] += 1
+        if db is None:
+            return 0
+        try:
+            stmt = delete(LLMResponseCacheEntry)
+            if key is not None:
+                stmt = stmt.where(LLMResponseCacheEntry.key == key)
+            result = await db.execute(stmt)
+            await db.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error("Database error while purging LLM cache: %s", e)
+            await db.rollback()
+            return 0
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["db_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+llm_response_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    db_ttl_seconds=settings.LLM_CACHE_DB_TTL_SECONDS,
+)
@@ -1,19 +1,94 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Dict, Optional
+from app.config.settings import settings
 
-def get_logger(name: str) -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random fraction of records below WARNING; warnings and errors always pass.
+    `rates` maps logger names to the fraction kept, and a record takes the rate of its
+    nearest configured ancestor, so `app.services=0.1` also samples `app.services.bookServices`.
+    A single float applies to every logger.
+    """
 
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates if isinstance(rates, dict) else {"": rates}
 
-    # Create formatter and add it to the handler
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(formatter)
+    def rate(self, name: str) -> float:
+        while name not in self.rates:
+            if not name:
+                return 1.0
+            name = name.rpartition(".")[0]
+        return self.rates[name]
 
-    # Add the handler to the logger
-    if not logger.handlers:
-        logger.addHandler(console_handler)
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate(record.name)
 
-    return logger
+def parse_logger_map(value: str) -> Dict[str, str]:
+    """Parses `"name=value,other.name=value"` settings such as LOG_SAMPLING."""
+    entries = {}
+    for item in (value or "").split(","):
+        name, _, setting = item.partition("=")
+        if name.strip() and setting.strip():
+            entries[name.strip()] = setting.strip()
+    return entries
+
+def configure_logging():
+    """
+    Sends every log record through a queue to a background listener thread, so a log
+    call on a request path only formats its message and enqueues it; the console
+    write happens off the event loop. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    console_handler = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT.lower() == "json":
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Logger filters do not apply to records from child loggers; handler filters see every record
+    sampling = {name: float(rate) for name, rate in parse_logger_map(settings.LOG_SAMPLING).items()}
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+    root.addHandler(queue_handler)
+    for name, level in parse_logger_map(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,4 @@
+PROFILES_RETRIEVED_SUCCESS = "Request profiles retrieved successfully"
+PROFILE_RETRIEVED_SUCCESS = "Request profile retrieved successfully"
+PROFILE_NOT_FOUND = "Request profile not found"
+SLOW_QUERIES_RETRIEVED_SUCCESS = "Slow queries retrieved successfully"
@@ -15,4 +15,24 @@ INVALID_BOOK_INPUT = "Title and author are required fields"
 DATABASE_ERROR = "Database error"
 DUPLICATE_BOOK = "Book with the same title and author already exists."
 DUPLICATE_REVIEW = "You have already reviewed this book."
-NO_AI_CONTENT = "Some error occurred while receiving AI response."
\ No newline at end of file
+NO_AI_CONTENT = "Some error occurred while receiving AI response."
+INVALID_CURSOR = "Invalid pagination cursor."
+INVALID_PAGE_SIZE = "Page size must be a positive integer."
+REVIEW_UPDATED_SUCCESS = "Review updated successfully"
+REVIEW_DELETED_SUCCESS = "Review deleted successfully"
+REVIEW_NOT_FOUND = "Review not found"
+REVIEW_FORBIDDEN = "You can only modify your own reviews."
+RATING_AGGREGATES_REBUILT = "Rating aggregates rebuilt successfully"
+RATING_AGGREGATES_VERIFIED = "Rating aggregates verified successfully"
+LLM_CACHE_STATS_RETRIEVED_SUCCESS = "LLM cache statistics retrieved successfully"
+LLM_CACHE_PURGED_SUCCESS = "LLM cache purged successfully"
+ADMIN_REQUIRED = "This action requires an admin account."
+INVALID_BULK_SUMMARY_INPUT = "Provide book_ids or set missing_only to true."
+BULK_SUMMARIES_GENERATED_SUCCESS = "Bulk summaries generated successfully"
+INVALID_SEARCH_QUERY = "Search query must contain at least one word."
+SEARCH_NOT_SUPPORTED = "Full-text search is not supported on this database."
+SEARCH_RESULTS_RETRIEVED_SUCCESS = "Search results retrieved successfully"
+UNSUPPORTED_IMPORT_FORMAT = "Import format must be csv or jsonl."
+BOOKS_IMPORTED_SUCCESS = "Books imported successfully"
+UNSUPPORTED_EXPORT_FORMAT = "Export format must be ndjson or csv."
+BOOK_CACHE_STATS_RETRIEVED_SUCCESS = "Book cache statistics retrieved successfully"
@@ -0,0 +1,3 @@
+JOB_SUBMITTED_SUCCESS = "Job submitted successfully"
+JOB_RETRIEVED_SUCCESS = "Job retrieved successfully"
+JOB_NOT_FOUND = "Job not found"
@@ -0,0 +1,217 @@
+import abc
+import bisect
+import math
+import time
+from typing import Dict, List, Sequence, Tuple
+from starlette.routing import Match
+
+# Prometheus defaults, suited to request latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+class Registry:
+    """Collects metrics and renders them in the Prometheus text exposition format (0.0.4)."""
+
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for label_values, child in list(metric._children.items()):
+                lines.extend(child.samples(metric.name, metric.label_text(label_values)))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric(abc.ABC):
+    """
+    A named metric with fixed label names. Label children are created on first use and
+    kept for the life of the process, so label values must come from a small set
+    (route templates, backend names), never from ids or free text.
+
+    Updates are plain attribute arithmetic with no locking: every caller runs on the
+    event loop thread, and SQLAlchemy's sync engine events run there too.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def label_text(self, values: Tuple[str, ...]) -> str:
+        return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Returns the object holding one label combination's value."""
+
+def _series(name: str, labels: str, value: float, extra: str = "") -> str:
+    label_text = ",".join(part for part in (labels, extra) if part)
+    return f"{name}{{{label_text}}} {_number(value)}" if label_text else f"{name} {_number(value)}"
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def samples(self, name: str, labels: str):
+        return [_series(name, labels, self.value)]
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        # Buckets are stored non-cumulatively; render() accumulates them
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str):
+        lines, total = [], 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            lines.append(_series(f"{name}_bucket", labels, total, f'le="{_number(bound)}"'))
+        lines.append(_series(f"{name}_sum", labels, self.sum))
+        lines.append(_series(f"{name}_count", labels, total))
+        return lines
+
+class Counter(Metric):
+    """Monotonically increasing count; by convention its name ends in `_total`."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+# HTTP, recorded by MetricsMiddleware
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status.", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time until the last response byte was sent.", ["method", "route"]
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served.", ["method", "route"])
+
+# Database, recorded by engine and pool events in app/config/database.py
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time.", ["engine", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_STATEMENT_ERRORS = Counter("db_statement_errors_total", "SQL statements that raised an error.", ["engine"])
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CONNECTIONS_IN_USE = Gauge("db_pool_connections_in_use", "Pooled connections checked out.", ["engine"])
+
+# LLM inference, recorded by InferenceHelper
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Inference call time, to the last token.", ["backend", "outcome"], buckets=LLM_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Time until a streamed completion's first token.", ["backend"], buckets=LLM_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the backend (or streamed chunks when it reports none).", ["backend", "kind"])
+LLM_RATE_LIMITED = Counter("llm_rate_limited_total", "Inference calls answered with HTTP 429.", ["backend"])
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Inference calls retried on another backend.", ["from_backend", "to_backend"])
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request counts, latency and in-flight
+    requests. Routes are labelled by their template (`/api/books/{book_id}`), so ids in
+    paths never create new series; unmatched paths share the `unmatched` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def route_template(scope) -> str:
+        partial = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method, route = scope["method"], self.route_template(scope)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
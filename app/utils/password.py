@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.hash import bcrypt
+from app.config.settings import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Module-level so a process pool can pickle them
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+def _verify(password: str, hashed: str) -> bool:
+    return bcrypt.verify(password, hashed)
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded executor so that the 100-300ms of
+    CPU each call takes never blocks the event loop.
+
+    `executor` is `thread`, `process` or `auto`. Threads only help when the bcrypt
+    backend releases the GIL, which the `bcrypt` package does and the system `crypt`
+    fallback does not, so `auto` picks threads for the former and processes otherwise.
+    Either way up to `workers` hashes run in parallel, so logins scale with cores.
+    """
+
+    def __init__(self, rounds: int, workers: int, executor: str = "auto"):
+        self.rounds = rounds
+        self.workers = workers
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            kind = self.executor_kind
+            if kind == "auto":
+                kind = "thread" if bcrypt.get_backend() == "bcrypt" else "process"
+            logger.info("Starting password hashing %s pool with %s workers.", kind, self.workers)
+            if kind == "process":
+                # spawn: forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Checks `password` against `hashed`.
+
+        Returns:
+            tuple: Whether the password matches, and a new hash at the configured cost when
+            the match succeeded but `hashed` was made with a different cost (else None).
+        """
+        if not await self._run(_verify, password, hashed):
+            return False, None
+        if not bcrypt.using(rounds=self.rounds).needs_update(hashed):
+            return True, None
+        logger.info("Rehashing password at bcrypt cost %s.", self.rounds)
+        return True, await self.hash(password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
@@ -0,0 +1,187 @@
+import cProfile
+import pstats
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from app.config.settings import settings
+from app.utils.jwt import verify_access_token
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# Statement parameters can be large (executemany) or sensitive; only a prefix is kept
+MAX_PARAMETERS_LENGTH = 500
+
+class RequestProfile:
+    """Timings gathered for one profiled request: SQL statements and, optionally, a cProfile run."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = 0.0
+        # SQL text -> [engine, executions, total seconds, slowest execution]
+        self.statements = {}
+        self.functions = None
+
+    def add_statement(self, engine: str, statement: str, elapsed: float):
+        entry = self.statements.get(statement)
+        if entry is None:
+            entry = self.statements[statement] = [engine, 0, 0.0, 0.0]
+        entry[1] += 1
+        entry[2] += elapsed
+        entry[3] = max(entry[3], elapsed)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(self.duration, 6),
+            "db_statements": sum(entry[1] for entry in self.statements.values()),
+            "db_seconds": round(sum(entry[2] for entry in self.statements.values()), 6),
+            "cprofile": self.functions is not None,
+        }
+
+    def to_dict(self) -> dict:
+        # Statements repeated many times in one request (N+1 queries) sort to the top
+        statements = sorted(self.statements.items(), key=lambda item: item[1][2], reverse=True)
+        return {
+            **self.summary(),
+            "statements": [
+                {"sql": sql, "engine": engine, "count": count,
+                 "total_seconds": round(total, 6), "max_seconds": round(slowest, 6)}
+                for sql, (engine, count, total, slowest) in statements
+            ],
+            "functions": self.functions,
+        }
+
+class ProfileStore:
+    """Keeps the most recent `max_entries` request profiles, oldest dropped first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+
+    def add(self, profile: RequestProfile):
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+class SlowQueryLog:
+    """Logs and keeps the last `max_entries` statements that took at least `threshold` seconds (0 disables)."""
+
+    def __init__(self, threshold: float, max_entries: int):
+        self.threshold = threshold
+        self._entries = deque(maxlen=max_entries)
+
+    def record(self, engine: str, statement: str, parameters, elapsed: float):
+        if self.threshold <= 0 or elapsed < self.threshold:
+            return
+        parameters = repr(parameters)[:MAX_PARAMETERS_LENGTH]
+        logger.warning("Slow query on %s (%.3fs): %s; parameters: %s", engine, elapsed, statement, parameters)
+        self._entries.append({
+            "engine": engine,
+            "sql": statement,
+            "parameters": parameters,
+            "duration_seconds": round(elapsed, 6),
+            "at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def list(self) -> list:
+        return list(reversed(self._entries))
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+profile_store = ProfileStore(settings.PROFILE_MAX_ENTRIES)
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_SECONDS, settings.SLOW_QUERY_LOG_MAX_ENTRIES)
+
+def record_statement(engine: str, statement: str, parameters, elapsed: float):
+    """Called by the engine instrumentation in app/config/database.py after every statement."""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_statement(engine, statement, elapsed)
+    slow_query_log.record(engine, statement, parameters, elapsed)
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> list:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {"function": f"{filename}:{line}({name})", "calls": calls,
+         "own_seconds": round(own, 6), "cumulative_seconds": round(cumulative, 6)}
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles a random `sample_rate` fraction of requests, plus
+    any request sent with an `X-Profile` header by an admin. A profiled request gets an
+    `X-Profile-Id` response header; the profile is read back through /api/admin/profiles.
+
+    Every profiled request records its SQL statements. cProfile runs for one request at
+    a time (the interpreter allows a single active profiler), and because every task on
+    the event loop shares the thread, its figures include any requests served
+    concurrently. Profile under light load for a clean function breakdown.
+    """
+
+    def __init__(self, app, sample_rate: float = None, top_functions: int = None, store: ProfileStore = None):
+        self.app = app
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.top_functions = top_functions or settings.PROFILE_TOP_FUNCTIONS
+        self.store = store or profile_store
+        self._cprofile_busy = False
+
+    def wants_profile(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers:
+            authorization = headers.get(b"authorization", b"").decode("latin-1")
+            if authorization.startswith("Bearer "):
+                payload = verify_access_token(authorization[len("Bearer "):])
+                if payload and payload.get("role") == "admin":
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wants_profile(scope):
+            return await self.app(scope, receive, send)
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        profiler = None
+        if not self._cprofile_busy:
+            self._cprofile_busy = True
+            profiler = cProfile.Profile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.duration = time.perf_counter() - started
+            current_profile.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_busy = False
+                profile.functions = _top_functions(profiler, self.top_functions)
+            self.store.add(profile)
+            logger.info("Profiled %s %s in %.3fs (profile %s).", profile.method, profile.path, profile.duration, profile.id)
@@ -0,0 +1,320 @@
+import asyncio
+import math
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config.settings import settings
+from app.models.book import Book
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Author and genre also match as whole phrases, so they weigh more than single summary words
+FIELD_WEIGHTS = {"title": 1.0, "genre": 2.0, "author": 2.0, "summary": 1.0}
+
+# Pending changes are folded into the index's CSR arrays once they outnumber this many rows,
+# or this fraction of the index, whichever is larger
+COMPACT_MIN_CHANGES = 256
+COMPACT_FRACTION = 0.05
+
+class RecommendationIndex:
+    """
+    Hashed TF-IDF vectors of the catalog, stored sparse (CSR): a row keeps only the buckets
+    its book uses, so memory follows the catalog's text rather than `books x n_features`.
+
+    Changes since the last compaction live beside the CSR arrays: `overlay` holds new or
+    replaced vectors and `dropped` the ids whose CSR row no longer counts. Vectors of
+    changed books are weighted with the document frequencies of the last full build.
+    """
+
+    def __init__(self, book_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 idf: np.ndarray, applied_through: int, built_at: float = None):
+        self.book_ids = book_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.entry_rows = np.repeat(np.arange(len(book_ids), dtype=np.int32), np.diff(indptr))
+        self.positions = {int(book_id): position for position, book_id in enumerate(book_ids.tolist())}
+        self.idf = idf
+        # Every change numbered up to this one is reflected in the index
+        self.applied_through = applied_through
+        self.built_at = time.monotonic() if built_at is None else built_at
+        self.overlay: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.dropped: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.positions) - len(self.dropped) + len(self.overlay)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes + self.entry_rows.nbytes + self.book_ids.nbytes
+
+    def vector(self, book_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if book_id in self.overlay:
+            return self.overlay[book_id]
+        position = self.positions.get(book_id)
+        if position is None or book_id in self.dropped:
+            return None
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def put(self, book_id: int, vector: Tuple[np.ndarray, np.ndarray]):
+        if book_id in self.positions:
+            self.dropped.add(book_id)
+        self.overlay[book_id] = vector
+
+    def remove(self, book_id: int):
+        self.overlay.pop(book_id, None)
+        if book_id in self.positions:
+            self.dropped.add(book_id)
+
+    def needs_compaction(self) -> bool:
+        return len(self.overlay) + len(self.dropped) > max(COMPACT_MIN_CHANGES, COMPACT_FRACTION * len(self.positions))
+
+    def compacted(self) -> "RecommendationIndex":
+        """Returns the same vectors with the pending changes folded into new CSR arrays."""
+        kept = np.ones(len(self.book_ids), dtype=bool)
+        kept[[self.positions[book_id] for book_id in self.dropped]] = False
+        entries = kept[self.entry_rows]
+        overlay = list(self.overlay.items())
+        lengths = np.concatenate([np.diff(self.indptr)[kept], [len(indices) for _, (indices, _) in overlay]]).astype(np.int64)
+        return RecommendationIndex(
+            np.concatenate([self.book_ids[kept], np.array([book_id for book_id, _ in overlay], dtype=np.int64)]),
+            np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            np.concatenate([self.indices[entries]] + [indices for _, (indices, _) in overlay]).astype(np.int32),
+            np.concatenate([self.data[entries]] + [data for _, (_, data) in overlay]).astype(np.float32),
+            self.idf, self.applied_through, self.built_at,
+        )
+
+    def scores(self, profile: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns every indexed book id and its dot product with the dense `profile`."""
+        scores = np.bincount(self.entry_rows, weights=self.data * profile[self.indices], minlength=len(self.book_ids))
+        if self.dropped:
+            scores[[self.positions[book_id] for book_id in self.dropped]] = -math.inf
+        if not self.overlay:
+            return self.book_ids, scores
+        overlay_ids = np.fromiter(self.overlay, dtype=np.int64, count=len(self.overlay))
+        overlay_scores = np.array([data @ profile[indices] for indices, data in self.overlay.values()], dtype=np.float64)
+        return np.concatenate([self.book_ids, overlay_ids]), np.concatenate([scores, overlay_scores])
+
+class BookRecommender:
+    """
+    In-process content-based recommender over the book catalog.
+
+    Every book becomes a TF-IDF weighted, L2-normalized vector built with the hashing
+    trick from its title, genre, author and summary. A user's profile is the
+    rating-weighted sum of the books they rated 4 or higher, and all candidates are
+    scored against it with one sparse matrix-vector product.
+
+    Books changed in this process are passed to `invalidate()` and re-vectorized one by one
+    on the next request. The whole index is rebuilt once it is older than `ttl_seconds`
+    (changes made elsewhere, and fresh document frequencies); the rebuild runs in the
+    background while requests keep using the previous index. Only the very first request
+    waits for a build.
+    """
+
+    def __init__(self, n_features: int, ttl_seconds: float):
+        self.n_features = n_features
+        self.ttl_seconds = ttl_seconds
+        self._index: Optional[RecommendationIndex] = None
+        # Book id to the number of its latest change
+        self._changes: Dict[int, int] = {}
+        self._change_count = 0
+        self._rebuild: Optional[asyncio.Task] = None
+        self._rebuild_from = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, *book_ids: int):
+        """Marks books as changed (created, updated or deleted); without ids the next request rebuilds the whole index."""
+        if not book_ids and self._index is not None:
+            self._index.built_at = -math.inf
+        for book_id in book_ids:
+            self._change_count += 1
+            self._changes[book_id] = self._change_count
+
+    @property
+    def index_nbytes(self) -> int:
+        return self._index.nbytes if self._index is not None else 0
+
+    def reset(self):
+        """Drops the index and every pending change."""
+        self._index = None
+        self._changes.clear()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return re.findall(r"\w+", (text or "").lower())
+
+    def _features(self, book) -> Counter:
+        features = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            text = getattr(book, field) or ""
+            for token in self.tokenize(text):
+                features[f"{field}:{token}"] += weight
+            if field in ("genre", "author") and text.strip():
+                features[f"{field}={' '.join(self.tokenize(text))}"] += weight
+        return features
+
+    def _term_counts(self, book) -> Tuple[np.ndarray, np.ndarray]:
+        buckets = Counter()
+        for feature, count in self._features(book).items():
+            # crc32 rather than hash() so buckets do not change between processes
+            buckets[zlib.crc32(feature.encode()) % self.n_features] += count
+        indices = np.array(sorted(buckets), dtype=np.int32)
+        return indices, np.array([buckets[bucket] for bucket in indices.tolist()], dtype=np.float32)
+
+    def vectorize(self, book, idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the bucket indices and L2-normalized weights of one book's vector."""
+        indices, counts = self._term_counts(book)
+        # Sublinear term frequency
+        data = (np.log1p(counts) * idf[indices]).astype(np.float32)
+        norm = np.linalg.norm(data)
+        if norm > 0:
+            data /= norm
+        return indices, data
+
+    def build_index(self, books: Iterable, applied_through: int = 0) -> RecommendationIndex:
+        """Vectorizes `books` (objects or rows with id, title, genre, author and summary)."""
+        books = list(books)
+        counts = [self._term_counts(book) for book in books]
+        lengths = np.array([len(indices) for indices, _ in counts], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        indices = np.concatenate([np.empty(0, dtype=np.int32)] + [indices for indices, _ in counts])
+        data = np.log1p(np.concatenate([np.empty(0, dtype=np.float32)] + [values for _, values in counts]))
+        # Smoothed inverse document frequency; a row lists each bucket once
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        idf = (np.log((1 + len(books)) / (1 + document_frequency)) + 1).astype(np.float32)
+        data *= idf[indices]
+        entry_rows = np.repeat(np.arange(len(books)), lengths)
+        norms = np.sqrt(np.bincount(entry_rows, weights=data.astype(np.float64) ** 2, minlength=len(books)))
+        np.divide(data, norms[entry_rows], out=data, where=norms[entry_rows] > 0)
+        book_ids = np.array([book.id for book in books], dtype=np.int64)
+        return RecommendationIndex(book_ids, indptr, indices, data.astype(np.float32), idf, applied_through)
+
+    def index_books(self, books: Iterable):
+        """Replaces the index with vectors for `books`."""
+        self._index = self.build_index(books, self._change_count)
+        self._forget_applied_changes()
+
+    def update_books(self, books: Iterable, removed: Iterable[int] = ()):
+        """Re-vectorizes changed `books` and drops the `removed` ids from the index."""
+        self._index = self._updated(self._index, books, removed)
+
+    async def ensure_index(self, db: AsyncSession):
+        if self._index is None:
+            async with self._lock:
+                if self._index is None:
+                    applied_through = self._change_count
+                    self._index = await self._build(db, applied_through)
+                    self._forget_applied_changes()
+        elif self._rebuild is None and time.monotonic() - self._index.built_at > self.ttl_seconds:
+            self._rebuild = asyncio.create_task(self._rebuild_in_background(db.bind))
+        await self._apply_changes(db)
+
+    async def _build(self, db: AsyncSession, applied_through: int) -> RecommendationIndex:
+        started = time.perf_counter()
+        result = await db.execute(
+            select(Book.id, Book.title, Book.genre, Book.author, Book.summary).order_by(Book.id)
+        )
+        rows = result.all()
+        # Vectorizing is CPU-bound; keep it off the event loop for large catalogs
+        index = await asyncio.to_thread(self.build_index, rows, applied_through)
+        logger.info("Recommendation index built for %s books (%.1f MB) in %.3fs.",
+                    len(rows), index.nbytes / 2 ** 20, time.perf_counter() - started)
+        return index
+
+    async def _rebuild_in_background(self, bind):
+        # Changes numbered up to here are committed, so the rows read below include them
+        self._rebuild_from = self._change_count
+        try:
+            async with AsyncSession(bind) as db:
+                index = await self._build(db, self._rebuild_from)
+            async with self._lock:
+                self._index = index
+        except Exception as e:
+            logger.error("Rebuilding the recommendation index failed: %s", e)
+        finally:
+            self._rebuild, self._rebuild_from = None, None
+            self._forget_applied_changes()
+
+    async def _apply_changes(self, db: AsyncSession):
+        index = self._index
+        if not any(number > index.applied_through for number in self._changes.values()):
+            return
+        async with self._lock:
+            index = self._index
+            pending = {book_id: number for book_id, number in self._changes.items() if number > index.applied_through}
+            if not pending:
+                return
+            result = await db.execute(
+                select(Book.id, Book.title, Book.genre, Book.author, Book.summary).where(Book.id.in_(list(pending)))
+            )
+            books = result.all()
+            found = {book.id for book in books}
+            removed = set(pending) - found
+            if len(pending) > COMPACT_MIN_CHANGES:
+                # Large batches (e.g. an import) are vectorized and compacted off the event loop
+                self._index = await asyncio.to_thread(self._updated, index, books, removed)
+            else:
+                self.update_books(books, removed)
+            self._index.applied_through = max(pending.values())
+            self._forget_applied_changes()
+
+    def _updated(self, index: RecommendationIndex, books: Iterable, removed: Iterable[int]) -> RecommendationIndex:
+        for book in books:
+            index.put(book.id, self.vectorize(book, index.idf))
+        for book_id in removed:
+            index.remove(book_id)
+        return index.compacted() if index.needs_compaction() else index
+
+    def _forget_applied_changes(self):
+        if self._index is None:
+            return
+        # A running rebuild swaps in an index that only reflects changes up to where it started
+        floor = self._index.applied_through if self._rebuild_from is None else min(self._index.applied_through, self._rebuild_from)
+        for book_id in [book_id for book_id, number in self._changes.items() if number <= floor]:
+            del self._changes[book_id]
+
+    def recommend(self, liked: Dict[int, int], exclude: Set[int], limit: int) -> List[Tuple[int, float]]:
+        """
+        Scores every indexed book against the user's liked books.
+
+        Args:
+            liked (dict): Book id to rating for the books the user rated 4 or higher.
+            exclude (set): Book ids that must not be recommended (e.g. already reviewed).
+            limit (int): Maximum number of recommendations.
+
+        Returns:
+            list: `(book_id, score)` pairs with a positive score, best first.
+        """
+        index = self._index
+        if index is None or limit < 1:
+            return []
+        profile = np.zeros(self.n_features, dtype=np.float32)
+        found = False
+        for book_id, rating in liked.items():
+            vector = index.vector(book_id)
+            if vector is not None:
+                indices, data = vector
+                # A 5-star rating pulls the profile twice as hard as a 4-star one
+                profile[indices] += (rating - 3) * data
+                found = True
+        if not found:
+            return []
+        book_ids, scores = index.scores(profile)
+        if exclude:
+            scores[np.isin(book_ids, list(exclude))] = -math.inf
+        count = min(limit, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(book_ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+book_recommender = BookRecommender(
+    n_features=settings.RECOMMENDER_FEATURES,
+    ttl_seconds=settings.RECOMMENDER_INDEX_TTL_SECONDS,
+)
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from collections import deque
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend while its circuit breaker is open."""
+
+class AdaptiveTokenBucket:
+    """
+    Client-side token bucket whose refill rate adapts to the backend: every success
+    raises the rate additively, every throttle response cuts it multiplicatively
+    (AIMD) and a `Retry-After` hint pauses all callers until it has passed.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 increase_step: float = 0.1, decrease_factor: float = 0.5):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.tokens = burst
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: float = None):
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.tokens = 0
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        logger.warning("Backend throttled us; rate lowered to %.2f req/s (retry_after=%s).", self.rate, retry_after)
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker. After `failure_threshold`
+    consecutive failures calls fail fast for `recovery_timeout` seconds, then a
+    limited number of trial calls decide whether to close the circuit again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._half_open_calls = 0
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise CircuitOpenError(f"Circuit for {self.name} is open; failing fast.")
+            self.state = self.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info("Circuit for %s is half-open; sending a trial call.", self.name)
+        if self.state == self.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open; trial call in progress.")
+            self._half_open_calls += 1
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit for %s closed.", self.name)
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def release(self):
+        """Gives back a half-open trial slot for a call that ended without a verdict (e.g. cancelled)."""
+        if self.state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.error("Circuit for %s opened after %s failures.", self.name, self.failures)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent first attempts (plus a small floor) over a
+    sliding window, so retries cannot multiply traffic while a backend is down.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window_seconds: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._requests = deque()
+        self._retries = deque()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window_seconds:
+                events.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def can_retry(self) -> bool:
+        """Returns True, and spends budget, if one more retry is allowed right now."""
+        now = time.monotonic()
+        self._trim(now)
+        allowed = self.min_per_second * self.window_seconds + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            logger.warning("Retry budget exhausted; not retrying.")
+            return False
+        self._retries.append(now)
+        return True
@@ -0,0 +1,51 @@
+import re
+from typing import List
+from sqlalchemy import func, literal_column, table, column, bindparam
+from sqlalchemy.future import select
+from app.models.book import Book, POSTGRESQL_SEARCH_DOCUMENT
+
+# bm25 column weights for title, author, genre and summary (FTS5 column order)
+SQLITE_COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+books_fts = table("books_fts", column("rowid"))
+
+# Dialects build_search_query has an index-backed query for
+SEARCH_DIALECTS = ("sqlite", "postgresql")
+
+def search_terms(query: str) -> List[str]:
+    """
+    Splits free text into plain search terms. Operators and quotes are dropped so user
+    input can never be parsed as FTS5 or tsquery syntax.
+    """
+    return re.findall(r"\w+", (query or "").lower())
+
+def build_search_query(dialect: str, terms: List[str]):
+    """
+    Builds a ranked full-text query over the catalog for the given database dialect.
+    Every term must match, and the last term also matches as a prefix so that
+    search-as-you-type works.
+
+    Returns:
+        Select: Selects `(Book, score)` rows, best match first (higher score is better).
+    """
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        # bm25() is lower-is-better, so negate it to report a higher-is-better score
+        rank = func.bm25(literal_column("books_fts"), *SQLITE_COLUMN_WEIGHTS)
+        return (
+            select(Book, (-rank).label("score"))
+            .join(books_fts, books_fts.c.rowid == Book.id)
+            .where(literal_column("books_fts").op("MATCH")(bindparam("match", match)))
+            .order_by(rank, Book.id)
+        )
+    if dialect == "postgresql":
+        # Must stay textually identical to the indexed expression for the GIN index to be used
+        document = literal_column(f"({POSTGRESQL_SEARCH_DOCUMENT})")
+        tsquery = func.to_tsquery(literal_column("'english'"), bindparam("match", " & ".join(terms) + ":*"))
+        rank = func.ts_rank(document, tsquery)
+        return (
+            select(Book, rank.label("score"))
+            .where(document.op("@@")(tsquery))
+            .order_by(rank.desc(), Book.id)
+        )
+    raise NotImplementedError(f"Full-text search is not supported on {dialect}.")
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller for a key (the leader) starts the call as its own task; callers
+    arriving while it is in flight (followers) await the same task and receive its
+    result or exception. Every caller awaits through `asyncio.shield`, so cancelling
+    any one of them, the leader included, never cancels the shared call while others
+    still wait for it; once every caller has been cancelled, so is the call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._callers: Dict[asyncio.Task, int] = {}
+        self.counters = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Runs `fn(*args, **kwargs)` unless a call for `key` is already in flight.
+
+        Returns:
+            tuple: The call result and whether it was shared from another caller's call.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.counters["followers"] += 1
+            logger.debug("Joining in-flight call: %s", key)
+        else:
+            self.counters["leaders"] += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self._callers[task] = self._callers.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self._callers[task] -= 1
+            if not self._callers[task]:
+                del self._callers[task]
+                if not task.done():
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, key: Hashable):
+        """Lets the next caller for `key` start a fresh call; callers already waiting keep theirs."""
+        self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+ai_single_flight = SingleFlight()
@@ -0,0 +1,354 @@
+"""
+Synthetic catalog generator for testing at production scale.
+
+Bulk-loads books, users and reviews with skewed, production-like distributions:
+- book popularity follows a Zipf law, so a few books collect most of the reviews;
+- reviews per user are long-tailed (most users write a handful, a few write hundreds);
+- ratings lean positive, with a per-book quality bias.
+
+The rating aggregates on `books` are computed from the generated reviews, so they agree
+with the reviews table from the start (`python -m app.commands.rating_aggregates --verify`).
+Every generated user has the password `synthetic-password`.
+
+Usage:
+    python -m benchmarks.generate_catalog --database-url sqlite+aiosqlite:///catalog.db \\
+        --books 1000000 --reviews 20000000 --users 500000
+    python -m benchmarks.generate_catalog --database-url postgresql+asyncpg://postgres@localhost/books_scale \\
+        --books 2000000 --reviews 30000000 --users 1000000 --reset
+
+The books, reviews and users tables must be empty (`--reset` drops and recreates every
+table first). PostgreSQL is loaded with COPY, SQLite with batched inserts; secondary indexes
+are dropped for the load and rebuilt at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+
+PASSWORD = "synthetic-password"
+# Reviews generated (and written) per batch; bounds memory whatever the catalog size
+REVIEW_CHUNK = 1_000_000
+BOOK_CHUNK = 50_000
+MAX_DRAW_ROUNDS = 10
+
+ADJECTIVES = (
+    "silent hidden broken golden distant secret burning quiet endless crimson forgotten lonely "
+    "wild bright hollow frozen ancient restless gentle bitter wandering iron silver final "
+    "sleeping lost painted northern dark electric glass paper scarlet open sudden long"
+).split()
+NOUNS = (
+    "river garden winter empire kingdom ocean harbor orchard city mountain forest island "
+    "letter mirror crown road bridge tower house field storm shadow season daughter son "
+    "stranger witness promise memory engine voyage archive lantern theory song station "
+    "border window country machine circle signal rain dream compass island fire night summer"
+).split()
+FIRST_NAMES = (
+    "Ada Alan Amara Anton Beatriz Bruno Chen Clara Dmitri Elena Emeka Farah Felix Grace Hana "
+    "Hugo Ines Ivan Jonas Julia Kai Kofi Lena Leo Lucia Malik Maya Nadia Nils Olga Omar "
+    "Paulo Priya Rafael Rosa Samir Sara Sofia Tariq Theo Uma Vera Viktor Wen Yara Yusuf Zara"
+).split()
+LAST_NAMES = (
+    "Abe Almeida Berg Brennan Castillo Dahl Diaz Eklund Farouk Fischer Garcia Haddad Hansen "
+    "Ito Jensen Kaur Kim Kowalski Larsen Li Lindqvist Mbeki Moreau Mwangi Nakamura Novak "
+    "Okafor Olsen Park Petrov Quinn Rahman Rossi Sato Schmidt Silva Singh Sorensen Tanaka "
+    "Toure Varga Walsh Weber Wong Yilmaz Zhang"
+).split()
+GENRES = ["Fiction", "Fantasy", "Mystery", "Science Fiction", "Romance", "Thriller", "History",
+          "Biography", "Horror", "Poetry", "Young Adult", "Non-Fiction"]
+GENRE_WEIGHTS = np.array([20, 12, 12, 9, 10, 9, 6, 5, 4, 2, 6, 5], dtype=float)
+VOCABULARY = (
+    "story journey family love war friendship secret past truth world life death home city "
+    "village sea night dream memory power betrayal hope loss courage young old woman man child "
+    "king queen detective murder crime mystery magic dragon ship star planet future machine "
+    "letter island mountain forest river winter summer garden empire rebellion escape return "
+    "discovers finds must faces learns leaves returns searches fights loves hides remembers "
+    "dangerous forbidden hidden ancient strange quiet brilliant haunted lost final first new"
+).split()
+REVIEW_TEXTS = {
+    1: ["Could not finish it.", "Not for me at all.", "Disappointing from start to end."],
+    2: ["Had its moments, but dragged.", "Expected more.", "Uneven and slow."],
+    3: ["Decent read.", "Good in parts.", "Enjoyable enough."],
+    4: ["Really enjoyed it.", "A great read.", "Well written and gripping."],
+    5: ["Loved every page!", "An instant favorite.", "Brilliant, highly recommended."],
+}
+
+class CatalogSpec:
+    def __init__(self, books: int, reviews: int, users: int, zipf_exponent: float = 1.1, seed: int = 1):
+        self.books = books
+        self.reviews = reviews
+        self.users = users
+        self.zipf_exponent = zipf_exponent
+        self.seed = seed
+
+class CatalogGenerator:
+    """
+    Produces the catalog deterministically from `spec.seed`. Reviews are generated in
+    chunks, each from its own seeded RNG, so they can be generated twice: once to compute
+    the book aggregates and once to write the rows, without holding every review in memory.
+    """
+
+    def __init__(self, spec: CatalogSpec):
+        self.spec = spec
+        rng = np.random.default_rng([spec.seed, 0])
+        # Popularity rank -> book id, so popularity is unrelated to insertion order
+        self.rank_to_book = rng.permutation(spec.books).astype(np.int64) + 1
+        weights = 1.0 / np.arange(1, spec.books + 1) ** spec.zipf_exponent
+        self.popularity_cdf = np.cumsum(weights / weights.sum())
+        self.quality = rng.normal(0.0, 0.6, spec.books + 1).astype(np.float32)
+        # Long-tailed reviews per user, scaled to the requested total
+        activity = rng.lognormal(mean=0.0, sigma=1.2, size=spec.users)
+        counts = np.maximum(1, np.rint(activity * spec.reviews / activity.sum())).astype(np.int64)
+        self.reviews_per_user = np.minimum(counts, spec.books)
+        self.n_authors = max(1, spec.books // 8)
+
+    def review_chunks(self):
+        """Yields `(user_ids, book_ids, ratings)` arrays, with each (user, book) pair at most once."""
+        bounds = np.cumsum(self.reviews_per_user)
+        start_user, chunk = 0, 0
+        while start_user < self.spec.users:
+            end_user = int(np.searchsorted(bounds, bounds[start_user] - self.reviews_per_user[start_user] + REVIEW_CHUNK, side="right"))
+            end_user = max(end_user, start_user + 1)
+            rng = np.random.default_rng([self.spec.seed, 1, chunk])
+            users = np.arange(start_user + 1, end_user + 1, dtype=np.int64)
+            wanted = self.reviews_per_user[start_user:end_user]
+            keys, missing = np.empty(0, dtype=np.int64), wanted
+            # Active users draw popular books repeatedly; redraw what deduplication removed
+            for _ in range(MAX_DRAW_ROUNDS):
+                user_ids = np.repeat(users, missing)
+                ranks = np.minimum(np.searchsorted(self.popularity_cdf, rng.random(len(user_ids))), self.spec.books - 1)
+                keys = np.unique(np.concatenate([keys, user_ids * (self.spec.books + 1) + self.rank_to_book[ranks]]))
+                missing = wanted - np.bincount(keys // (self.spec.books + 1) - start_user - 1, minlength=len(users))
+                if not missing.any():
+                    break
+            user_ids, book_ids = np.divmod(keys, self.spec.books + 1)
+            noise = rng.normal(0.0, 0.9, len(book_ids)).astype(np.float32)
+            ratings = np.clip(np.rint(3.7 + self.quality[book_ids] + noise), 1, 5).astype(np.int64)
+            yield user_ids, book_ids, ratings
+            start_user, chunk = end_user, chunk + 1
+
+    def rating_histogram(self) -> np.ndarray:
+        """`(5, books + 1)` review counts per rating and book id."""
+        histogram = np.zeros((5, self.spec.books + 1), dtype=np.int64)
+        for _, book_ids, ratings in self.review_chunks():
+            for rating in range(1, 6):
+                histogram[rating - 1] += np.bincount(book_ids[ratings == rating], minlength=self.spec.books + 1)
+        return histogram
+
+    def _title(self, index: int) -> str:
+        adjective = ADJECTIVES[index % len(ADJECTIVES)].title()
+        first = NOUNS[(index // len(ADJECTIVES)) % len(NOUNS)].title()
+        second = NOUNS[(index // (len(ADJECTIVES) * len(NOUNS))) % len(NOUNS)].title()
+        template = ("The {0} {1} of {2}", "{2} and the {0} {1}", "A {0} {1} for the {2}")[index % 3]
+        return template.format(adjective, first, second)
+
+    def _author(self, index: int) -> str:
+        combinations = len(FIRST_NAMES) * len(LAST_NAMES) * 26
+        name = (f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {chr(65 + (index // len(FIRST_NAMES)) % 26)}. "
+                f"{LAST_NAMES[(index // (len(FIRST_NAMES) * 26)) % len(LAST_NAMES)]}")
+        return name if index < combinations else f"{name} {index // combinations + 1}"
+
+    def book_rows(self, histogram: np.ndarray):
+        """Yields lists of book rows (ids 1..books) in BOOK_COLUMNS order."""
+        title_space = len(ADJECTIVES) * len(NOUNS) * len(NOUNS)
+        word_weights = 1.0 / np.arange(1, len(VOCABULARY) + 1)
+        word_weights /= word_weights.sum()
+        genre_weights = GENRE_WEIGHTS / GENRE_WEIGHTS.sum()
+        for start in range(0, self.spec.books, BOOK_CHUNK):
+            rng = np.random.default_rng([self.spec.seed, 2, start])
+            end = min(start + BOOK_CHUNK, self.spec.books)
+            genres = rng.choice(len(GENRES), size=end - start, p=genre_weights)
+            years = rng.integers(1850, 2026, size=end - start)
+            words = rng.choice(len(VOCABULARY), size=(end - start, 45), p=word_weights).tolist()
+            lengths = rng.integers(20, 46, size=end - start).tolist()
+            counts = histogram[:, start + 1:end + 1]
+            review_counts = counts.sum(axis=0).tolist()
+            rating_sums = (counts * np.arange(1, 6)[:, None]).sum(axis=0).tolist()
+            counts, genres, years = counts.T.tolist(), genres.tolist(), years.tolist()
+            rows = []
+            for offset, book_id in enumerate(range(start + 1, end + 1)):
+                author = (book_id - 1) % self.n_authors
+                # Distinct per author, so (title, author) stays unique
+                title_index = ((book_id - 1) // self.n_authors + author * 7919) % title_space
+                rows.append((
+                    book_id, self._title(title_index), self._author(author), GENRES[genres[offset]],
+                    years[offset], " ".join(map(VOCABULARY.__getitem__, words[offset][:lengths[offset]])).capitalize() + ".",
+                    review_counts[offset], rating_sums[offset], *counts[offset], 1,
+                ))
+            yield rows
+
+    def user_rows(self, password_hash: str):
+        for start in range(0, self.spec.users, BOOK_CHUNK):
+            yield [
+                (user_id, f"user{user_id}", f"user{user_id}@example.com", password_hash, "user")
+                for user_id in range(start + 1, min(start + BOOK_CHUNK, self.spec.users) + 1)
+            ]
+
+    def review_rows(self):
+        review_id = 0
+        for user_ids, book_ids, ratings in self.review_chunks():
+            rows = []
+            for user_id, book_id, rating in zip(user_ids.tolist(), book_ids.tolist(), ratings.tolist()):
+                review_id += 1
+                texts = REVIEW_TEXTS[rating]
+                rows.append((review_id, book_id, user_id, texts[review_id % len(texts)], rating))
+            yield rows
+
+BOOK_COLUMNS = ["id", "title", "author", "genre", "year_published", "summary", "review_count", "rating_sum",
+                "rating_count_1", "rating_count_2", "rating_count_3", "rating_count_4", "rating_count_5", "version"]
+USER_COLUMNS = ["id", "username", "email", "password", "role"]
+REVIEW_COLUMNS = ["id", "book_id", "user_id", "review_text", "rating"]
+
+class SQLiteWriter:
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.indexes = []
+        # A throwaway load: trade durability for speed until the final commit
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute("PRAGMA cache_size = -262144")
+
+    async def begin_load(self, tables: tuple):
+        # The full-text search triggers index every inserted book; the index is rebuilt once instead
+        placeholders = ", ".join("?" for _ in tables)
+        self.indexes = self.connection.execute(
+            f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL "
+            f"AND tbl_name IN ({placeholders})",
+            tables,
+        ).fetchall()
+        for kind, name, _ in self.indexes:
+            self.connection.execute(f"DROP {kind.upper()} {name}")
+
+    async def write(self, table: str, columns: list, rows: list):
+        placeholders = ", ".join("?" for _ in columns)
+        self.connection.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        self.connection.commit()
+
+    async def finish(self):
+        for _, _, sql in self.indexes:
+            self.connection.execute(sql)
+        if self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'").fetchone():
+            self.connection.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+        self.connection.execute("ANALYZE")
+        self.connection.commit()
+        self.connection.close()
+
+class PostgresWriter:
+    def __init__(self, connection):
+        self.connection = connection
+        self.indexes = []
+
+    @classmethod
+    async def connect(cls, dsn: str):
+        import asyncpg
+        return cls(await asyncpg.connect(dsn))
+
+    async def begin_load(self, tables: tuple):
+        # Primary keys stay: they back constraints and the loaded ids must be unique anyway
+        self.indexes = await self.connection.fetch(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = ANY($1::text[]) AND indexname NOT IN (SELECT conname FROM pg_constraint)",
+            list(tables),
+        )
+        for index in self.indexes:
+            await self.connection.execute(f'DROP INDEX "{index["indexname"]}"')
+
+    async def write(self, table: str, columns: list, rows: list):
+        await self.connection.copy_records_to_table(table, records=rows, columns=columns)
+
+    async def finish(self):
+        await self.connection.execute("SET maintenance_work_mem = '512MB'")
+        for index in self.indexes:
+            await self.connection.execute(index["indexdef"])
+        # Explicit ids bypass the sequences; move them past the loaded rows
+        for table in ("books", "reviews", "users"):
+            await self.connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id)) FROM {table} HAVING max(id) IS NOT NULL"
+            )
+        await self.connection.execute("ANALYZE")
+        await self.connection.close()
+
+async def prepare_schema(database_url: str, reset: bool):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.models.book import Base
+    # Imported for their tables
+    import app.models.job, app.models.llm_cache, app.models.user  # noqa: F401
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.begin() as conn:
+            if reset:
+                await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            for table in ("books", "reviews", "users"):
+                if (await conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1"))).first():
+                    raise SystemExit(f"Table {table} is not empty; use an empty database or --reset.")
+    finally:
+        await engine.dispose()
+
+async def open_writer(database_url: str):
+    from sqlalchemy.engine import make_url
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return SQLiteWriter(url.database)
+    if url.get_backend_name() == "postgresql":
+        return await PostgresWriter.connect(url.set(drivername="postgresql").render_as_string(hide_password=False))
+    raise SystemExit(f"Unsupported database: {url.get_backend_name()}")
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+async def generate(database_url: str, spec: CatalogSpec, reset: bool = False) -> dict:
+    """Creates the schema and loads a catalog described by `spec`; returns row counts and timings."""
+    from passlib.hash import bcrypt
+    from app.config.settings import settings
+    await prepare_schema(database_url, reset)
+    generator = CatalogGenerator(spec)
+    writer = await open_writer(database_url)
+    # Building the secondary indexes once after the load beats updating them row by row
+    await writer.begin_load(("books", "reviews", "users"))
+    timings = {}
+
+    started = time.perf_counter()
+    histogram = generator.rating_histogram()
+    timings["aggregates_seconds"] = time.perf_counter() - started
+
+    loaded = {}
+    password_hash = bcrypt.using(rounds=settings.BCRYPT_ROUNDS).hash(PASSWORD)
+    for table, columns, batches in (
+        ("books", BOOK_COLUMNS, generator.book_rows(histogram)),
+        ("users", USER_COLUMNS, generator.user_rows(password_hash)),
+        ("reviews", REVIEW_COLUMNS, generator.review_rows()),
+    ):
+        started, loaded[table] = time.perf_counter(), 0
+        for rows in batches:
+            await writer.write(table, columns, rows)
+            loaded[table] += len(rows)
+            log(f"{table}: {loaded[table]} rows")
+        timings[f"{table}_seconds"] = time.perf_counter() - started
+    started = time.perf_counter()
+    await writer.finish()
+    timings["indexes_seconds"] = time.perf_counter() - started
+    return {**loaded, **{name: round(seconds, 2) for name, seconds in timings.items()}}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic, skewed book catalog.")
+    parser.add_argument("--database-url", required=True, help="Database to load (SQLite or PostgreSQL).")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--reviews", type=int, default=1_000_000, help="Target review count (slightly fewer after removing repeats).")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of book popularity.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate every table first.")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    spec = CatalogSpec(args.books, args.reviews, args.users, args.zipf, args.seed)
+    print(json.dumps(asyncio.run(generate(args.database_url, spec, args.reset)), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+Load benchmark for the HTTP API, with the LLM replaced by the in-process `stub` inference backend.
+
+Drives the real application either in-process through httpx.ASGITransport or through
+a uvicorn server started for the run, against SQLite or PostgreSQL. It reports
+throughput and p50/p95/p99 latency per endpoint and concurrency level, and saves the
+results as JSON so runs on different commits can be compared.
+
+Usage:
+    python -m benchmarks.load
+    python -m benchmarks.load --database-url postgresql+asyncpg://postgres@localhost/books_bench \\
+        --transport uvicorn --workers 2 --concurrency 1,16,64 --requests 500
+    python -m benchmarks.load --output after.json --baseline before.json --max-regression 10
+
+--database-url must point at a throwaway database: the run creates the tables, a
+benchmark user and the seed books in it, and reuses them on later runs. The default
+is a fresh SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USER = {"username": "benchmark", "email": "benchmark@example.com", "password": "benchmark-password"}
+TITLE_WORDS = (
+    "shadow river garden winter empire silent glass iron forgotten night crown ocean "
+    "letters stone harbor paper fire orchard last city"
+).split()
+GENRES = ["Fiction", "Fantasy", "Mystery", "Science Fiction", "History", "Romance", "Biography"]
+SUMMARY_CONTENT = (
+    "A retired lighthouse keeper finds a bundle of letters washed ashore and sets out to "
+    "return them, uncovering a decades-old story about the village and its missing ship."
+)
+
+class Target:
+    """What the endpoints are exercised with: the seeded book ids, auth headers and a seeded RNG."""
+
+    def __init__(self, book_ids: list, headers: dict, rng: random.Random):
+        self.book_ids = book_ids
+        self.headers = headers
+        self.rng = rng
+
+    def book_id(self) -> int:
+        return self.rng.choice(self.book_ids)
+
+    def word(self) -> str:
+        return self.rng.choice(TITLE_WORDS)
+
+def new_book(rng: random.Random) -> dict:
+    title = " ".join(rng.sample(TITLE_WORDS, 3)).title()
+    return {
+        "title": title,
+        "author": f"Author {rng.randint(1, 500)}",
+        "genre": rng.choice(GENRES),
+        "year_published": rng.randint(1900, 2024),
+        "summary": f"{title}: " + " ".join(rng.choices(TITLE_WORDS, k=30)),
+    }
+
+# name -> request factory returning (method, url, json body)
+ENDPOINTS = {
+    "list_books": lambda target: ("GET", "/api/books/?limit=20", None),
+    "get_book": lambda target: ("GET", f"/api/books/{target.book_id()}", None),
+    "get_reviews": lambda target: ("GET", f"/api/books/{target.book_id()}/reviews", None),
+    "get_book_summary": lambda target: ("GET", f"/api/books/{target.book_id()}/summary", None),
+    "search_books": lambda target: ("GET", f"/api/books/search?q={target.word()}", None),
+    "recommendations": lambda target: ("GET", "/api/books/recommendations", None),
+    "generate_summary": lambda target: ("POST", "/api/books/generate-summary?use_cache=false", {"content": SUMMARY_CONTENT}),
+    "generate_summary_stream": lambda target: (
+        "POST", "/api/books/generate-summary/stream?use_cache=false", {"content": SUMMARY_CONTENT}
+    ),
+    "create_book": lambda target: ("POST", "/api/books/", new_book(target.rng)),
+}
+# create_book grows the catalog as it runs, so it is only measured when asked for
+DEFAULT_ENDPOINTS = [name for name in ENDPOINTS if name != "create_book"]
+
+def percentile(sorted_values: list, pct: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, math.ceil(pct / 100 * len(sorted_values))) - 1]
+
+def summarize(endpoint: str, concurrency: int, latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(latencies, 50)),
+            "p95": to_ms(percentile(latencies, 95)),
+            "p99": to_ms(percentile(latencies, 99)),
+            "mean": to_ms(sum(latencies) / len(latencies) if latencies else None),
+            "max": to_ms(latencies[-1] if latencies else None),
+        },
+    }
+
+def failed(response: httpx.Response) -> bool:
+    """
+    Errors are reported as HTTP status codes, in the JSON envelope's `status`, or, once a
+    stream has started, as an `error` server-sent event.
+    """
+    if response.status_code >= 400:
+        return True
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        body = response.json()
+        return isinstance(body, dict) and isinstance(body.get("status"), int) and body["status"] >= 400
+    if content_type.startswith("text/event-stream"):
+        return "event: error" in response.text
+    return False
+
+async def drive(client: httpx.AsyncClient, endpoint: str, target: Target, concurrency: int, count: int):
+    """Sends `count` requests from `concurrency` concurrent workers; returns (latencies, errors, elapsed)."""
+    latencies, errors = [], 0
+    pending = iter(range(count))
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            method, url, body = ENDPOINTS[endpoint](target)
+            started = time.perf_counter()
+            try:
+                bad = failed(await client.request(method, url, json=body, headers=target.headers))
+            except httpx.HTTPError:
+                bad = True
+            latencies.append(time.perf_counter() - started)
+            errors += bad
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+async def seed(client: httpx.AsyncClient, books: int, rng: random.Random) -> Target:
+    """Logs in the benchmark user and tops the catalog up to `books` books, each reviewed by that user."""
+    # Already registered on a reused database
+    await client.post("/auth/register", json=BENCH_USER)
+    response = await client.post("/auth/login", json={"username": BENCH_USER["username"], "password": BENCH_USER["password"]})
+    headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+    response = await client.get("/api/books/?stream=true", headers=headers)
+    book_ids = [json.loads(line)["id"] for line in response.text.splitlines() if line.strip()]
+    # Modest, so seeding does not pile up behind SQLite's single writer
+    semaphore = asyncio.Semaphore(4)
+
+    async def add_book():
+        async with semaphore:
+            response = await client.post("/api/books/", json=new_book(rng), headers=headers)
+            book_id = response.json()["data"]["id"]
+            review = {"review_text": " ".join(rng.choices(TITLE_WORDS, k=12)), "rating": rng.randint(1, 5)}
+            await client.post(f"/api/books/{book_id}/reviews", json=review, headers=headers)
+            book_ids.append(book_id)
+
+    missing = max(0, books - len(book_ids))
+    if missing:
+        print(f"Seeding {missing} books...", file=sys.stderr)
+        await asyncio.gather(*(add_book() for _ in range(missing)))
+    return Target(book_ids, headers, rng)
+
+@asynccontextmanager
+async def asgi_client(args):
+    from main import app
+    # ASGITransport does not send lifespan events, so run startup and shutdown here
+    async with app.router.lifespan_context(app):
+        # Unhandled errors become 500 responses, as they would behind uvicorn
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+            yield client
+
+@asynccontextmanager
+async def uvicorn_client(args, max_connections: int):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # The workers inherit the stub backend settings from this process's environment
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=REPO_ROOT,
+        # Its own process group, so teardown also reaches uvicorn's workers and their helper processes
+        start_new_session=True,
+    )
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                try:
+                    await client.get("/metrics")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start within 60 seconds")
+                    await asyncio.sleep(0.2)
+            yield client
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            os.killpg(server.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        server.wait()
+
+def git_commit() -> dict:
+    git = lambda *command: subprocess.run(["git", *command], capture_output=True, text=True, check=True, cwd=REPO_ROOT).stdout.strip()
+    try:
+        commit = git("rev-parse", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+async def run(args, database_url: str) -> dict:
+    from sqlalchemy.engine import make_url
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    endpoints = args.endpoints.split(",") if args.endpoints else DEFAULT_ENDPOINTS
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}. Choose from: {', '.join(ENDPOINTS)}")
+    rng = random.Random(args.seed)
+
+    if args.transport == "uvicorn":
+        client_context = uvicorn_client(args, max(concurrency_levels))
+    else:
+        client_context = asgi_client(args)
+    results = []
+    async with client_context as client:
+        target = await seed(client, args.books, rng)
+        for concurrency in concurrency_levels:
+            for endpoint in endpoints:
+                if args.warmup:
+                    await drive(client, endpoint, target, concurrency, args.warmup)
+                latencies, errors, elapsed = await drive(client, endpoint, target, concurrency, args.requests)
+                result = summarize(endpoint, concurrency, latencies, errors, elapsed)
+                results.append(result)
+                print(format_result(result), file=sys.stderr)
+
+    return {
+        "meta": {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(database_url).render_as_string(hide_password=True),
+            "transport": args.transport,
+            "workers": args.workers if args.transport == "uvicorn" else None,
+            "books": len(target.book_ids),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "llm_tokens": args.llm_tokens,
+            "llm_failure_rate": args.llm_failure_rate,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+def format_result(result: dict) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{result['endpoint']:<24} c={result['concurrency']:<4} {result['throughput_rps'] or 0:>9.1f} req/s  "
+        f"p50 {latency['p50'] or 0:>8.1f}ms  p95 {latency['p95'] or 0:>8.1f}ms  p99 {latency['p99'] or 0:>8.1f}ms  "
+        f"errors {result['errors']}"
+    )
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list:
+    """
+    Prints the p95 latency and throughput change of every endpoint and concurrency level
+    present in both runs, and returns those whose p95 grew by more than `max_regression` percent.
+    """
+    before = {(result["endpoint"], result["concurrency"]): result for result in baseline["results"]}
+    regressions = []
+    print(f"Compared with {baseline['meta'].get('commit')}:", file=sys.stderr)
+    for result in current["results"]:
+        old = before.get((result["endpoint"], result["concurrency"]))
+        if old is None or not old["latency_ms"]["p95"] or not old["throughput_rps"]:
+            continue
+        p95_change = 100 * (result["latency_ms"]["p95"] - old["latency_ms"]["p95"]) / old["latency_ms"]["p95"]
+        rps_change = 100 * ((result["throughput_rps"] or 0) - old["throughput_rps"]) / old["throughput_rps"]
+        flag = "  REGRESSION" if p95_change > max_regression else ""
+        print(f"{result['endpoint']:<24} c={result['concurrency']:<4} p95 {p95_change:+7.1f}%  "
+              f"throughput {rps_change:+7.1f}%{flag}", file=sys.stderr)
+        if flag:
+            regressions.append({"endpoint": result["endpoint"], "concurrency": result["concurrency"], "p95_change_pct": round(p95_change, 1)})
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints with a stubbed LLM.")
+    parser.add_argument("--database-url", help="Throwaway database to run against. Defaults to a new SQLite file.")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi",
+                        help="In-process ASGI calls, or HTTP to a uvicorn server started for the run.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint and level.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first at each level.")
+    parser.add_argument("--endpoints", help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}.")
+    parser.add_argument("--books", type=int, default=200, help="Seed the catalog up to this many books.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM call time in seconds.")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra random stub latency, up to this many seconds.")
+    parser.add_argument("--llm-tokens", type=int, default=64, help="Words per stub completion.")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="Fraction of stub calls that fail.")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for request parameters and seed data.")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Earlier results file to compare against.")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="With --baseline, exit non-zero when any p95 grew by more than this percentage.")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='books-bench-')}/bench.db"
+    # Settings are read at import time, so configure the environment before importing the app
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # The in-process stub backend answers every AI call; failures are not retried on a real model
+    os.environ.update({
+        "INFERENCE_BACKEND": "stub",
+        "INFERENCE_FALLBACK_BACKENDS": "",
+        "INFERENCE_STUB_LATENCY": str(args.llm_latency),
+        "INFERENCE_STUB_JITTER": str(args.llm_jitter),
+        "INFERENCE_STUB_TOKENS": str(args.llm_tokens),
+        "INFERENCE_STUB_FAILURE_RATE": str(args.llm_failure_rate),
+        "INFERENCE_STUB_SEED": str(args.seed),
+    })
+
+    report = asyncio.run(run(args, database_url))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = compare(json.load(baseline), report, args.max_regression if args.max_regression is not None else math.inf)
+        if regressions and args.max_regression is not None:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Data-size scaling benchmark for the catalog queries.
+
+For each catalog size it loads a synthetic catalog (`benchmarks.generate_catalog`), then
+times the service calls behind the hottest read endpoints, with the book cache disabled
+so every call reaches the database:
+
+- `list_books`: one page at a random cursor depth;
+- `get_reviews` and `get_book_summary`: books drawn with the catalog's Zipf popularity;
+- `recommendations` and `recommendations_cold_start`: users with reviews, and a user without.
+
+Every statement those calls issue is EXPLAINed, and plans that scan a whole table are
+reported, so a query that is fast on a small catalog but lacks an index shows up long
+before the catalog is large enough to hurt.
+
+Usage:
+    python -m benchmarks.scaling --sizes 10000,100000,1000000
+    python -m benchmarks.scaling --database-url postgresql+asyncpg://postgres@localhost/books_scale \\
+        --sizes 100000,1000000 --samples 500 --output scaling.json
+
+Without --database-url each size gets its own SQLite file. A PostgreSQL database is
+dropped and reloaded for every size, so it must be a throwaway one. With --skip-generate
+the database is benchmarked as loaded (pass a single size and the same ratios and seed
+used to generate it).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks.generate_catalog import CatalogGenerator, CatalogSpec, generate, log
+from benchmarks.load import git_commit, summarize
+
+OPERATIONS = ["list_books", "get_reviews", "get_book_summary", "recommendations", "recommendations_cold_start"]
+# Single-row or otherwise tiny tables where a scan is the right plan
+SMALL_TABLES = {"catalog_version"}
+FULL_SCAN_PATTERNS = {
+    # SQLite "SCAN" visits every row of the table or index it names; "SEARCH" seeks into it
+    "sqlite": re.compile(r"^SCAN (\w+)( USING (?:COVERING )?INDEX \w+)?$"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+# Expanded IN lists differ in length from call to call; one plan per query shape is enough
+IN_LIST = re.compile(r"\((?:\?|\$\d+)(?:, (?:\?|\$\d+))*\)")
+
+class StatementCapture:
+    """Keeps the first statement and parameters seen for each query shape, grouped by the operation running."""
+
+    def __init__(self, async_engine):
+        from sqlalchemy import event
+        self.operation = None
+        self.statements = {}
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.operation is not None:
+            shapes = self.statements.setdefault(self.operation, {})
+            shapes.setdefault(IN_LIST.sub("(...)", statement), (statement, parameters))
+
+def full_scans(backend: str, statement: str, plan: list) -> list:
+    """Tables whose every row the plan visits."""
+    # An index walked in ORDER BY order stops at the LIMIT, unless the rows are sorted afterwards
+    bounded = " LIMIT " in statement and not any("TEMP B-TREE FOR ORDER BY" in line for line in plan)
+    tables = set()
+    for line in plan:
+        match = FULL_SCAN_PATTERNS[backend].search(line.strip())
+        if match is None or match.group(1) in SMALL_TABLES:
+            continue
+        if backend == "sqlite" and match.group(2) and bounded:
+            continue
+        tables.add(match.group(1))
+    return sorted(tables)
+
+async def explain(async_engine, backend: str, statements: list) -> list:
+    """EXPLAINs each `(statement, parameters)` pair and flags whole-table scans."""
+    prefix = "EXPLAIN QUERY PLAN " if backend == "sqlite" else "EXPLAIN "
+    plans = []
+    async with async_engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            result = await conn.exec_driver_sql(prefix + statement, parameters)
+            # SQLite returns (id, parent, notused, detail); PostgreSQL one text column per line
+            plan = [str(row[-1]) for row in result.all()]
+            plans.append({
+                "statement": " ".join(statement.split()),
+                "plan": plan,
+                "full_scans": full_scans(backend, statement, plan),
+            })
+    return plans
+
+async def measure(session_factory, call, samples: int) -> tuple:
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for sample in range(samples):
+        async with session_factory() as db:
+            call_started = time.perf_counter()
+            response = await call(db, sample)
+            latencies.append(time.perf_counter() - call_started)
+        # ETag-carrying reads come back as a JSONResponse, everything else as the envelope
+        status = response["status"] if isinstance(response, dict) else response.status_code
+        if status >= 400:
+            errors += 1
+    return latencies, errors, time.perf_counter() - started
+
+async def benchmark_size(database_url: str, spec: CatalogSpec, args) -> dict:
+    from sqlalchemy import func, select
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.config.database import engine_options
+    from app.models.book import Book
+    from app.services.bookServices import BookService
+    from app.utils.helper import encode_cursor
+    from app.utils.recommender import book_recommender
+
+    generated = None
+    if not args.skip_generate:
+        log(f"Loading {spec.books} books, {spec.reviews} reviews, {spec.users} users into {make_url(database_url).render_as_string()}")
+        generated = await generate(database_url, spec, reset=True)
+
+    backend = make_url(database_url).get_backend_name()
+    engine = create_async_engine(database_url, **engine_options(database_url))
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    capture = StatementCapture(engine)
+    generator = CatalogGenerator(spec)
+    rng = np.random.default_rng([spec.seed, 2])
+    try:
+        async with session_factory() as db:
+            max_book_id = (await db.execute(select(func.max(Book.id)))).scalar() or 0
+        popular = generator.rank_to_book[np.minimum(
+            np.searchsorted(generator.popularity_cdf, rng.random(args.samples)), spec.books - 1
+        )].tolist()
+        depths = rng.integers(0, max(1, max_book_id), args.samples).tolist()
+        users = rng.integers(1, spec.users + 1, args.samples).tolist()
+        calls = {
+            "list_books": lambda db, i: BookService.list_books(db, cursor=encode_cursor(depths[i]) if depths[i] else None),
+            "get_reviews": lambda db, i: BookService.get_reviews(popular[i], db),
+            "get_book_summary": lambda db, i: BookService.get_book_summary(popular[i], db),
+            "recommendations": lambda db, i: BookService.recommend_for_user(users[i], db),
+            # No generated user has this id, so it takes the cold-start path
+            "recommendations_cold_start": lambda db, i: BookService.recommend_for_user(spec.users + 1, db),
+        }
+
+        results, index_build_seconds, index_mb = [], None, None
+        for operation in args.operations:
+            if operation.startswith("recommendations") and index_build_seconds is None:
+                book_recommender.reset()
+                started = time.perf_counter()
+                async with session_factory() as db:
+                    await book_recommender.ensure_index(db)
+                index_build_seconds = round(time.perf_counter() - started, 3)
+                index_mb = round(book_recommender.index_nbytes / 2 ** 20, 1)
+                log(f"Recommender index built in {index_build_seconds}s ({index_mb} MB)")
+            if args.warmup:
+                await measure(session_factory, calls[operation], min(args.warmup, args.samples))
+            capture.operation = operation
+            latencies, errors, elapsed = await measure(session_factory, calls[operation], args.samples)
+            capture.operation = None
+            result = summarize(operation, 1, latencies, errors, elapsed)
+            del result["concurrency"]
+            results.append(result)
+            latency = result["latency_ms"]
+            log(f"  {operation:<28} p50 {latency['p50']:>9.3f}ms  p95 {latency['p95']:>9.3f}ms  "
+                f"p99 {latency['p99']:>9.3f}ms  errors {errors}")
+
+        plans = {}
+        for operation, statements in capture.statements.items():
+            plans[operation] = await explain(engine, backend, list(statements.values()))
+            for entry in plans[operation]:
+                if entry["full_scans"]:
+                    log(f"  {operation}: full scan of {', '.join(entry['full_scans'])} in: {entry['statement'][:160]}")
+    finally:
+        await engine.dispose()
+        # The index holds this catalog's vectors; release it before loading the next size
+        book_recommender.reset()
+
+    return {
+        "books": spec.books,
+        "reviews_target": spec.reviews,
+        "users": spec.users,
+        "generated": generated,
+        "recommender_index_build_seconds": index_build_seconds,
+        "recommender_index_mb": index_mb,
+        "results": results,
+        "plans": plans,
+    }
+
+def format_growth(sizes: list) -> str:
+    """One line per operation with its p50 latency at each catalog size."""
+    header = f"{'p50 ms':<28}" + "".join(f"{size['books']:>14,}" for size in sizes)
+    lines = [header]
+    for operation in OPERATIONS:
+        by_size = {size["books"]: result for size in sizes for result in size["results"] if result["endpoint"] == operation}
+        if not by_size:
+            continue
+        cells = "".join(
+            f"{by_size[size['books']]['latency_ms']['p50']:>14.3f}" if size["books"] in by_size else f"{'-':>14}"
+            for size in sizes
+        )
+        lines.append(f"{operation:<28}{cells}")
+    return "\n".join(lines)
+
+async def run(args) -> dict:
+    from sqlalchemy.engine import make_url
+    sizes = []
+    for books in [int(size) for size in args.sizes.split(",")]:
+        spec = CatalogSpec(books, int(books * args.reviews_per_book), max(1, int(books * args.users_per_book)), args.zipf, args.seed)
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(args.workdir, f'catalog-{books}.db')}"
+        sizes.append(await benchmark_size(database_url, spec, args))
+    return {
+        "meta": {
+            **git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(args.database_url).render_as_string(hide_password=True) if args.database_url else "sqlite",
+            "samples": args.samples,
+            "reviews_per_book": args.reviews_per_book,
+            "users_per_book": args.users_per_book,
+            "zipf": args.zipf,
+            "seed": args.seed,
+        },
+        "sizes": sizes,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure catalog query times and plans as the catalog grows.")
+    parser.add_argument("--database-url", help="Throwaway database, reloaded for every size. Defaults to one SQLite file per size.")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated catalog sizes, in books.")
+    parser.add_argument("--reviews-per-book", type=float, default=10, help="Target reviews as a multiple of the book count.")
+    parser.add_argument("--users-per-book", type=float, default=0.25, help="Users as a fraction of the book count.")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of book popularity.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=200, help="Measured calls per operation and size.")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured calls made first for each operation.")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help=f"Comma-separated subset of: {', '.join(OPERATIONS)}.")
+    parser.add_argument("--skip-generate", action="store_true", help="Benchmark the database as already loaded.")
+    parser.add_argument("--workdir", help="Directory for the SQLite files. Defaults to a new temporary directory.")
+    parser.add_argument("--output", default="scaling-results.json", help="Where to write the JSON results.")
+    args = parser.parse_args(argv)
+
+    args.operations = args.operations.split(",")
+    unknown = [name for name in args.operations if name not in OPERATIONS]
+    if unknown:
+        parser.error(f"Unknown operations: {', '.join(unknown)}. Choose from: {', '.join(OPERATIONS)}")
+    if args.skip_generate and (not args.database_url or "," in args.sizes):
+        parser.error("--skip-generate needs --database-url and a single size.")
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="books-scaling-")
+
+    # Settings are read at import time, so configure the environment before importing the app.
+    # The engines are created per size; this URL only satisfies the app's module-level engine.
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{os.path.join(args.workdir, 'unused.db')}"
+    os.environ["BOOK_CACHE_BACKEND"] = "none"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    print(format_growth(report["sizes"]), file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
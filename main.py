@@ -2,25 +2,28 @@ from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
-from app.utils.jwt import verify_access_token
+from app.utils.jwt import fetch_user_by_request
 from app.api.books import router as book_router
-from app.config.database import init_db
+from app.config.database import init_db, AsyncSessionLocal, read_router
 from app.api.user import router as auth_router
+from app.api.jobs import router as job_router
+from app.api.admin import router as admin_router
 from contextlib import asynccontextmanager
 from app.utils.logger import get_logger
-from fastapi.responses import HTMLResponse
+from app.utils.ai_inference import InferenceHelper
+from app.utils.job_queue import ai_job_queue
+from app.utils.password import password_hasher
+from app.utils.metrics import REGISTRY, MetricsMiddleware
+from app.utils.profiling import ProfilingMiddleware
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 
 http_bearer = HTTPBearer()
 
 logger = get_logger(__name__)
 
-async def global_auth_dependency(credentials: HTTPAuthorizationCredentials = Depends(http_bearer)):
-    token = credentials.credentials
-    payload = verify_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return payload
+async def global_auth_dependency(request: Request, credentials: HTTPAuthorizationCredentials = Depends(http_bearer)):
+    return fetch_user_by_request(request)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,9 +32,16 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("Database initialized.")
     except Exception as e:
-        logger.error(f"Error during database initialization: {e}")
+        logger.error("Error during database initialization: %s", e)
+    await InferenceHelper.startup()
+    await ai_job_queue.start(AsyncSessionLocal)
+    await read_router.start()
     yield
     logger.info("Shutting down application...")
+    await read_router.stop()
+    await ai_job_queue.stop()
+    await InferenceHelper.shutdown()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Book Management System",
@@ -66,6 +76,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Custom OpenAPI schema to include Bearer token in Swagger UI
 def custom_openapi():
@@ -103,8 +115,15 @@ async def root(request: Request):
         {"request": request}
     )
     except Exception as e:
-        logger.error(f"Error reading README.html: {e}")
+        logger.error("Error reading README.html: %s", e)
         return {"message": "Error loading the README page"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(book_router, prefix="/api/books", tags=["Books"])
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
+app.include_router(job_router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
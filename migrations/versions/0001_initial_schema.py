@@ -0,0 +1,66 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2025-05-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'books',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('author', sa.String(), nullable=True),
+        sa.Column('genre', sa.String(), nullable=True),
+        sa.Column('year_published', sa.Integer(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_books_id'), 'books', ['id'], unique=False)
+    op.create_index(op.f('ix_books_title'), 'books', ['title'], unique=False)
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table(
+        'reviews',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('review_text', sa.Text(), nullable=True),
+        sa.Column('rating', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_reviews_id'), 'reviews', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reviews_id'), table_name='reviews')
+    op.drop_table('reviews')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_books_title'), table_name='books')
+    op.drop_index(op.f('ix_books_id'), table_name='books')
+    op.drop_table('books')
@@ -0,0 +1,44 @@
+"""book rating aggregates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AGGREGATE_COLUMNS = ['review_count', 'rating_sum'] + [f'rating_count_{rating}' for rating in range(1, 6)]
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('books') as batch_op:
+        for column in AGGREGATE_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the existing reviews so the aggregates start out consistent
+    histogram = ', '.join(
+        f'rating_count_{rating} = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND reviews.rating = {rating})'
+        for rating in range(1, 6)
+    )
+    op.execute(
+        'UPDATE books SET '
+        'review_count = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id), '
+        'rating_sum = (SELECT COALESCE(SUM(reviews.rating), 0) FROM reviews WHERE reviews.book_id = books.id), '
+        f'{histogram}'
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('books') as batch_op:
+        for column in reversed(AGGREGATE_COLUMNS):
+            batch_op.drop_column(column)
@@ -0,0 +1,38 @@
+"""llm response cache
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_response_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('backend', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('prompt', sa.Text(), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(op.f('ix_llm_response_cache_expires_at'), 'llm_response_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_llm_response_cache_expires_at'), table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
@@ -0,0 +1,52 @@
+"""book full-text search index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, author, genre, summary, content='books', content_rowid='id', tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN INSERT INTO books_fts(rowid, title, author, genre, summary) VALUES (new.id, new.title, new.author, new.genre, new.summary); END',
+    "CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN INSERT INTO books_fts(books_fts, rowid, title, author, genre, summary) VALUES ('delete', old.id, old.title, old.author, old.genre, old.summary); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, genre, summary ON books BEGIN INSERT INTO books_fts(books_fts, rowid, title, author, genre, summary) VALUES ('delete', old.id, old.title, old.author, old.genre, old.summary); INSERT INTO books_fts(rowid, title, author, genre, summary) VALUES (new.id, new.title, new.author, new.genre, new.summary); END",
+]
+
+POSTGRESQL_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(genre, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(summary, '')), 'D')"
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        # Index the books that already exist
+        op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_books_search ON books USING gin (({POSTGRESQL_SEARCH_DOCUMENT}))")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('books_fts_insert', 'books_fts_delete', 'books_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS books_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_books_search")
@@ -0,0 +1,41 @@
+"""unique books (title, author) and reviews (book_id, user_id)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _fail_on_duplicates(table: str, columns: str) -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        f"SELECT COUNT(*) FROM (SELECT {columns} FROM {table} GROUP BY {columns} HAVING COUNT(*) > 1) AS duplicates"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} duplicate ({columns}) groups in {table}; resolve them before adding the unique index."
+        )
+
+
+def upgrade() -> None:
+    _fail_on_duplicates('books', 'title, author')
+    _fail_on_duplicates('reviews', 'book_id, user_id')
+    # Unique indexes rather than constraints so SQLite can add them without a table rebuild
+    op.create_index('uq_books_title_author', 'books', ['title', 'author'], unique=True)
+    op.create_index('uq_reviews_book_id_user_id', 'reviews', ['book_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_reviews_book_id_user_id', table_name='reviews')
+    op.drop_index('uq_books_title_author', table_name='books')
@@ -0,0 +1,34 @@
+"""book versions and catalog version for ETags
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    catalog_version = op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': 1}])
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_version')
+    op.drop_column('books', 'version')
@@ -0,0 +1,29 @@
+"""indexes for per-user reviews and cold-start recommendations
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The unique (book_id, user_id) index cannot serve lookups by user alone
+    op.create_index('ix_reviews_user_id', 'reviews', ['user_id'])
+    op.create_index('ix_books_rating_sum_id', 'books', [sa.text('rating_sum DESC'), 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_rating_sum_id', table_name='books')
+    op.drop_index('ix_reviews_user_id', table_name='reviews')
@@ -0,0 +1,34 @@
+"""catalog version sequence on PostgreSQL
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every write bumped the single catalog_version row, which serialized PostgreSQL writers on its
+    # row lock; a sequence hands out the same unique versions without a lock. SQLite keeps the row.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('catalog_version_seq', start=2)))
+        op.execute("SELECT setval('catalog_version_seq', version) FROM catalog_version WHERE id = 1")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE catalog_version SET version = (SELECT last_value FROM catalog_version_seq) WHERE id = 1"
+        )
+        op.execute(sa.schema.DropSequence(sa.Sequence('catalog_version_seq')))
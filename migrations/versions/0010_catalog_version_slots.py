@@ -0,0 +1,44 @@
+"""catalog version slots instead of a sequence
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATALOG_VERSION_SLOTS = 16
+
+
+def upgrade() -> None:
+    # The sequence moved before its writer committed, so list ETags could run ahead of the rows.
+    # Counter rows are transactional; spreading writers over several keeps them off one row lock.
+    bind = op.get_bind()
+    current = bind.execute(sa.text("SELECT version FROM catalog_version WHERE id = 1")).scalar_one()
+    if bind.dialect.name == 'postgresql':
+        current = max(current, bind.execute(sa.text("SELECT last_value FROM catalog_version_seq")).scalar_one())
+        op.execute(sa.schema.DropSequence(sa.Sequence('catalog_version_seq')))
+    # Every slot starts at the old version, so new book versions (slot value * slots + slot) stay above all old ones
+    op.execute(sa.text("UPDATE catalog_version SET version = :version WHERE id = 1").bindparams(version=current))
+    catalog_version = sa.table('catalog_version', sa.column('id', sa.Integer), sa.column('version', sa.Integer))
+    op.bulk_insert(catalog_version, [{'id': slot, 'version': current} for slot in range(2, CATALOG_VERSION_SLOTS + 1)])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    current = bind.execute(sa.text("SELECT COALESCE(MAX(version), 1) FROM books")).scalar_one()
+    op.execute("DELETE FROM catalog_version WHERE id > 1")
+    op.execute(sa.text("UPDATE catalog_version SET version = :version WHERE id = 1").bindparams(version=current))
+    if bind.dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('catalog_version_seq', start=2)))
+        op.execute(sa.text("SELECT setval('catalog_version_seq', :version)").bindparams(version=current))
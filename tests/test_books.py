@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, json, gzip, csv, io, asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from test_data import test_data 
 import pytest
@@ -6,10 +6,17 @@ import pytest_asyncio
 from httpx import AsyncClient
 from httpx._transports.asgi import ASGITransport
 from main import app
-from app.config.database import get_db  
+from app.config.database import get_db, get_read_db, instrument_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 from app.models.book import Base
+from app.utils.messages import bookMessages
+from app.utils.ai_inference import InferenceHelper
+from app.services.bookServices import BookService
+from app.utils.job_queue import ai_job_queue
+from app.utils.book_cache import book_cache
+from app.utils.jwt import create_access_token
 
 
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"  # Use an in-memory SQLite database for testing
@@ -17,6 +24,7 @@ DATABASE_URL = "sqlite+aiosqlite:///:memory:"  # Use an in-memory SQLite databas
 # Create a test database engine and session
 test_engine = create_async_engine(DATABASE_URL, echo=True)
 TestSessionLocal = sessionmaker(bind=test_engine, class_=AsyncSession, expire_on_commit=False)
+instrument_engine(test_engine, "test")
 
 @pytest_asyncio.fixture(scope="module", autouse=True)
 async def setup_database():
@@ -40,12 +48,14 @@ async def client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
         yield ac
 
 created_book_id = None
+created_review_id = None
 valid_token = None
 
 create_book_data = test_data["create_book_data"]
@@ -89,6 +99,63 @@ async def test_list_books(client):
     assert response.status_code == 200
     assert isinstance(response.json()['data'], list)
 
+@pytest.mark.asyncio
+async def test_list_books_pagination(client):
+    response = await client.post(
+        "/api/books/",
+        json=test_data["second_book_data"],
+        headers={"Authorization": f"Bearer {valid_token}"}
+    )
+    assert response.status_code == 201
+
+    response = await client.get("/api/books/?limit=1", headers={"Authorization": f"Bearer {valid_token}"})
+    first_page = response.json()
+    assert len(first_page['data']) == 1
+    assert first_page['next_cursor'] is not None
+
+    response = await client.get(
+        f"/api/books/?limit=1&cursor={first_page['next_cursor']}",
+        headers={"Authorization": f"Bearer {valid_token}"}
+    )
+    second_page = response.json()
+    assert len(second_page['data']) == 1
+    assert second_page['data'][0]['id'] > first_page['data'][0]['id']
+    assert second_page['next_cursor'] is None
+
+    response = await client.get("/api/books/?cursor=not-a-cursor", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['message'] == bookMessages.INVALID_CURSOR
+
+@pytest.mark.asyncio
+async def test_profiled_request_records_db_statements(client):
+    admin_token = create_access_token({"sub": "admin", "role": "admin", "user_id": 0, "email": "admin@example.com"})
+    admin = {"Authorization": f"Bearer {admin_token}"}
+    response = await client.get("/api/books/?limit=1", headers={**admin, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    # The header is ignored for other users, who cannot read profiles either
+    user = {"Authorization": f"Bearer {valid_token}"}
+    response = await client.get("/api/books/?limit=1", headers={**user, "X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+    assert (await client.get("/api/admin/profiles", headers=user)).json()["status"] == 403
+
+    response = await client.get("/api/admin/profiles", headers=admin)
+    assert response.json()["data"][0]["id"] == profile_id
+    profile = (await client.get(f"/api/admin/profiles/{profile_id}", headers=admin)).json()["data"]
+    assert (profile["method"], profile["path"], profile["status"]) == ("GET", "/api/books/", 200)
+    assert profile["db_statements"] == sum(statement["count"] for statement in profile["statements"]) > 0
+    assert any("FROM books" in statement["sql"] for statement in profile["statements"])
+    assert profile["functions"]
+
+@pytest.mark.asyncio
+async def test_list_books_stream(client):
+    response = await client.get("/api/books/?stream=true", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    books = [json.loads(line) for line in response.text.splitlines()]
+    assert len(books) == 2
+    assert books[0]['id'] < books[1]['id']
+
 @pytest.mark.asyncio
 async def test_get_book(client):
     global created_book_id  # Use the shared variable
@@ -96,6 +163,16 @@ async def test_get_book(client):
     assert response.status_code == 200
     assert response.json()['data']["id"] == created_book_id
 
+@pytest.mark.asyncio
+async def test_metrics_are_labelled_by_route_template(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    # The book fetched above is counted under its route template, not its id
+    assert 'http_requests_total{method="GET",route="/api/books/{book_id}",status="200"}' in response.text
+    assert f"/api/books/{created_book_id}\"" not in response.text
+    assert "# TYPE db_statement_duration_seconds histogram" in response.text
+
 @pytest.mark.asyncio
 async def test_update_book(client):
     response = await client.put(
@@ -106,6 +183,24 @@ async def test_update_book(client):
     assert response.status_code == 200
     assert response.json()['data']["title"] == update_book_data["title"]
 
+    # The cached copy from test_get_book is invalidated by the update
+    hits = book_cache.stats()["hits"]
+    response = await client.get("/api/books/1", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['data']["title"] == update_book_data["title"]
+    response = await client.get("/api/books/1", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['data']["title"] == update_book_data["title"]
+    assert book_cache.stats()["hits"] == hits + 1
+
+@pytest.mark.asyncio
+async def test_search_books(client):
+    response = await client.get("/api/books/search?q=goblet", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()['data']] == [created_book_id]
+    assert response.json()['next_cursor'] is None
+
+    response = await client.get("/api/books/search?q=", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['message'] == bookMessages.INVALID_SEARCH_QUERY
+
 
 @pytest.mark.asyncio
 async def test_add_review(client):
@@ -117,6 +212,8 @@ async def test_add_review(client):
     )
     assert response.status_code == 201
     assert response.json()['data']["rating"] == 5
+    global created_review_id
+    created_review_id = response.json()['data']["id"]
 
 @pytest.mark.asyncio
 async def test_get_reviews(client):
@@ -130,6 +227,190 @@ async def test_get_book_summary(client):
     response = await client.get(f"/api/books/{created_book_id}/summary", headers={"Authorization": f"Bearer {valid_token}"})
     assert response.status_code == 200
     assert "average_rating" in response.json()['data']
+    assert response.json()['data']["total_reviews"] == 1
+    assert response.json()['data']["rating_histogram"]["5"] == 1
+
+@pytest.mark.asyncio
+async def test_update_review_keeps_aggregates_current(client):
+    response = await client.put(
+        f"/api/books/{created_book_id}/reviews/{created_review_id}",
+        json={"review_text": "Good, not great.", "rating": 3},
+        headers={"Authorization": f"Bearer {valid_token}"}
+    )
+    assert response.json()['message'] == bookMessages.REVIEW_UPDATED_SUCCESS
+    summary = (await client.get(f"/api/books/{created_book_id}/summary", headers={"Authorization": f"Bearer {valid_token}"})).json()['data']
+    assert summary["average_rating"] == 3
+    assert summary["rating_histogram"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0}
+
+    # Restore the original rating for the recommendation tests
+    await client.put(
+        f"/api/books/{created_book_id}/reviews/{created_review_id}",
+        json=test_data['create_review_data'],
+        headers={"Authorization": f"Bearer {valid_token}"}
+    )
+    summary = (await client.get(f"/api/books/{created_book_id}/summary", headers={"Authorization": f"Bearer {valid_token}"})).json()['data']
+    assert summary["average_rating"] == 5
+    assert summary["total_reviews"] == 1
+
+@pytest.mark.asyncio
+async def test_conditional_get_with_etags(client):
+    headers = {"Authorization": f"Bearer {valid_token}"}
+    paths = [f"/api/books/{created_book_id}", f"/api/books/{created_book_id}/reviews",
+             f"/api/books/{created_book_id}/summary", "/api/books/"]
+    etags = {}
+    for path in paths:
+        response = await client.get(path, headers=headers)
+        assert response.status_code == 200
+        etags[path] = response.headers["etag"]
+    assert etags[paths[0]] == etags[paths[1]] == etags[paths[2]] != etags[paths[3]]
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for path in paths:
+            response = await client.get(path, headers={**headers, "If-None-Match": f'W/{etags[path]}, "other"'})
+            assert response.status_code == 304
+            assert response.headers["etag"] == etags[path]
+            assert response.content == b""
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+    # Revalidation only reads version counters
+    assert not any("FROM reviews" in statement for statement in statements)
+
+    # A review write changes the book's ETag and the catalog's
+    await client.put(
+        f"/api/books/{created_book_id}/reviews/{created_review_id}",
+        json=test_data['create_review_data'],
+        headers=headers
+    )
+    for path in paths:
+        response = await client.get(path, headers={**headers, "If-None-Match": etags[path]})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etags[path]
+
+@pytest.mark.asyncio
+async def test_generate_summary_uses_response_cache(client, monkeypatch):
+    calls = []
+    async def fake_call_ai_model(prompt):
+        calls.append(prompt)
+        return "A cached summary."
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", fake_call_ai_model)
+    payload = {"content": "Content that is only summarized by the cache test."}
+    headers = {"Authorization": f"Bearer {valid_token}"}
+
+    first = (await client.post("/api/books/generate-summary", json=payload, headers=headers)).json()
+    second = (await client.post("/api/books/generate-summary", json=payload, headers=headers)).json()
+    assert first['data']["cached"] is False
+    assert second['data']["cached"] is True
+    assert second['data']["summary"] == "A cached summary."
+    assert len(calls) == 1
+
+    bypassed = (await client.post("/api/books/generate-summary?use_cache=false", json=payload, headers=headers)).json()
+    assert bypassed['data']["cached"] is False
+    purged = (await client.post("/api/books/generate-summary?purge_cache=true", json=payload, headers=headers)).json()
+    assert purged['data']["cached"] is False
+    assert len(calls) == 3
+
+    stats = (await client.get("/api/books/llm-cache/stats", headers=headers)).json()['data']
+    assert stats["memory_hits"] >= 1
+
+@pytest.mark.asyncio
+async def test_summary_job_runs_in_worker_pool(client, monkeypatch):
+    async def fake_call_ai_model(prompt):
+        return "A summary from a background job."
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", fake_call_ai_model)
+    await ai_job_queue.start(TestSessionLocal)
+    try:
+        response = await client.post(
+            f"/api/jobs/summary-by-book-id/{created_book_id}",
+            headers={"Authorization": f"Bearer {valid_token}"}
+        )
+        assert response.status_code == 202
+        job_id = response.json()['data']["job_id"]
+
+        response = await client.get(f"/api/jobs/{job_id}?wait=5", headers={"Authorization": f"Bearer {valid_token}"})
+        job = response.json()['data']
+        assert job["status"] == "succeeded"
+        assert job["result"]["summary"] == "A summary from a background job."
+
+        # Waiting on a job this process never runs leaves nothing behind
+        await asyncio.gather(*(ai_job_queue.wait("run-elsewhere", 0.01) for _ in range(2)))
+        assert not ai_job_queue._events and not ai_job_queue._waiters
+    finally:
+        await ai_job_queue.stop()
+
+@pytest.mark.asyncio
+async def test_bulk_generate_summaries(client, monkeypatch):
+    async def fake_call_ai_model(prompt):
+        return f"Bulk summary: {prompt}"
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", fake_call_ai_model)
+    admin_token = create_access_token({"sub": "admin", "role": "admin", "user_id": 0, "email": "admin@example.com"})
+    admin = {"Authorization": f"Bearer {admin_token}"}
+
+    # Regenerating summaries across the catalog is an admin operation, directly or as a job
+    for path in ("/api/books/bulk-summaries", "/api/jobs/bulk-summaries"):
+        response = await client.post(path, json={"book_ids": [created_book_id]}, headers={"Authorization": f"Bearer {valid_token}"})
+        assert response.json()['status'] == 403
+
+    response = await client.post(
+        "/api/books/bulk-summaries",
+        json={"book_ids": [created_book_id, 9999]},
+        headers=admin
+    )
+    data = response.json()['data']
+    assert [item["status"] for item in data["items"]] == ["succeeded", "failed"]
+    assert data["stats"]["succeeded"] == 1
+    assert data["stats"]["commits"] == 1
+
+    book = (await client.get(f"/api/books/{created_book_id}", headers={"Authorization": f"Bearer {valid_token}"})).json()['data']
+    assert book["summary"]
+
+    response = await client.post("/api/books/bulk-summaries", json={}, headers=admin)
+    assert response.json()['message'] == bookMessages.INVALID_BULK_SUMMARY_INPUT
+
+@pytest.mark.asyncio
+async def test_cancelled_bulk_summaries_cancel_their_model_calls(client, monkeypatch):
+    started, cancelled = asyncio.Event(), []
+    async def hanging_call_ai_model(prompt):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(prompt)
+            raise
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", hanging_call_ai_model)
+    # The earlier bulk test left this book's summary in the response cache
+    monkeypatch.setattr("app.services.bookServices.settings.LLM_CACHE_ENABLED", False)
+
+    async with TestSessionLocal() as db:
+        bulk_request = BookService.BulkSummaryCreate(book_ids=[created_book_id])
+        task = asyncio.ensure_future(BookService.bulk_generate_summaries(bulk_request, db))
+        await asyncio.wait_for(started.wait(), 5)
+        # What the server does to the handler when the client disconnects
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    await asyncio.sleep(0)
+    assert len(cancelled) == 1
+
+@pytest.mark.asyncio
+async def test_stream_summary_by_book_id(client, monkeypatch):
+    async def fake_stream_ai_model(prompt):
+        for token in ["A ", "streamed ", "summary."]:
+            yield token
+    monkeypatch.setattr(InferenceHelper, "stream_ai_model", fake_stream_ai_model)
+
+    response = await client.post(
+        f"/api/books/generate-summary-by-book-id/{created_book_id}/stream?use_cache=false",
+        headers={"Authorization": f"Bearer {valid_token}"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    tokens = [json.loads(lines[1][len("data: "):])["token"] for lines in events if lines[0] == "event: token"]
+    assert "".join(tokens) == "A streamed summary."
+    assert events[-1][0] == "event: done"
 
 @pytest.mark.asyncio
 async def test_generate_summary(client):
@@ -171,6 +452,96 @@ async def test_get_recommendations(client):
     assert isinstance(response.json()['data'], dict)
     assert "recommendations" in response.json()['data']
     assert len(response.json()['data']["recommendations"]) > 0
+    assert response.json()['data']["source"] == "local"
+    # Books the user already reviewed are never recommended
+    assert created_book_id not in [book["id"] for book in response.json()['data']["recommendations"]]
+
+@pytest.mark.asyncio
+async def test_get_recommendations_rerank(client, monkeypatch):
+    headers = {"Authorization": f"Bearer {valid_token}"}
+    local = (await client.get("/api/books/recommendations", headers=headers)).json()['data']["recommendations"]
+
+    async def fake_call_ai_model(prompt):
+        return json.dumps({"recommendations": [{"id": 9999, "reason": "Not in the catalog."},
+                                               {"id": local[0]["id"], "reason": "Similar themes."}]})
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", fake_call_ai_model)
+    response = await client.get("/api/books/recommendations?rerank=true", headers=headers)
+    data = response.json()['data']
+    assert data["source"] == "reranked"
+    assert data["recommendations"][0]["id"] == local[0]["id"]
+    assert data["recommendations"][0]["reason"] == "Similar themes."
+    assert 9999 not in [book["id"] for book in data["recommendations"]]
+
+    async def failing_call_ai_model(prompt):
+        raise RuntimeError("model down")
+    monkeypatch.setattr(InferenceHelper, "call_ai_model", failing_call_ai_model)
+    monkeypatch.setattr("app.services.bookServices.settings.LLM_CACHE_ENABLED", False)
+    response = await client.get("/api/books/recommendations?rerank=true", headers=headers)
+    assert response.status_code == 200
+    assert response.json()['data']["source"] == "local"
+    assert [book["id"] for book in response.json()['data']["recommendations"]] == [book["id"] for book in local]
+
+@pytest.mark.asyncio
+async def test_import_books_reports_every_row(client, monkeypatch):
+    monkeypatch.setattr("app.services.bookServices.settings.BOOK_IMPORT_BATCH_SIZE", 2)
+    csv_body = (
+        "title,author,genre,year_published,summary\n"
+        "Imported One,Author A,Fiction,2001,\"A summary\nover two lines\"\n"
+        f"{update_book_data['title']},{update_book_data['author']},Fiction,1998,Already in the catalog\n"
+        "Imported Two,Author B,Fiction,not-a-year,Bad year\n"
+        "Imported Three,Author C,Fiction,2003,Third\n"
+        "Imported One,Author A,Fiction,2001,Repeated in the file\n"
+    )
+    response = await client.post(
+        "/api/books/import",
+        content=csv_body.encode(),
+        headers={"Authorization": f"Bearer {valid_token}", "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    report, summary = lines[:-1], lines[-1]
+    assert [(entry["row"], entry["status"]) for entry in report] == [
+        (1, "created"), (2, "duplicate"), (3, "invalid"), (4, "created"), (5, "duplicate")
+    ]
+    assert summary["message"] == bookMessages.BOOKS_IMPORTED_SUCCESS
+    assert summary["data"]["created"] == 2
+    assert summary["data"]["batches"] == 3
+
+    response = await client.get(f"/api/books/{report[0]['id']}", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['data']["summary"] == "A summary\nover two lines"
+
+    jsonl_body = json.dumps({**create_book_data, "title": "Imported Four"}) + "\nnot json\n"
+    response = await client.post("/api/books/import?format=jsonl", content=jsonl_body.encode(), headers={"Authorization": f"Bearer {valid_token}"})
+    assert [json.loads(line).get("status") for line in response.text.splitlines()[:-1]] == ["created", "invalid"]
+
+    response = await client.post("/api/books/import?format=xml", content=b"<books/>", headers={"Authorization": f"Bearer {valid_token}"})
+    assert response.json()['message'] == bookMessages.UNSUPPORTED_IMPORT_FORMAT
+
+@pytest.mark.asyncio
+async def test_export_books_with_reviews(client):
+    headers = {"Authorization": f"Bearer {valid_token}"}
+    response = await client.get("/api/books/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    books = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert [book["id"] for book in books] == sorted(book["id"] for book in books)
+    reviewed = next(book for book in books if book["id"] == created_book_id)
+    assert [review["id"] for review in reviewed["reviews"]] == [created_review_id]
+    assert reviewed["review_count"] == 1
+    assert reviewed["rating_histogram"]["5"] == 1
+
+    # Resuming after the first book skips exactly that book
+    response = await client.get(f"/api/books/export?cursor={books[0]['cursor']}", headers=headers)
+    resumed = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert [book["id"] for book in resumed] == [book["id"] for book in books[1:]]
+
+    response = await client.get("/api/books/export?format=csv", headers=headers)
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert len(rows) == len(books)
+    assert next(row for row in rows if row["book_id"] == str(created_book_id))["review_id"] == str(created_review_id)
+
+    response = await client.get("/api/books/export?format=xml", headers=headers)
+    assert response.json()['message'] == bookMessages.UNSUPPORTED_EXPORT_FORMAT
 
 
 # ===================== EDGE CASES =====================
@@ -0,0 +1,172 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from types import SimpleNamespace
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from app.models.book import Base, Book
+from app.services.bookServices import BookService
+from app.services.userServices import UserService
+from app.utils.messages import bookMessages, userMessages
+from app.utils.recommender import book_recommender
+
+# PostgreSQL runs only against a disposable database, e.g.
+# TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost:5432/books_test
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+DATABASE_URLS = [
+    pytest.param("sqlite+aiosqlite:///:memory:", id="sqlite"),
+    pytest.param(TEST_POSTGRES_URL, id="postgresql",
+                 marks=pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")),
+]
+
+BOOK = {"title": "Dune", "author": "Frank Herbert", "genre": "Science Fiction", "year_published": 1965, "summary": "Spice."}
+
+@pytest_asyncio.fixture(params=DATABASE_URLS)
+async def db(request):
+    engine = create_async_engine(request.param)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+def request_for(user_id: int):
+    return SimpleNamespace(state=SimpleNamespace(user={"user_id": user_id, "sub": f"user{user_id}"}))
+
+@pytest.mark.asyncio
+async def test_duplicate_books_are_rejected_by_the_database(db):
+    created = await BookService.create_book(BookService.BookCreate(**BOOK), db)
+    assert created["status"] == 201
+    duplicate = await BookService.create_book(BookService.BookCreate(**BOOK), db)
+    assert duplicate["message"] == bookMessages.DUPLICATE_BOOK
+
+    other = await BookService.create_book(BookService.BookCreate(**{**BOOK, "title": "Dune Messiah"}), db)
+    renamed = await BookService.update_book(other["data"]["id"], BookService.BookCreate(**BOOK), db)
+    assert renamed["message"] == bookMessages.DUPLICATE_BOOK
+    missing = await BookService.update_book(999, BookService.BookCreate(**{**BOOK, "title": "Children of Dune"}), db)
+    assert missing["message"] == bookMessages.BOOK_NOT_FOUND
+
+@pytest.mark.asyncio
+async def test_duplicate_review_leaves_aggregates_untouched(db):
+    book_id = (await BookService.create_book(BookService.BookCreate(**BOOK), db))["data"]["id"]
+    review = BookService.ReviewCreate(review_text="Great", rating=5)
+    assert (await BookService.add_review(book_id, review, request_for(1), db))["status"] == 201
+    duplicate = await BookService.add_review(book_id, review, request_for(1), db)
+    assert duplicate["message"] == bookMessages.DUPLICATE_REVIEW
+    missing = await BookService.add_review(999, review, request_for(1), db)
+    assert missing["message"] == bookMessages.BOOK_NOT_FOUND
+
+    book = (await db.execute(select(Book).where(Book.id == book_id).execution_options(populate_existing=True))).scalar_one()
+    assert (book.review_count, book.rating_sum, book.rating_count_5) == (1, 5, 1)
+
+@pytest.mark.asyncio
+async def test_duplicate_usernames_and_emails_are_rejected_by_the_database(db):
+    user = UserService.UserCreate(username="reader", email="reader@example.com", password="secret")
+    assert (await UserService.register_user(user, db))["status"] == 201
+    same_username = UserService.UserCreate(username="reader", email="other@example.com", password="secret")
+    assert (await UserService.register_user(same_username, db))["message"] == userMessages.USERNAME_ALREADY_REGISTERED
+    same_email = UserService.UserCreate(username="other", email="reader@example.com", password="secret")
+    assert (await UserService.register_user(same_email, db))["message"] == userMessages.EMAIL_ALREADY_REGISTERED
+
+@pytest.mark.asyncio
+async def test_every_write_takes_a_new_catalog_version(db):
+    first = await BookService._catalog_version(db)
+    created = (await BookService.create_book(BookService.BookCreate(**BOOK), db))["data"]
+    updated = (await BookService.update_book(created["id"], BookService.BookCreate(**{**BOOK, "genre": "Epic"}), db))["data"]
+    assert 1 < created["version"] != updated["version"] > 1
+    assert await BookService._catalog_version(db) == first + 2
+
+    assert (await BookService.delete_book(created["id"], db))["status"] == 200
+    assert await BookService._catalog_version(db) == first + 3
+    recreated = (await BookService.create_book(BookService.BookCreate(**BOOK), db))["data"]
+    assert recreated["version"] not in (1, created["version"], updated["version"])
+
+@pytest.mark.asyncio
+async def test_catalog_etag_moves_only_when_a_write_commits(db):
+    if db.bind.dialect.name != "postgresql":
+        pytest.skip("an in-memory SQLite database has a single connection, so there is no second transaction")
+    listed = await BookService.list_books(db)
+    etag = listed.headers["etag"]
+    await db.commit()
+
+    async with AsyncSession(db.bind) as writer:
+        await BookService._bump_catalog_version(writer)
+        await writer.execute(insert(Book).values(**BOOK))
+        # The open write is invisible to readers, and so is its version
+        assert (await BookService.list_books(db, if_none_match=etag)).status_code == 304
+        await db.commit()
+        await writer.commit()
+    listed = await BookService.list_books(db, if_none_match=etag)
+    assert listed.status_code == 200 and listed.headers["etag"] != etag
+
+async def create_books(db, *books):
+    return [(await BookService.create_book(BookService.BookCreate(**{**BOOK, **book}), db))["data"]["id"] for book in books]
+
+@pytest.mark.asyncio
+async def test_recommendation_index_follows_writes_without_a_rebuild(db):
+    book_recommender.reset()
+    try:
+        hobbit, cosmos = await create_books(
+            db,
+            {"title": "The Hobbit", "author": "J.R.R. Tolkien", "genre": "Fantasy", "summary": "A hobbit goes on a quest with dwarves."},
+            {"title": "Cosmos", "author": "Carl Sagan", "genre": "Science", "summary": "The universe and the big bang."},
+        )
+        await book_recommender.ensure_index(db)
+        built_at = book_recommender._index.built_at
+
+        fellowship, = await create_books(
+            db, {"title": "The Fellowship of the Ring", "author": "J.R.R. Tolkien", "genre": "Fantasy", "summary": "A quest to destroy the ring."},
+        )
+        await book_recommender.ensure_index(db)
+        assert book_recommender.recommend({hobbit: 5}, exclude={hobbit}, limit=3)[0][0] == fellowship
+
+        await BookService.update_book(cosmos, BookService.BookCreate(**{**BOOK, "title": "The Silmarillion", "author": "J.R.R. Tolkien", "genre": "Fantasy"}), db)
+        await BookService.delete_book(fellowship, db)
+        await book_recommender.ensure_index(db)
+        assert [book_id for book_id, _ in book_recommender.recommend({hobbit: 5}, exclude={hobbit}, limit=3)] == [cosmos]
+        # Only the changed rows were vectorized again
+        assert book_recommender._index.built_at == built_at
+        assert not book_recommender._changes
+    finally:
+        book_recommender.reset()
+
+@pytest.mark.asyncio
+async def test_expired_recommendation_index_is_rebuilt_in_the_background(db, monkeypatch):
+    book_recommender.reset()
+    try:
+        hobbit, fellowship = await create_books(
+            db,
+            {"title": "The Hobbit", "author": "J.R.R. Tolkien", "genre": "Fantasy"},
+            {"title": "The Fellowship of the Ring", "author": "J.R.R. Tolkien", "genre": "Fantasy"},
+        )
+        await book_recommender.ensure_index(db)
+        previous = book_recommender._index
+
+        build, release = book_recommender._build, asyncio.Event()
+        async def held_build(*args):
+            await release.wait()
+            return await build(*args)
+        monkeypatch.setattr(book_recommender, "_build", held_build)
+        monkeypatch.setattr(book_recommender, "ttl_seconds", 0)
+
+        # The request is served from the expired index instead of waiting for the rebuild
+        await asyncio.wait_for(book_recommender.ensure_index(db), 5)
+        rebuild = book_recommender._rebuild
+        assert rebuild is not None and book_recommender._index is previous
+        assert book_recommender.recommend({hobbit: 5}, exclude={hobbit}, limit=3)[0][0] == fellowship
+
+        release.set()
+        await asyncio.wait_for(rebuild, 5)
+        assert book_recommender._index is not previous and len(book_recommender._index) == 2
+        assert book_recommender._rebuild is None
+    finally:
+        book_recommender.reset()
@@ -3,6 +3,7 @@ test_data = {
     "user_registration_data": {"username": "testuser","email": "testuser@example.com","password": "password123"},
     "user_login_data": {"username": "testuser","password": "password123"},
     "create_book_data": {"title": "Harry Potter","author": "JK Rowling","genre": "Fiction","year_published": 1998,"summary": "A test book summary."},
+    "second_book_data": {"title": "The Hobbit","author": "J.R.R. Tolkien","genre": "Fantasy","year_published": 1937,"summary": "A hobbit goes on an unexpected journey."},
     "update_book_data": {"title": "Harry Potter and the Goblet of Fire","author": "Updated Author","genre": "Non-Fiction","year_published": 1998,"summary": "Updated summary."},
     "test_content": "In today’s digital landscape, chatbots are becoming increasingly prevalent, serving as virtual assistants and conversation partners. However, a key challenge lies in crafting chatbots that can understand and respond to user queries in a context-aware manner, simulating natural conversation flow. This article delves into building a context-aware chatbot using LangChain, a powerful open-source framework, and Chat Model, a versatile tool for interacting with various language models."
 }
@@ -0,0 +1,79 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import database
+from app.config.database import ReadRouter, engine_options, get_read_db, instrument_engine
+from app.utils.metrics import DB_POOL_CONNECTIONS_IN_USE, DB_STATEMENT_DURATION, DB_STATEMENT_ERRORS
+
+HEALTHY_URL = "sqlite+aiosqlite:///:memory:"
+# Nothing listens on port 1, so connecting fails at once
+UNREACHABLE_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/books"
+
+def test_pool_settings_apply_to_server_databases_only():
+    assert "pool_size" in engine_options(UNREACHABLE_URL)
+    assert "pool_size" not in engine_options(HEALTHY_URL)
+    assert engine_options(HEALTHY_URL)["pool_pre_ping"] is True
+
+@pytest.mark.asyncio
+async def test_read_router_skips_unhealthy_replicas():
+    router = ReadRouter([HEALTHY_URL, UNREACHABLE_URL], check_interval=10, timeout=2, max_lag_seconds=5)
+    try:
+        healthy, unreachable = router.replicas
+        assert {router.pick() for _ in range(4)} == {healthy, unreachable}
+        await router.check_all()
+        assert [replica["healthy"] for replica in router.status()] == [True, False]
+        assert {router.pick() for _ in range(4)} == {healthy}
+    finally:
+        await router.stop()
+
+@pytest.mark.asyncio
+async def test_read_router_times_out_a_hanging_replica(monkeypatch):
+    router = ReadRouter([HEALTHY_URL], check_interval=10, timeout=0.05, max_lag_seconds=5)
+    async def hang(replica):
+        await asyncio.sleep(10)
+    monkeypatch.setattr(router, "_probe", hang)
+    try:
+        await router.check_all()
+        assert [replica["healthy"] for replica in router.status()] == [False]
+    finally:
+        await router.stop()
+
+@pytest.mark.asyncio
+async def test_get_read_db_falls_back_to_the_primary(monkeypatch):
+    router = ReadRouter([UNREACHABLE_URL], check_interval=10, timeout=2, max_lag_seconds=5)
+    monkeypatch.setattr(database, "read_router", router)
+    try:
+        sessions = get_read_db()
+        session = await sessions.__anext__()
+        assert session.bind is router.replicas[0].engine
+        await sessions.aclose()
+
+        await router.check_all()
+        sessions = get_read_db()
+        session = await sessions.__anext__()
+        assert session.bind is database.engine
+        await sessions.aclose()
+    finally:
+        await router.stop()
+
+@pytest.mark.asyncio
+async def test_instrumented_engine_records_statements_and_pool_use():
+    test_engine = create_async_engine(HEALTHY_URL)
+    instrument_engine(test_engine, "metrics-test")
+    try:
+        async with test_engine.connect() as conn:
+            assert DB_POOL_CONNECTIONS_IN_USE.labels("metrics-test").value == 1
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("WITH answer AS (SELECT 42 AS value) SELECT value FROM answer"))
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing_table"))
+        assert DB_POOL_CONNECTIONS_IN_USE.labels("metrics-test").value == 0
+        assert sum(DB_STATEMENT_DURATION.labels("metrics-test", "SELECT").counts) == 1
+        assert sum(DB_STATEMENT_DURATION.labels("metrics-test", "WITH").counts) == 1
+        assert DB_STATEMENT_ERRORS.labels("metrics-test").value == 1
+    finally:
+        await test_engine.dispose()
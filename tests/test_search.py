@@ -0,0 +1,104 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.models.book import Base, POSTGRESQL_SEARCH_DOCUMENT
+from app.services.bookServices import BookService
+from app.utils.messages import bookMessages
+from app.utils.search import build_search_query
+
+# PostgreSQL runs only against a disposable database, e.g.
+# TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost:5432/books_test
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+DATABASE_URLS = [
+    pytest.param("sqlite+aiosqlite:///:memory:", id="sqlite"),
+    pytest.param(TEST_POSTGRES_URL, id="postgresql",
+                 marks=pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")),
+]
+
+BOOKS = [
+    {"title": "The Hobbit", "author": "J.R.R. Tolkien", "genre": "Fantasy", "year_published": 1937,
+     "summary": "Bilbo Baggins joins a company of dwarves."},
+    {"title": "Dragons of the North", "author": "Jane Smith", "genre": "History", "year_published": 2001,
+     "summary": "A study of dragons in folklore, from Beowulf to The Hobbit."},
+    {"title": "Cosmos", "author": "Carl Sagan", "genre": "Science", "year_published": 1980,
+     "summary": "A journey through the universe."},
+]
+
+@pytest_asyncio.fixture(params=DATABASE_URLS)
+async def db(request):
+    engine = create_async_engine(request.param)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        for book in BOOKS:
+            await BookService.create_book(BookService.BookCreate(**book), session)
+        yield session
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+def titles(response):
+    return [book["title"] for book in response["data"]]
+
+@pytest.mark.asyncio
+async def test_search_ranks_title_matches_first(db):
+    response = await BookService.search_books(db, "hobbit")
+    assert response["status"] == 200
+    assert titles(response) == ["The Hobbit", "Dragons of the North"]
+    assert response["data"][0]["score"] > response["data"][1]["score"]
+    assert response["next_cursor"] is None
+
+    assert titles(await BookService.search_books(db, "tolkien")) == ["The Hobbit"]
+    # The last term also matches as a prefix
+    assert titles(await BookService.search_books(db, "carl sag")) == ["Cosmos"]
+
+@pytest.mark.asyncio
+async def test_search_paginates(db):
+    first_page = await BookService.search_books(db, "hobbit", limit=1)
+    assert titles(first_page) == ["The Hobbit"]
+    assert first_page["next_cursor"] is not None
+
+    second_page = await BookService.search_books(db, "hobbit", limit=1, cursor=first_page["next_cursor"])
+    assert titles(second_page) == ["Dragons of the North"]
+    assert second_page["next_cursor"] is None
+
+    invalid = await BookService.search_books(db, "hobbit", cursor="not-a-cursor")
+    assert invalid["message"] == bookMessages.INVALID_CURSOR
+
+@pytest.mark.asyncio
+async def test_search_index_follows_updates_and_deletes(db):
+    hobbit = (await BookService.search_books(db, "tolkien"))["data"][0]
+    updated = {**BOOKS[0], "title": "There and Back Again"}
+    await BookService.update_book(hobbit["id"], BookService.BookCreate(**updated), db)
+    assert titles(await BookService.search_books(db, "there and back")) == ["There and Back Again"]
+    assert titles(await BookService.search_books(db, "hobbit")) == ["Dragons of the North"]
+
+    await BookService.delete_book(hobbit["id"], db)
+    assert titles(await BookService.search_books(db, "tolkien")) == []
+
+@pytest.mark.asyncio
+async def test_search_rejects_queries_without_words(db):
+    response = await BookService.search_books(db, "\"*) - :")
+    assert response["status"] == 400
+    assert response["message"] == bookMessages.INVALID_SEARCH_QUERY
+
+@pytest.mark.asyncio
+async def test_search_reports_unsupported_databases():
+    db = SimpleNamespace(bind=SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    response = await BookService.search_books(db, "dune")
+    assert response["status"] == 501
+    assert response["message"] == bookMessages.SEARCH_NOT_SUPPORTED
+
+def test_postgresql_search_uses_the_indexed_expression():
+    stmt = build_search_query("postgresql", ["harry", "pott"])
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert f"({POSTGRESQL_SEARCH_DOCUMENT}) @@ to_tsquery('english'" in sql
+    assert "ORDER BY ts_rank(" in sql
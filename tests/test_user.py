@@ -11,6 +11,9 @@ from main import app
 from httpx._transports.asgi import ASGITransport
 from app.config.database import init_db
 from app.models.book import Base
+from app.models.user import User
+from app.utils.password import password_hasher
+from sqlalchemy.future import select
 from app.utils.logger import get_logger
 from app.utils.messages.userMessages import (
     USER_REGISTERED_SUCCESS, USER_LOGIN_SUCCESS, INVALID_CREDENTIALS,
@@ -138,3 +141,15 @@ async def test_get_profile_invalid_token(client):
     logger.info("Testing get profile with invalid token.")
     response = await client.get("/auth/profile", headers={"Authorization": "Bearer invalid_token"})
     assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_login_rehashes_password_when_cost_changes(client, db_session, monkeypatch):
+    logger.info("Testing password rehash at login.")
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+    response = await client.post("/auth/login", json=test_data["user_login_data"])
+    assert response.json()["message"] == USER_LOGIN_SUCCESS
+    result = await db_session.execute(select(User.password).where(User.username == test_data["user_login_data"]["username"]))
+    assert result.scalar_one().startswith("$2b$04$")
+
+    response = await client.post("/auth/login", json=test_data["user_login_data"])
+    assert response.json()["message"] == USER_LOGIN_SUCCESS
@@ -0,0 +1,617 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import collections
+import json
+import logging
+import logging.handlers
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.services import bookServices as book_services
+from app.services.bookServices import BookService
+from app.utils import ai_inference, metrics
+from app.utils.ai_inference import InferenceBackend, InferenceError, InferenceHelper, RateLimitedError, StubBackend
+from app.utils.cache import MemoryCacheBackend, ReadThroughCache, RedisCacheBackend
+from app.utils.logger import JsonFormatter, SamplingFilter, parse_logger_map
+from app.utils.metrics import Counter, Histogram, Metric, Registry
+from app.utils.password import PasswordHasher
+from app.utils.profiling import SlowQueryLog
+from app.utils.recommender import BookRecommender
+from app.utils.resilience import AdaptiveTokenBucket, CircuitBreaker, CircuitOpenError, RetryBudget
+from app.utils.single_flight import SingleFlight
+from app.utils import jwt as jwt_utils
+from benchmarks.generate_catalog import CatalogGenerator, CatalogSpec
+from benchmarks.load import percentile, summarize
+from benchmarks.scaling import full_scans
+from datetime import timedelta
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def upstream(prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"summary of {prompt}"
+
+    results = await asyncio.gather(*[single_flight.do("key", upstream, "book") for _ in range(10)])
+    assert calls == ["book"]
+    assert all(result == "summary of book" for result, _ in results)
+    assert [shared for _, shared in results].count(False) == 1
+    assert single_flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_with_followers():
+    single_flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("model unavailable")
+
+    results = await asyncio.gather(*[single_flight.do("key", upstream) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_caller_does_not_cancel_shared_call():
+    single_flight = SingleFlight()
+    finished = asyncio.Event()
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        finished.set()
+        return "done"
+
+    leader = asyncio.create_task(single_flight.do("key", upstream))
+    follower = asyncio.create_task(single_flight.do("key", upstream))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == ("done", True)
+    assert finished.is_set()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_the_call_once_every_caller_is_gone():
+    single_flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def upstream():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(single_flight.do("key", upstream)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert single_flight.in_flight() == 0
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_local_model_parses_lines_across_network_chunks(monkeypatch):
+    body = "".join(json.dumps({"response": token, "done": False}) + "\n" for token in ["Hello", ", ", "world"])
+    body += json.dumps({"response": "", "done": True}) + "\n"
+    raw = body.encode()
+    # Split mid-object and also pack several objects into one chunk
+    chunks = [raw[:10], raw[10:70], raw[70:]]
+
+    def handler(request):
+        return httpx.Response(200, stream=ChunkedStream(chunks))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(InferenceHelper._clients, "ollama", client)
+    monkeypatch.setattr("app.utils.ai_inference.settings.LOCALLY_DEPLOYED_LLM_ENDPOINT", "http://ollama.test/api/generate")
+
+    tokens = [token async for token in InferenceHelper.stream_local_model("prompt")]
+    assert tokens == ["Hello", ", ", "world"]
+    assert await InferenceHelper.call_local_model("prompt") == "Hello, world"
+
+
+def test_circuit_breaker_opens_then_recovers_through_half_open():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the single trial call
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_frees_the_circuit(monkeypatch):
+    breaker = CircuitBreaker("hosted", failure_threshold=1, recovery_timeout=0)
+    breaker.before_call()
+    breaker.record_failure()
+    monkeypatch.setattr(ai_inference, "hosted_circuit_breaker", breaker)
+    monkeypatch.setattr(ai_inference, "hosted_rate_limiter", AdaptiveTokenBucket(rate=10, burst=10, min_rate=1, max_rate=20))
+
+    async def hanging_send():
+        await asyncio.sleep(10)
+
+    trial = asyncio.create_task(InferenceHelper._send_hosted(hanging_send))
+    await asyncio.sleep(0.01)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    # The next call becomes the trial instead of failing fast forever
+    async def failing_send():
+        raise ValueError("unexpected")
+
+    with pytest.raises(ValueError):
+        await InferenceHelper._send_hosted(failing_send)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_last_ai_attempt_does_not_spend_retry_budget(monkeypatch):
+    budget = RetryBudget(ratio=0, min_per_second=0.1, window_seconds=10)
+    monkeypatch.setattr(book_services, "ai_retry_budget", budget)
+    failed_attempt = lambda number: SimpleNamespace(attempt_number=number, outcome=SimpleNamespace(exception=lambda: RuntimeError("down")))
+
+    assert BookService._should_retry_ai_call(failed_attempt(book_services.AI_CALL_ATTEMPTS)) is True
+    assert len(budget._retries) == 0
+    assert BookService._should_retry_ai_call(failed_attempt(1)) is True
+    assert len(budget._retries) == 1
+
+
+def test_retry_budget_limits_retries_to_a_fraction_of_requests():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, window_seconds=10)
+    for _ in range(4):
+        budget.record_request()
+    assert [budget.can_retry() for _ in range(3)] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_hosted_429_lowers_rate_and_honours_retry_after(monkeypatch):
+    limiter = AdaptiveTokenBucket(rate=10, burst=10, min_rate=1, max_rate=20)
+    monkeypatch.setattr(ai_inference, "hosted_rate_limiter", limiter)
+    monkeypatch.setattr(ai_inference, "hosted_circuit_breaker", CircuitBreaker("hosted", 5, 30))
+
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "0.2"})
+
+    monkeypatch.setitem(InferenceHelper._clients, "hosted", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr("app.utils.ai_inference.settings.HOSTED_MODEL_ENDPOINT", "http://hosted.test/v1/chat/completions")
+
+    with pytest.raises(RateLimitedError) as error:
+        await InferenceHelper.call_hosted_model("prompt")
+    assert error.value.retry_after == 0.2
+    assert limiter.rate == 5
+
+    started = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_book_recommender_ranks_similar_books_first():
+    books = [
+        SimpleNamespace(id=1, title="The Hobbit", author="J.R.R. Tolkien", genre="Fantasy", summary="A hobbit goes on a quest with dwarves."),
+        SimpleNamespace(id=2, title="The Fellowship of the Ring", author="J.R.R. Tolkien", genre="Fantasy", summary="A quest to destroy the ring."),
+        SimpleNamespace(id=3, title="A Brief History of Time", author="Stephen Hawking", genre="Science", summary="Black holes and the big bang."),
+        SimpleNamespace(id=4, title="Cosmos", author="Carl Sagan", genre="Science", summary="The universe, stars and the big bang."),
+    ]
+    recommender = BookRecommender(n_features=1024, ttl_seconds=60)
+    recommender.index_books(books)
+
+    assert [book_id for book_id, _ in recommender.recommend({1: 5}, exclude={1}, limit=3)][0] == 2
+    assert [book_id for book_id, _ in recommender.recommend({3: 4}, exclude={3}, limit=3)][0] == 4
+    assert recommender.recommend({}, exclude=set(), limit=3) == []
+
+
+def test_book_recommender_updates_rows_in_place_and_compacts_to_the_same_index():
+    books = [
+        SimpleNamespace(id=book_id, title=f"Book {book_id}", author=f"Author {book_id % 7}", genre=f"Genre {book_id % 3}", summary=f"Words {book_id % 11}")
+        for book_id in range(1, 101)
+    ]
+    recommender = BookRecommender(n_features=256, ttl_seconds=60)
+    recommender.index_books(books)
+    index = recommender._index
+
+    changed = [SimpleNamespace(id=5, title="Dune", author="Frank Herbert", genre="Science Fiction", summary="Spice."),
+               SimpleNamespace(id=101, title="Dune Messiah", author="Frank Herbert", genre="Science Fiction", summary="Spice.")]
+    recommender.update_books(changed, removed=[7, 999])
+    assert recommender._index is index and len(index) == 100
+    assert index.vector(7) is None and index.vector(101) is not None
+    assert recommender.recommend({5: 5}, exclude={5}, limit=1)[0][0] == 101
+    # Nothing but the CSR arrays grows with the catalog
+    assert index.nbytes < 100 * 256 * 4
+
+    expected = dict(recommender.recommend({1: 5, 5: 4, 101: 4}, exclude=set(), limit=100))
+    recommender._index = index.compacted()
+    assert not recommender._index.overlay and not recommender._index.dropped
+    assert dict(recommender.recommend({1: 5, 5: 4, 101: 4}, exclude=set(), limit=100)) == pytest.approx(expected)
+
+
+def test_verified_tokens_are_cached_until_they_expire(monkeypatch):
+    decoded = []
+    original_decode = jwt_utils.decode
+    def counting_decode(*args, **kwargs):
+        decoded.append(args[0])
+        return original_decode(*args, **kwargs)
+    monkeypatch.setattr(jwt_utils, "decode", counting_decode)
+    monkeypatch.setattr(jwt_utils, "verified_token_cache", jwt_utils.TTLCache(16, 300))
+
+    token = jwt_utils.create_access_token({"sub": "cached", "user_id": 1})
+    assert jwt_utils.verify_access_token(token)["sub"] == "cached"
+    assert jwt_utils.verify_access_token(token)["sub"] == "cached"
+    assert len(decoded) == 1
+
+    # The cache entry lives no longer than the token itself, not the cache's 300 seconds
+    short_lived = jwt_utils.create_access_token({"sub": "short"}, expires_delta=timedelta(seconds=30))
+    assert jwt_utils.verify_access_token(short_lived)["sub"] == "short"
+    started = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: started + 29)
+    assert jwt_utils.verify_access_token(short_lived)["sub"] == "short"
+    assert len(decoded) == 2
+    monkeypatch.setattr(time, "monotonic", lambda: started + 31)
+    jwt_utils.verify_access_token(short_lived)
+    assert len(decoded) == 3
+
+    expired = jwt_utils.create_access_token({"sub": "expired"}, expires_delta=timedelta(seconds=-1))
+    assert jwt_utils.verify_access_token(expired) is None
+    assert jwt_utils.verify_access_token("not-a-token") is None
+
+
+def test_fetch_user_by_request_verifies_once_per_request(monkeypatch):
+    token = jwt_utils.create_access_token({"sub": "once", "user_id": 2})
+    request = SimpleNamespace(headers={"Authorization": f"Bearer {token}"}, state=SimpleNamespace())
+    assert jwt_utils.fetch_user_by_request(request)["user_id"] == 2
+
+    monkeypatch.setattr(jwt_utils, "verify_access_token", lambda token: pytest.fail("token verified twice"))
+    assert jwt_utils.fetch_user_by_request(request)["user_id"] == 2
+
+
+class FakeRedis:
+    """Local stand-in for redis.asyncio.Redis with the calls RedisCacheBackend makes."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = str(value).encode()
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+
+class FakeRedisPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.commands.append(command(*args, **kwargs))
+
+    async def execute(self):
+        return [await command for command in self.commands]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_read_through_cache_coalesces_misses_and_invalidates(backend):
+    redis = FakeRedis()
+    cache = ReadThroughCache(MemoryCacheBackend(16, 60) if backend == "memory" else RedisCacheBackend(redis, 60, prefix="t:"))
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 1, "title": f"v{len(loads)}"}
+
+    results = await asyncio.gather(*[cache.get_or_load("book:1", loader) for _ in range(10)])
+    assert len(loads) == 1
+    assert all(result == {"id": 1, "title": "v1"} for result in results)
+    assert await cache.get_or_load("book:1", loader) == {"id": 1, "title": "v1"}
+    if backend == "redis":
+        assert json.loads(redis.data["t:book:1"])["value"] == {"id": 1, "title": "v1"}
+
+    await cache.invalidate("book:1")
+    assert await cache.get_or_load("book:1", loader) == {"id": 1, "title": "v2"}
+    stats = cache.stats()
+    assert stats["backend"] == backend
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (1, 11, 9)
+    assert stats["hit_rate"] == 1 / 12
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_drops_loads_that_overlap_an_invalidation():
+    cache = ReadThroughCache(MemoryCacheBackend(16, 60))
+    started = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "old"
+
+    reader = asyncio.ensure_future(cache.get_or_load("book:1", slow_loader))
+    await started.wait()
+    await cache.invalidate("book:1")
+    assert await reader == "old"
+
+    async def fresh_loader():
+        return "new"
+    assert await cache.get_or_load("book:1", fresh_loader) == "new"
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_invalidations_reach_every_worker_and_only_their_keys():
+    redis = FakeRedis()
+    # Two workers sharing one Redis: a write handled by one must not let the other cache the old row
+    first, second = (ReadThroughCache(RedisCacheBackend(redis, 60, prefix="t:")) for _ in range(2))
+    started = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "old"
+
+    async def loader(value):
+        return value
+
+    reader = asyncio.ensure_future(first.get_or_load("book:1", slow_loader))
+    await started.wait()
+    await second.invalidate("book:1")
+    # An unrelated key is cached as usual while book:1 is being invalidated
+    assert await first.get_or_load("book:2", lambda: loader("other")) == "other"
+    assert await reader == "old"
+    assert await second.get_or_load("book:1", lambda: loader("new")) == "new"
+    assert await first.get_or_load("book:1", slow_loader) == "new"
+    assert await first.get_or_load("book:2", slow_loader) == "other"
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_treats_backend_errors_as_misses():
+    class BrokenBackend:
+        name = "broken"
+        async def get(self, key):
+            raise ConnectionError("down")
+        async def generation(self, key):
+            raise ConnectionError("down")
+        async def add(self, key, value, generation):
+            raise ConnectionError("down")
+        async def delete(self, *keys, settle_seconds=0):
+            raise ConnectionError("down")
+
+    cache = ReadThroughCache(BrokenBackend())
+    async def loader():
+        return "from db"
+    assert await cache.get_or_load("book:1", loader) == "from db"
+    await cache.invalidate("book:1")
+    assert cache.stats()["errors"] == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", ["thread", "process"])
+async def test_password_hasher_runs_off_the_event_loop(executor):
+    hasher = PasswordHasher(rounds=4, workers=2, executor=executor)
+    try:
+        hashed = await hasher.hash("secret")
+        assert hashed.startswith("$2b$04$")
+        assert await hasher.verify("secret", hashed) == (True, None)
+        assert await hasher.verify("wrong", hashed) == (False, None)
+
+        hasher.rounds = 5
+        verified, rehashed = await hasher.verify("secret", hashed)
+        assert verified and rehashed.startswith("$2b$05$")
+    finally:
+        hasher.shutdown()
+
+
+def test_sampling_filter_and_json_formatter():
+    record = lambda level: logging.LogRecord("app.test", level, __file__, 1, "Book %s", (7,), None)
+    assert not SamplingFilter(0.0).filter(record(logging.INFO))
+    assert SamplingFilter(0.0).filter(record(logging.WARNING))
+    assert SamplingFilter(1.0).filter(record(logging.DEBUG))
+
+    # Configured per logger, sampling reaches child loggers through the handler
+    handler = logging.handlers.BufferingHandler(capacity=100)
+    handler.addFilter(SamplingFilter({"sampling-test": 0.0, "sampling-test.kept": 1.0}))
+    parent = logging.getLogger("sampling-test")
+    parent.addHandler(handler)
+    parent.setLevel(logging.INFO)
+    try:
+        logging.getLogger("sampling-test.child").info("dropped")
+        logging.getLogger("sampling-test.child").warning("warned")
+        logging.getLogger("sampling-test.kept.grandchild").info("kept")
+    finally:
+        parent.removeHandler(handler)
+    assert [entry.getMessage() for entry in handler.buffer] == ["warned", "kept"]
+
+    entry = json.loads(JsonFormatter().format(record(logging.INFO)))
+    assert (entry["level"], entry["logger"], entry["message"]) == ("INFO", "app.test", "Book 7")
+    assert parse_logger_map("app.a=0.1, app.b = DEBUG,broken") == {"app.a": "0.1", "app.b": "DEBUG"}
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ["route"], registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    requests.labels('/a "b"').inc()
+    requests.labels('/a "b"').inc(2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels().observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a \\"b\\""} 3' in lines
+    # Buckets are cumulative and include values equal to their bound
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+    with pytest.raises(ValueError):
+        requests.labels()
+    # A metric type without a child class cannot be created, let alone registered
+    with pytest.raises(TypeError, match="_new_child"):
+        Metric("bare", "No children.", registry=registry)
+    assert "bare" not in registry.render()
+
+def test_slow_query_log_keeps_statements_over_the_threshold():
+    log = SlowQueryLog(threshold=0.1, max_entries=2)
+    log.record("primary", "SELECT 1", (), 0.05)
+    for number in range(3):
+        log.record("primary", f"SELECT {number}", {"id": number}, 0.2)
+    assert [entry["sql"] for entry in log.list()] == ["SELECT 2", "SELECT 1"]
+    assert log.list()[0]["parameters"] == "{'id': 2}"
+
+    disabled = SlowQueryLog(threshold=0, max_entries=2)
+    disabled.record("primary", "SELECT 1", (), 10.0)
+    assert disabled.list() == []
+
+@pytest.mark.asyncio
+async def test_benchmark_stub_and_latency_summary():
+    stub = StubBackend(latency=0.01, tokens=5, failure_rate=0)
+    completion = await stub.call("prompt")
+    assert completion == await stub.call("prompt") != await stub.call("another prompt")
+    assert "".join([token async for token in stub.stream("prompt")]) == completion
+
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
+    result = summarize("get_book", 4, [0.003, 0.001, 0.002, 0.004], errors=1, elapsed=0.5)
+    assert (result["requests"], result["throughput_rps"], result["errors"]) == (4, 8.0, 1)
+    assert result["latency_ms"]["p50"] == 2.0 and result["latency_ms"]["max"] == 4.0
+
+
+def test_synthetic_catalog_is_consistent_and_skewed():
+    generator = CatalogGenerator(CatalogSpec(books=500, reviews=5000, users=200))
+    histogram = generator.rating_histogram()
+    books = [row for rows in generator.book_rows(histogram) for row in rows]
+    reviews = [row for rows in generator.review_rows() for row in rows]
+
+    assert len({(book[1], book[2]) for book in books}) == len(books) == 500
+    assert len({(review[1], review[2]) for review in reviews}) == len(reviews) > 4000
+    per_book, rating_sums = collections.Counter(), collections.Counter()
+    for review in reviews:
+        per_book[review[1]] += 1
+        rating_sums[review[1]] += review[4]
+    # review_count and rating_sum agree with the generated reviews
+    assert all((book[6], book[7]) == (per_book[book[0]], rating_sums[book[0]]) for book in books)
+    # Zipf popularity: the 5 busiest books hold far more than their 1% share of the reviews
+    assert sum(count for _, count in per_book.most_common(5)) > 0.1 * len(reviews)
+
+
+def test_scaling_benchmark_flags_full_scans():
+    assert full_scans("sqlite", "SELECT * FROM reviews WHERE user_id = ?", ["SCAN reviews USING INDEX uq_reviews_book_id_user_id"]) == ["reviews"]
+    assert full_scans("sqlite", "SELECT id FROM books ORDER BY rating_sum DESC LIMIT ?", ["SCAN books USING INDEX ix_books_rating_sum_id"]) == []
+    assert full_scans("sqlite", "SELECT * FROM books ORDER BY rating_sum LIMIT ?", ["SCAN books", "USE TEMP B-TREE FOR ORDER BY"]) == ["books"]
+    assert full_scans("sqlite", "SELECT * FROM reviews WHERE user_id = ?", ["SEARCH reviews USING INDEX ix_reviews_user_id (user_id=?)"]) == []
+    assert full_scans("postgresql", "SELECT 1", ["Limit", "  ->  Seq Scan on books", "  ->  Seq Scan on catalog_version"]) == ["books"]
+
+
+@pytest.mark.asyncio
+async def test_inference_fallback_skips_the_failed_backend(monkeypatch):
+    calls = []
+
+    class FlakyBackend(InferenceBackend):
+        name = "flaky"
+
+        async def call(self, prompt):
+            return await super().call(prompt)
+
+        async def stream(self, prompt):
+            calls.append(self.name)
+            raise InferenceError("down")
+            yield
+
+    monkeypatch.setitem(ai_inference.INFERENCE_BACKENDS, "flaky", FlakyBackend)
+    monkeypatch.setattr(InferenceHelper, "_backends", {"stub": StubBackend(latency=0, tokens=3, failure_rate=0)})
+    monkeypatch.setattr("app.utils.ai_inference.settings.INFERENCE_BACKEND", "flaky")
+    monkeypatch.setattr("app.utils.ai_inference.settings.INFERENCE_FALLBACK_BACKENDS", "flaky, stub")
+    fallbacks = metrics.LLM_FALLBACKS.labels("flaky", "stub")
+    before = fallbacks.value
+
+    assert [backend.name for backend in InferenceHelper.backend_chain()] == ["flaky", "stub"]
+    assert InferenceHelper.active_backend() == ("flaky", None)
+    expected = "".join(StubBackend(tokens=3).completion("prompt"))
+    assert await InferenceHelper.call_ai_model("prompt") == expected
+    assert "".join([token async for token in InferenceHelper.stream_ai_model("prompt")]) == expected
+    assert calls == ["flaky", "flaky"] and fallbacks.value == before + 2
+
+    # Without a fallback the error reaches the caller instead of retrying the same backend
+    monkeypatch.setattr("app.utils.ai_inference.settings.INFERENCE_FALLBACK_BACKENDS", "")
+    with pytest.raises(InferenceError):
+        await InferenceHelper.call_ai_model("prompt")
+    assert calls == ["flaky"] * 3
+
+
+def test_inference_backend_without_stream_is_rejected_by_the_registry(monkeypatch):
+    class CallOnlyBackend(InferenceBackend):
+        name = "call-only"
+
+        async def call(self, prompt):
+            return "done"
+
+    monkeypatch.setitem(ai_inference.INFERENCE_BACKENDS, "call-only", CallOnlyBackend)
+    monkeypatch.setattr(InferenceHelper, "_backends", {})
+    with pytest.raises(TypeError, match="stream"):
+        InferenceHelper.backend("call-only")
+
+
+@pytest.mark.asyncio
+async def test_stub_backend_injects_failures_deterministically():
+    async def outcomes(stub):
+        results = []
+        for _ in range(20):
+            try:
+                results.append(await stub.call("prompt"))
+            except InferenceError:
+                results.append(None)
+        return results
+
+    first = await outcomes(StubBackend(latency=0, tokens=2, failure_rate=0.5, seed=7))
+    assert 0 < first.count(None) < 20
+    assert await outcomes(StubBackend(latency=0, tokens=2, failure_rate=0.5, seed=7)) == first